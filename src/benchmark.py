@@ -0,0 +1,260 @@
+"""This module benchmarks each stage of page generation on a synthetic corpus.
+
+Usage: python3 src/benchmark.py [--pages N] [--blocks N] [--mix list=1,code=1,...]
+                                [--seed N] [--repeat N] [--output bench.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+
+from enums import BlockType
+from template import CompiledTemplate
+from utils import (
+    block_to_block_type,
+    extract_title,
+    markdown_to_blocks,
+    markdown_to_html_node,
+    text_to_textnodes,
+)
+
+DEFAULT_MIX = {"paragraph": 4, "inline": 2, "list": 2, "code": 1, "quote": 1}
+
+DEFAULT_TEMPLATE = (
+    '<!doctype html><html><head><title>{{ Title }}</title>'
+    '<link href="/index.css" rel="stylesheet" /></head>'
+    "<body><article>{{ Content }}</article></body></html>"
+)
+
+WORDS = (
+    "the elves of rivendell sang beneath stars while hobbits ate second "
+    "breakfast and wizards argued about rings roads rivers mountains"
+).split()
+
+STAGES = (
+    "markdown_to_blocks",
+    "block_to_block_type",
+    "text_to_textnodes",
+    "markdown_to_html_node",
+    "to_html",
+    "template",
+    "write",
+)
+
+
+class CorpusGenerator:
+    """Generates deterministic markdown pages from a seed and a block mix"""
+
+    def __init__(self, seed: int = 0, mix: dict | None = None):
+        self.rng = random.Random(seed)
+        self.mix = mix or DEFAULT_MIX
+        self.kinds = list(self.mix)
+        self.weights = [self.mix[kind] for kind in self.kinds]
+
+    def words(self, count: int) -> str:
+        """Returns count random words"""
+        return " ".join(self.rng.choice(WORDS) for _ in range(count))
+
+    def inline(self, count: int) -> str:
+        """Returns count words interleaved with inline markdown"""
+        parts = []
+        for _ in range(count):
+            word = self.rng.choice(WORDS)
+            roll = self.rng.random()
+            if roll < 0.1:
+                word = f"**{word}**"
+            elif roll < 0.2:
+                word = f"_{word}_"
+            elif roll < 0.25:
+                word = f"`{word}`"
+            elif roll < 0.3:
+                word = f"[{word}](/blog/{word})"
+            elif roll < 0.32:
+                word = f"![{word}](/images/{word}.png)"
+            parts.append(word)
+        return " ".join(parts)
+
+    def block(self, kind: str) -> str:
+        """Returns a markdown block of the given kind"""
+        if kind == "paragraph":
+            return self.words(self.rng.randint(20, 60))
+        if kind == "inline":
+            return self.inline(self.rng.randint(20, 60))
+        if kind == "list":
+            items = self.rng.randint(3, 12)
+            if self.rng.random() < 0.5:
+                return "\n".join(f"- {self.inline(8)}" for _ in range(items))
+            return "\n".join(f"{i}. {self.inline(8)}" for i in range(1, items + 1))
+        if kind == "code":
+            lines = [f"    {self.words(6)}" for _ in range(self.rng.randint(2, 10))]
+            return "```\n" + "\n".join(lines) + "\n```"
+        if kind == "quote":
+            return "\n".join(f"> {self.inline(10)}" for _ in range(3))
+        if kind == "heading":
+            return f"{'#' * self.rng.randint(2, 6)} {self.words(4)}"
+        raise ValueError(f"unknown block kind: {kind}")
+
+    def page(self, blocks: int) -> str:
+        """Returns a page with a title and the given number of blocks"""
+        kinds = self.rng.choices(self.kinds, self.weights, k=blocks)
+        body = [f"# {self.words(3).title()}"]
+        body.extend(self.block(kind) for kind in kinds)
+        return "\n\n".join(body) + "\n"
+
+    def corpus(self, pages: int, blocks: int) -> list[str]:
+        """Returns the given number of pages"""
+        return [self.page(blocks) for _ in range(pages)]
+
+
+def inline_texts(block: str, block_type: BlockType) -> list[str]:
+    """Returns the texts of a block that go through inline parsing"""
+    lines = block.splitlines()
+    if block_type == BlockType.CODE:
+        return []
+    if block_type == BlockType.UNORDERED_LIST:
+        return [line[2:] for line in lines]
+    if block_type == BlockType.ORDERED_LIST:
+        return [line.split(". ", 1)[1] for line in lines]
+    if block_type == BlockType.QUOTE:
+        return ["\n".join(line.lstrip("> ") for line in lines)]
+    if block_type == BlockType.HEADING:
+        return [block.lstrip("# ")]
+    return [block]
+
+
+def _timed(func, *args):
+    start = time.perf_counter_ns()
+    result = func(*args)
+    return result, time.perf_counter_ns() - start
+
+
+def run_stages(corpus: list[str], template: CompiledTemplate, out_dir: str) -> dict:
+    """Runs every stage over the corpus once and returns nanoseconds per stage"""
+    totals = dict.fromkeys(STAGES, 0)
+
+    for index, markdown in enumerate(corpus):
+        blocks, elapsed = _timed(markdown_to_blocks, markdown)
+        totals["markdown_to_blocks"] += elapsed
+
+        start = time.perf_counter_ns()
+        block_types = [block_to_block_type(block) for block in blocks]
+        totals["block_to_block_type"] += time.perf_counter_ns() - start
+
+        texts = [
+            text
+            for block, block_type in zip(blocks, block_types)
+            for text in inline_texts(block, block_type)
+        ]
+        start = time.perf_counter_ns()
+        for text in texts:
+            text_to_textnodes(text)
+        totals["text_to_textnodes"] += time.perf_counter_ns() - start
+
+        node, elapsed = _timed(markdown_to_html_node, markdown)
+        totals["markdown_to_html_node"] += elapsed
+
+        html, elapsed = _timed(node.to_html)
+        totals["to_html"] += elapsed
+
+        title = extract_title(markdown)
+        page, elapsed = _timed(template.render, title, html)
+        totals["template"] += elapsed
+
+        data = page.encode("utf-8")
+        start = time.perf_counter_ns()
+        with open(os.path.join(out_dir, f"page{index}.html"), "wb") as file:
+            file.write(data)
+        totals["write"] += time.perf_counter_ns() - start
+
+    return totals
+
+
+def run_benchmark(
+    pages: int = 100,
+    blocks: int = 40,
+    mix: dict | None = None,
+    seed: int = 0,
+    repeat: int = 3,
+    basepath: str = "/site/",
+) -> dict:
+    """
+    Generates a corpus and times each stage, keeping the best of repeat runs.
+
+    Returns:
+        dict: Machine readable results
+    """
+    mix = mix or DEFAULT_MIX
+    corpus = CorpusGenerator(seed, mix).corpus(pages, blocks)
+    template = CompiledTemplate(DEFAULT_TEMPLATE, basepath)
+
+    best = None
+    with tempfile.TemporaryDirectory() as out_dir:
+        for _ in range(repeat):
+            totals = run_stages(corpus, template, out_dir)
+            if best is not None:
+                totals = {stage: min(best[stage], totals[stage]) for stage in STAGES}
+            best = totals
+
+    return {
+        "config": {
+            "pages": pages,
+            "blocks_per_page": blocks,
+            "mix": mix,
+            "seed": seed,
+            "repeat": repeat,
+            "corpus_bytes": sum(len(page.encode("utf-8")) for page in corpus),
+        },
+        "python": platform.python_version(),
+        "stages": {
+            stage: {
+                "total_ms": best[stage] / 1e6,
+                "per_page_us": best[stage] / 1e3 / pages,
+            }
+            for stage in STAGES
+        },
+    }
+
+
+def parse_mix(text: str) -> dict:
+    """Parses a block mix such as 'list=2,code=1'"""
+    mix = {}
+    for item in text.split(","):
+        kind, _, weight = item.partition("=")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    """Runs the benchmark and writes the results as JSON"""
+    parser = argparse.ArgumentParser(description="Benchmarks page generation stages")
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--blocks", type=int, default=40, help="Blocks per page")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=None,
+        help="Block weights, e.g. paragraph=4,inline=2,list=2,code=1,quote=1,heading=1",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.pages, args.blocks, args.mix, args.seed, args.repeat)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+    for stage, timing in results["stages"].items():
+        print(
+            f"{stage:<24}{timing['total_ms']:>10.2f} ms"
+            f"{timing['per_page_us']:>12.1f} us/page"
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
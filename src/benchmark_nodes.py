@@ -0,0 +1,96 @@
+"""This module benchmarks the memory used by the node classes.
+
+The slotted classes are compared with copies of them without __slots__,
+which is how the nodes were laid out before they had slots.
+
+Usage: python3 src/benchmark_nodes.py [node count]
+"""
+
+import sys
+import tracemalloc
+
+from enums import TextType
+from leafnode import LeafNode
+from parentnode import ParentNode
+from textnode import TextNode
+from utils import markdown_to_html_node
+
+
+def _unslotted(cls):
+    """Returns a copy of cls and its base classes without __slots__, so its
+    instances carry a __dict__ and a __weakref__ like any plain class's"""
+    if cls is object:
+        return object
+    slots = getattr(cls, "__slots__", ())
+    namespace = {
+        name: value
+        for name, value in vars(cls).items()
+        if name not in ("__slots__", "__dict__", "__weakref__") and name not in slots
+    }
+    bases = tuple(_unslotted(base) for base in cls.__bases__)
+    return type(cls.__name__, bases, namespace)
+
+
+FACTORIES = {
+    "TextNode": lambda cls, value: cls(value, TextType.BOLD),
+    "LeafNode": lambda cls, value: cls("b", value),
+    "ParentNode": lambda cls, value: cls("li", [value]),
+}
+
+CLASSES = {"TextNode": TextNode, "LeafNode": LeafNode, "ParentNode": ParentNode}
+
+
+def bytes_per_node(factory, cls, count: int) -> float:
+    """Measures the memory allocated per node when creating count nodes.
+    Text values are created beforehand; for parent nodes the size of their
+    one element children list is included.
+
+    Args:
+        factory (Callable): Creates a node of cls from a text value.
+        cls (type): Node class.
+        count (int): Number of nodes to create.
+    """
+    values = [f"text {i}" for i in range(count)]
+    tracemalloc.start()
+    nodes = [None] * count
+    before = tracemalloc.get_traced_memory()[0]
+    for i, value in enumerate(values):
+        nodes[i] = factory(cls, value)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del nodes
+    return (after - before) / count
+
+
+def peak_tree_memory(markdown: str) -> int:
+    """Returns the peak memory in bytes used while building the tree of a page
+
+    Args:
+        markdown (str): Markdown of the page
+    """
+    tracemalloc.start()
+    node = markdown_to_html_node(markdown)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del node
+    return peak
+
+
+def main():
+    """Prints bytes per node before and after slots, and the peak memory
+    for building a large list page"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{'class':<12}{'with __dict__':>16}{'slotted':>12}")
+    for name, factory in FACTORIES.items():
+        cls = CLASSES[name]
+        before = bytes_per_node(factory, _unslotted(cls), count)
+        after = bytes_per_node(factory, cls, count)
+        print(f"{name:<12}{before:>14.1f} B{after:>10.1f} B")
+
+    markdown = "# List\n\n" + "\n".join(f"- item **{i}**" for i in range(count))
+    peak = peak_tree_memory(markdown)
+    print(f"peak memory building a {count} item list: {peak / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
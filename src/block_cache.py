@@ -0,0 +1,150 @@
+"""This module contains the persistent cache of rendered markdown blocks"""
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+# Bump whenever block rendering changes, so stale fragments are never served
+PARSER_VERSION = 1
+
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+
+def block_cache_path_for(dest_dir: str) -> str:
+    """Returns the block cache path kept next to an output directory,
+    e.g. 'docs' -> 'docs.block-cache.json'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".block-cache.json"
+
+
+class BlockCache:
+    """LRU cache of rendered HTML per markdown block, keyed by a hash of the
+    block text and the parser version, and bounded by the size of the HTML.
+
+    A worker process's cache sets track_new, so the blocks it renders, and
+    the keys of those it served, can be sent back to the parent with
+    take_new_entries and take_hit_keys."""
+
+    def __init__(self, path: str | None = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.track_new = False
+        self.new_entries = []
+        self.hit_keys = []
+
+    @classmethod
+    def load(cls, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """Loads a cache from disk. A missing, unreadable or outdated cache
+        results in an empty one.
+
+        Args:
+            path (str): Cache file path.
+            max_bytes (int, optional): Size cap of the cached HTML. Defaults to 64 MiB.
+        """
+        cache = cls(path, max_bytes)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cache
+        if not isinstance(data, dict) or data.get("version") != PARSER_VERSION:
+            return cache
+        for key, html in data.get("entries", []):
+            cache._insert(key, html)
+        return cache
+
+    def save(self):
+        """Writes the cache to disk atomically, least recently used entries first"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"version": PARSER_VERSION, "entries": list(self.entries.items())},
+                file,
+            )
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def key(block: str, salt: str = "") -> str:
+        """Returns the cache key of a markdown block
+
+        Args:
+            block (str): Markdown block.
+            salt (str, optional): Version of other inputs the HTML depends on,
+                such as image sizes. Defaults to "".
+        """
+        data = f"{PARSER_VERSION}\0{salt}\0{block}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get(self, block: str, salt: str = "") -> str | None:
+        """Returns the cached HTML of a block and marks it as recently used
+
+        Args:
+            block (str): Markdown block.
+            salt (str, optional): See key. Defaults to "".
+        """
+        key = self.key(block, salt)
+        html = self.entries.get(key)
+        if html is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        if self.track_new:
+            self.hit_keys.append(key)
+        return html
+
+    def put(self, block: str, html: str, salt: str = ""):
+        """Caches the HTML of a block, evicting the least recently used
+        entries beyond the size cap
+
+        Args:
+            block (str): Markdown block.
+            html (str): Rendered HTML of the block.
+            salt (str, optional): See key. Defaults to "".
+        """
+        key = self.key(block, salt)
+        self._insert(key, html)
+        if self.track_new:
+            self.new_entries.append((key, html))
+
+    def merge(self, entries: list[tuple[str, str]], hit_keys: list[str] = ()):
+        """Adds entries rendered elsewhere, e.g. by worker processes, and
+        marks the entries served there as recently used
+
+        Args:
+            entries (list[tuple[str, str]]): (key, HTML) pairs
+            hit_keys (list[str], optional): Keys of the entries served. Defaults to ().
+        """
+        for key in hit_keys:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        for key, html in entries:
+            self._insert(key, html)
+
+    def take_new_entries(self) -> list[tuple[str, str]]:
+        """Returns and forgets the entries added with put since the last call"""
+        entries, self.new_entries = self.new_entries, []
+        return entries
+
+    def take_hit_keys(self) -> list[str]:
+        """Returns and forgets the keys of the entries served by get since the last call"""
+        keys, self.hit_keys = self.hit_keys, []
+        return keys
+
+    def _insert(self, key: str, html: str):
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self.entries[key] = html
+        self.size += len(html)
+        while self.size > self.max_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
@@ -0,0 +1,124 @@
+"""This module contains the line based markdown block scanner.
+
+Blocks are separated by empty lines, except inside ``` code fences, and are
+yielded one at a time so a page never has to be held in memory as a whole.
+"""
+
+import itertools
+import mmap
+import os
+from collections.abc import Iterator
+
+FENCE = "```"
+FRONT_MATTER = "---"
+
+# Files at least this large are read through a memory map
+MMAP_THRESHOLD = 16 * 2**20
+
+
+def _is_fence(line: str, in_fence: bool) -> bool:
+    """Checks whether a line opens or closes a code fence. A fence opened
+    and closed on the same line, such as ```code```, does neither."""
+    stripped = line.strip()
+    if not stripped.startswith(FENCE):
+        return False
+    if in_fence:
+        return True
+    return len(stripped) < 2 * len(FENCE) or not stripped.endswith(FENCE)
+
+
+def scan_blocks(lines):
+    """Groups markdown lines into blocks, lazily
+
+    Args:
+        lines (Iterable[str]): Markdown lines, with or without their trailing newline
+
+    Yields:
+        str: Each block with leading and trailing whitespace removed
+    """
+    block = []
+    in_fence = False
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if not line and not in_fence:
+            if block:
+                text = "\n".join(block).strip()
+                if text:
+                    yield text
+                block = []
+            continue
+        if _is_fence(line, in_fence):
+            in_fence = not in_fence
+        block.append(line)
+
+    if block:
+        text = "\n".join(block).strip()
+        if text:
+            yield text
+
+
+def split_front_matter(lines) -> tuple[dict[str, str], Iterator[str]]:
+    """Reads the front matter at the top of markdown lines, if any: 'key: value'
+    lines between two '---' lines. Only the front matter is consumed.
+
+    Args:
+        lines (Iterable[str]): Markdown lines, with or without their trailing newline
+
+    Returns:
+        tuple[dict[str, str], Iterator[str]]: The front matter, and the lines after it
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, iter(())
+    if first.rstrip("\r\n") != FRONT_MATTER:
+        return {}, itertools.chain([first], lines)
+
+    consumed = [first]
+    meta = {}
+    for line in lines:
+        consumed.append(line)
+        stripped = line.strip()
+        if stripped == FRONT_MATTER:
+            return meta, lines
+        key, separator, value = stripped.partition(":")
+        if separator and key.strip():
+            meta[key.strip().lower()] = value.strip()
+    # Never closed, so it was not front matter after all
+    return {}, iter(consumed)
+
+
+def _mapped_lines(file):
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for raw_line in iter(mapped.readline, b""):
+            line = raw_line.decode("utf-8")
+            if "\r" in line:
+                # Same newline translation as files opened in text mode
+                line = line.replace("\r\n", "\n").replace("\r", "\n")
+                yield from line.splitlines(keepends=True)
+            else:
+                yield line
+
+
+def read_lines(path: str, use_mmap: bool | None = None):
+    """Reads the lines of a UTF-8 text file lazily
+
+    Args:
+        path (str): File path.
+        use_mmap (bool, optional): Read through a memory map. Defaults to None,
+            which maps files of at least MMAP_THRESHOLD bytes.
+
+    Yields:
+        str: Each line including its trailing newline
+    """
+    size = os.path.getsize(path)
+    if use_mmap is None:
+        use_mmap = size >= MMAP_THRESHOLD
+    if use_mmap and size:
+        with open(path, "rb") as file:
+            yield from _mapped_lines(file)
+        return
+
+    with open(path, "r", encoding="utf-8") as file:
+        yield from file
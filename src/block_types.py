@@ -0,0 +1,81 @@
+"""This module contains the registry of markdown block types.
+
+A block is classified by its first character: only the types registered for
+that character are checked, in registration order, and a block no type
+claims is a paragraph. So a paragraph costs a dictionary lookup, and any
+other block the one or two checks for its first character.
+
+New block types are registered with the characters their blocks start
+with, e.g. a table on "|":
+
+    register_block_type("table", "|", is_table, table_to_html_node)
+
+where is_table(block) -> bool and table_to_html_node(block, images) ->
+HTMLNode | None."""
+
+
+class BlockHandler:
+    """A block type: the characters its blocks start with, how to recognize
+    such a block and how to render it"""
+
+    __slots__ = ("block_type", "first_chars", "matches", "to_html_node")
+
+    def __init__(self, block_type, first_chars: str, matches, to_html_node):
+        self.block_type = block_type
+        self.first_chars = first_chars
+        self.matches = matches
+        self.to_html_node = to_html_node
+
+
+class BlockRegistry:
+    """Block types by the first characters of their blocks, with a fallback
+    type for blocks none of them claims"""
+
+    def __init__(self, fallback: BlockHandler):
+        self.fallback = fallback
+        self.extensions = []
+        self._by_first_char = {}
+
+    def register(self, handler: BlockHandler, builtin: bool = False):
+        """
+        Adds a block type, checked after the types already registered for
+        the same first characters.
+
+        Args:
+            handler (BlockHandler): The block type.
+            builtin (bool, optional): Whether it is one of the types the
+                parser is versioned with. Defaults to False.
+
+        Raises:
+            ValueError: Raised when the type is already registered or has no first characters
+        """
+        if not handler.first_chars:
+            raise ValueError(f"block type {handler.block_type!r} has no first characters")
+        if handler.block_type == self.fallback.block_type or any(
+            existing.block_type == handler.block_type
+            for handlers in self._by_first_char.values()
+            for existing in handlers
+        ):
+            raise ValueError(f"block type {handler.block_type!r} is already registered")
+        for char in handler.first_chars:
+            self._by_first_char.setdefault(char, []).append(handler)
+        if not builtin:
+            self.extensions.append(str(handler.block_type))
+
+    @property
+    def signature(self) -> str:
+        """Names of the types registered on top of the built-in ones, empty
+        without any. Rendered blocks are cached per signature."""
+        return ",".join(self.extensions)
+
+    def classify(self, block: str) -> BlockHandler:
+        """
+        Returns the type of a block.
+
+        Args:
+            block (str): A single block of markdown text with leading and trailing whitespace removed.
+        """
+        for handler in self._by_first_char.get(block[:1], ()):
+            if handler.matches(block):
+                return handler
+        return self.fallback
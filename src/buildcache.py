@@ -0,0 +1,243 @@
+"""This module contains the shared build cache: rendered pages and processed
+assets stored by a key derived from their inputs and the generator version,
+in a pluggable backend (a directory, a tarball or an HTTP server), so a
+fresh checkout can fetch what another build already produced."""
+
+import hashlib
+import io
+import os
+import tarfile
+import time
+import urllib.error
+import urllib.request
+
+from block_cache import PARSER_VERSION
+
+# Bump whenever page rendering or asset processing changes output for the
+# same inputs. Block rendering changes are covered by PARSER_VERSION.
+GENERATOR_VERSION = 2
+
+HTTP_TIMEOUT = 10
+
+
+def cache_key(kind: str, *inputs: str) -> str:
+    """Returns the cache key of an output from the hashes of its inputs
+
+    Args:
+        kind (str): What the output is, e.g. 'page'
+        *inputs (str): Hashes or values the output is a function of
+    """
+    parts = [f"{GENERATOR_VERSION}.{PARSER_VERSION}", kind, *inputs]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class DirectoryBackend:
+    """Stores each entry as a file under a directory, in subdirectories named
+    after the first two characters of the key"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key)
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the data stored under key, or None"""
+        try:
+            with open(self._entry_path(key), "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        """Stores data under key"""
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def save(self):
+        """Nothing to do; entries are written as they are stored"""
+
+    def close(self):
+        """Nothing to do; no file is kept open"""
+
+
+class TarballBackend:
+    """Reads entries from a tarball and writes it back, with the entries
+    added meanwhile, on save. Meant to be exported and imported as a CI
+    artifact."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Compressed only when the name says so, e.g. cache.tar.gz
+        self.write_mode = "w:gz" if path.endswith((".tar.gz", ".tgz")) else "w"
+        self._added = {}
+        self._members = {}
+        self._tar = None
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            self._tar = tarfile.open(self.path, "r:*")
+            self._members = {member.name: member for member in self._tar.getmembers()}
+        except (OSError, tarfile.TarError):
+            # An unreadable tarball is replaced on save
+            self._tar = None
+            self._members = {}
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the data stored under key, or None"""
+        if key in self._added:
+            return self._added[key]
+        member = self._members.get(key)
+        if member is None:
+            return None
+        return self._tar.extractfile(member).read()
+
+    def put(self, key: str, data: bytes):
+        """Stores data under key, in memory until save"""
+        self._added[key] = data
+
+    def save(self):
+        """Writes the tarball with every known entry"""
+        if not self._added:
+            return
+        tmp_path = f"{self.path}.tmp"
+        mtime = time.time()
+        with tarfile.open(tmp_path, self.write_mode) as tar:
+            for key, member in self._members.items():
+                if key not in self._added:
+                    tar.addfile(member, self._tar.extractfile(member))
+            for key, data in self._added.items():
+                info = tarfile.TarInfo(key)
+                info.size = len(data)
+                info.mtime = mtime
+                tar.addfile(info, io.BytesIO(data))
+        if self._tar is not None:
+            self._tar.close()
+        os.replace(tmp_path, self.path)
+        self._added = {}
+        self._open()
+
+    def close(self):
+        """Closes the tarball read from; entries not saved are dropped"""
+        if self._tar is not None:
+            self._tar.close()
+        self._tar = None
+        self._members = {}
+        self._added = {}
+
+
+class HTTPBackend:
+    """Fetches entries with GET <url>/<key> and stores them with PUT. A 404 is
+    a miss. After a connection failure the server is no longer asked, so an
+    unreachable cache costs one timeout per build."""
+
+    def __init__(self, url: str, timeout: float = HTTP_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.available = True
+
+    def _request(self, method: str, key: str, data: bytes | None = None):
+        request = urllib.request.Request(f"{self.url}/{key}", data=data, method=method)
+        if data is not None:
+            request.add_header("Content-Type", "application/octet-stream")
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the data stored under key, or None"""
+        if not self.available:
+            return None
+        try:
+            with self._request("GET", key) as response:
+                return response.read()
+        except urllib.error.HTTPError:
+            return None
+        except OSError:
+            self.available = False
+            return None
+
+    def put(self, key: str, data: bytes):
+        """Stores data under key"""
+        if not self.available:
+            return
+        try:
+            self._request("PUT", key, data).close()
+        except urllib.error.HTTPError:
+            pass
+        except OSError:
+            self.available = False
+
+    def save(self):
+        """Nothing to do; entries are sent as they are stored"""
+
+    def close(self):
+        """Nothing to do; no connection is kept open"""
+
+
+def open_backend(location: str):
+    """Opens the backend for a cache location: an http:// or https:// URL,
+    a .tar, .tar.gz or .tgz file, or else a directory
+
+    Args:
+        location (str): Cache location
+    """
+    if location.startswith(("http://", "https://")):
+        return HTTPBackend(location)
+    if location.endswith((".tar", ".tar.gz", ".tgz")):
+        return TarballBackend(location)
+    return DirectoryBackend(location)
+
+
+class BuildCache:
+    """Content-addressed cache of build outputs in front of a backend,
+    counting hits and misses"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, location: str):
+        """Opens a cache at a location, see open_backend
+
+        Args:
+            location (str): Cache location
+        """
+        return cls(open_backend(location))
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the output stored under key, or None
+
+        Args:
+            key (str): Key from cache_key
+        """
+        data = self.backend.get(key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Stores an output under key
+
+        Args:
+            key (str): Key from cache_key
+            data (bytes): Output bytes
+        """
+        self.backend.put(key, data)
+
+    def save(self):
+        """Persists entries the backend holds back, e.g. a tarball's"""
+        self.backend.save()
+
+    def close(self):
+        """Releases what the backend keeps open, e.g. a tarball's file"""
+        self.backend.close()
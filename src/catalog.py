@@ -0,0 +1,232 @@
+"""This module contains the site catalog: the title and front matter of every
+content page, read from the head of each file and kept in SQLite, so that
+listings, navigation and feeds never need to parse page bodies.
+
+A refresh only stats the content files and rescans those whose size or
+mtime changed since the catalog last saw them."""
+
+import json
+import os
+import re
+import sqlite3
+
+from block_scanner import read_lines, split_front_matter
+from utils import extract_title_from_lines
+
+CATALOG_VERSION = 1
+
+# Front matter keys usable in ORDER BY, e.g. 'date'
+ORDER_KEY_PATTERN = re.compile(r"\w+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    title TEXT,
+    meta TEXT NOT NULL
+)
+"""
+
+
+def catalog_path_for(dest_dir: str) -> str:
+    """Returns the catalog database kept next to an output directory,
+    e.g. 'docs' -> 'docs.catalog.sqlite'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".catalog.sqlite"
+
+
+def scan_head(path: str) -> tuple[str | None, dict[str, str]]:
+    """
+    Reads a markdown file up to its title: the front matter, then lines
+    until the first '# ' heading unless the front matter has a title.
+
+    Args:
+        path (str): Path to the markdown file.
+
+    Returns:
+        tuple[str | None, dict[str, str]]: Title (None if there is none) and front matter
+    """
+    lines = read_lines(path)
+    try:
+        meta, rest = split_front_matter(lines)
+        title = meta.get("title")
+        if title is None:
+            try:
+                title = extract_title_from_lines(rest)
+            except ValueError:
+                title = None
+    finally:
+        lines.close()
+    return title, meta
+
+
+class PageInfo:
+    """Catalog entry of a content page"""
+
+    __slots__ = ("path", "title", "meta")
+
+    def __init__(self, path: str, title: str | None, meta: dict[str, str]):
+        self.path = path
+        self.title = title
+        self.meta = meta
+
+    def __repr__(self):
+        return f"PageInfo({self.path!r}, {self.title!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, PageInfo):
+            return False
+        return (self.path, self.title, self.meta) == (other.path, other.title, other.meta)
+
+    def url(self, basepath: str = "/") -> str:
+        """Returns the URL the page is served at, e.g. 'blog/tom/index.md' with
+        the basepath '/' -> '/blog/tom/'
+
+        Args:
+            basepath (str, optional): The base path for URLs. Defaults to "/".
+        """
+        key = os.path.splitext(self.path)[0] + ".html"
+        if key == "index.html" or key.endswith("/index.html"):
+            key = key[: -len("index.html")]
+        return basepath + key
+
+
+class SiteCatalog:
+    """Queryable title and front matter of every page of a content directory.
+
+    Paths are relative to the content directory and use '/' separators.
+    """
+
+    def __init__(self, content_dir: str, path: str = ":memory:"):
+        self.content_dir = content_dir
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != CATALOG_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS pages")
+            self.connection.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    def close(self):
+        """Closes the database"""
+        self.connection.close()
+
+    def refresh(self) -> int:
+        """
+        Brings the catalog up to date with the content directory: new and
+        changed files are rescanned and deleted ones are dropped.
+
+        Returns:
+            int: Number of files scanned
+        """
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.connection.execute(
+                "SELECT path, size, mtime_ns FROM pages"
+            )
+        }
+        rows = []
+        current = set()
+        for root, _, files in os.walk(self.content_dir):
+            for file in files:
+                if not file.endswith(".md"):
+                    continue
+                full_path = os.path.join(root, file)
+                path = os.path.relpath(full_path, self.content_dir).replace(os.sep, "/")
+                current.add(path)
+                stat = os.stat(full_path)
+                if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                title, meta = scan_head(full_path)
+                rows.append(
+                    (path, stat.st_size, stat.st_mtime_ns, title, json.dumps(meta))
+                )
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self.connection.executemany(
+                "DELETE FROM pages WHERE path = ?",
+                [(path,) for path in set(known) - current],
+            )
+        return len(rows)
+
+    def get(self, path: str) -> PageInfo | None:
+        """Returns the entry of one page
+
+        Args:
+            path (str): Page path relative to the content directory, e.g. 'blog/tom/index.md'
+        """
+        row = self.connection.execute(
+            "SELECT path, title, meta FROM pages WHERE path = ?", (path,)
+        ).fetchone()
+        return None if row is None else PageInfo(row[0], row[1], json.loads(row[2]))
+
+    def _section_clause(self, section: str) -> tuple[str, list]:
+        if not section:
+            return "", []
+        prefix = section.strip("/") + "/"
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return " WHERE path LIKE ? ESCAPE '\\'", [escaped + "%"]
+
+    def count(self, section: str = "") -> int:
+        """Returns the number of pages, optionally only those under a section
+
+        Args:
+            section (str, optional): Directory relative to the content directory,
+                e.g. 'blog'. Defaults to "", every page.
+        """
+        where, params = self._section_clause(section)
+        query = f"SELECT COUNT(*) FROM pages{where}"
+        return self.connection.execute(query, params).fetchone()[0]
+
+    def pages(
+        self,
+        section: str = "",
+        order_by: str = "path",
+        descending: bool = False,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[PageInfo]:
+        """
+        Lists pages, optionally only those under a section, sorted by path,
+        title or a front matter key. Pages lacking the key sort lowest.
+
+        Args:
+            section (str, optional): Directory relative to the content directory,
+                e.g. 'blog'. Defaults to "", every page.
+            order_by (str, optional): 'path', 'title' or a front matter key. Defaults to "path".
+            descending (bool, optional): Sort in descending order. Defaults to False.
+            limit (int, optional): Maximum number of pages. Defaults to None, no limit.
+            offset (int, optional): Number of pages to skip. Defaults to 0.
+
+        Raises:
+            ValueError: Raised when order_by isn't a word
+
+        Returns:
+            list[PageInfo]: The matching pages
+        """
+        if not ORDER_KEY_PATTERN.fullmatch(order_by):
+            raise ValueError(f"invalid sort key: {order_by!r}")
+        where, params = self._section_clause(section)
+        if order_by in ("path", "title"):
+            order = order_by
+        else:
+            order = "json_extract(meta, ?)"
+            params.append(f'$."{order_by}"')
+        direction = "DESC" if descending else "ASC"
+        query = (
+            f"SELECT path, title, meta FROM pages{where} "
+            f"ORDER BY {order} {direction}, path {direction} LIMIT ? OFFSET ?"
+        )
+        params.extend((-1 if limit is None else limit, offset))
+        return [
+            PageInfo(path, title, json.loads(meta))
+            for path, title, meta in self.connection.execute(query, params)
+        ]
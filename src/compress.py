@@ -0,0 +1,192 @@
+"""This module contains the post-build compression stage, which writes
+precompressed sidecars (index.html.gz, ...) next to the text outputs"""
+
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import remove_empty_parents
+from progress import VERBOSE, get_reporter
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (".html", ".css", ".svg", ".json")
+
+# A sidecar is only kept when it is at most this fraction of the original,
+# below that servers gain too little from it to be worth the disk and syscalls
+MAX_RATIO = 0.9
+
+
+def _gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the output identical across builds of the same input
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data: bytes) -> bytes:
+    return brotli.compress(data, quality=11)
+
+
+# Sidecar suffix and compressor of every encoding, by Content-Encoding name
+ENCODINGS = {"gzip": (".gz", _gzip)}
+if brotli is not None:
+    ENCODINGS["br"] = (".br", _brotli)
+
+
+def compress_index_path_for(dest_dir: str) -> str:
+    """Returns the compression index kept next to an output directory,
+    e.g. 'docs' -> 'docs.compress.json'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".compress.json"
+
+
+def find_compressible(dest_dir: str) -> list[str]:
+    """Returns the paths relative to dest_dir of the files worth compressing
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return sorted(
+        os.path.relpath(os.path.join(root, file), dest_dir).replace(os.sep, "/")
+        for root, _, files in os.walk(dest_dir)
+        for file in files
+        if file.endswith(COMPRESSIBLE_EXTENSIONS)
+    )
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Compressor:
+    """Writes a sidecar per encoding next to every HTML, CSS and SVG output.
+
+    The size and mtime of each compressed file are recorded in an index next
+    to the output directory, so a build only compresses files that changed.
+    Files run on a thread pool, as zlib and brotli release the GIL.
+    """
+
+    def __init__(
+        self,
+        dest_dir: str,
+        encodings: list[str] | None = None,
+        max_ratio: float = MAX_RATIO,
+        jobs: int | None = None,
+        index_path: str | None = None,
+    ):
+        encodings = encodings or ["gzip"]
+        for encoding in encodings:
+            if encoding not in ENCODINGS:
+                raise ValueError(f"unsupported encoding: {encoding}")
+        self.dest_dir = dest_dir
+        self.encodings = encodings
+        self.max_ratio = max_ratio
+        self.jobs = jobs
+        self.index_path = index_path or compress_index_path_for(dest_dir)
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _compress_file(self, key: str) -> list:
+        """Writes the sidecars of one file, returning its index entry"""
+        path = os.path.join(self.dest_dir, *key.split("/"))
+        stat = os.stat(path)
+        with open(path, "rb") as file:
+            data = file.read()
+        written = []
+        for encoding, (suffix, compress) in ENCODINGS.items():
+            sidecar = path + suffix
+            if encoding not in self.encodings:
+                _remove(sidecar)
+                continue
+            compressed = compress(data)
+            if len(compressed) > len(data) * self.max_ratio:
+                _remove(sidecar)
+                continue
+            tmp_file = f"{sidecar}.tmp"
+            with open(tmp_file, "wb") as file:
+                file.write(compressed)
+            os.utime(tmp_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(tmp_file, sidecar)
+            written.append(encoding)
+        return [stat.st_size, stat.st_mtime_ns, written]
+
+    def compress(self) -> int:
+        """
+        Compresses the outputs changed since the last run and removes the
+        sidecars of outputs that no longer exist.
+
+        Returns:
+            int: Number of files that were compressed, or tried
+        """
+        reporter = get_reporter()
+        index = self._load_index()
+        previous = index.get("files", {})
+        # A change of encodings recompresses everything, which also removes
+        # the sidecars of dropped encodings
+        full_pass = index.get("encodings") != self.encodings
+        files = {}
+        pending = []
+        for key in find_compressible(self.dest_dir):
+            stat = os.stat(os.path.join(self.dest_dir, *key.split("/")))
+            entry = previous.get(key)
+            if (
+                not full_pass
+                and entry is not None
+                and entry[:2] == [stat.st_size, stat.st_mtime_ns]
+            ):
+                files[key] = entry
+            else:
+                pending.append(key)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                for key, entry in zip(pending, executor.map(self._compress_file, pending)):
+                    files[key] = entry
+                    if entry[2]:
+                        encodings = ", ".join(entry[2])
+                        reporter.report("compressed", f"Compressed '{key}' ({encodings})", VERBOSE)
+
+        for key in sorted(set(previous) - set(files)):
+            self._remove_sidecars(key)
+
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"encodings": self.encodings, "files": files}, file)
+        os.replace(tmp_path, self.index_path)
+        return len(pending)
+
+    def clear(self) -> int:
+        """
+        Removes every sidecar of the last run and its index, for a build
+        without compression.
+
+        Returns:
+            int: Number of files whose sidecars were removed
+        """
+        files = self._load_index().get("files", {})
+        for key in sorted(files):
+            self._remove_sidecars(key)
+        _remove(self.index_path)
+        return len(files)
+
+    def _remove_sidecars(self, key: str):
+        """Removes the sidecars of a file, and its directory if that is left empty"""
+        path = os.path.join(self.dest_dir, *key.split("/"))
+        for suffix, _ in ENCODINGS.values():
+            _remove(path + suffix)
+        remove_empty_parents(os.path.dirname(path), self.dest_dir)
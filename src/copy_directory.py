@@ -1,39 +1,170 @@
-"""This module contains the function for copying the static content in to the public directory"""
+"""This module contains the function for syncing the static content in to the public directory"""
 
 import os
 import shutil
 
+from manifest import BuildManifest, hash_file, remove_empty_parents
+from progress import QUIET, get_reporter
 
-def copy_directory_recursive(src: str, dest: str):
+LINK_MODES = ("copy", "hardlink", "reflink")
+
+# ioctl request cloning a whole file on btrfs, XFS and other CoW filesystems
+FICLONE = 0x40049409
+
+
+def needs_update(src_file: str, dest_file: str, checksum: bool = False) -> bool:
+    """
+    Checks whether dest_file differs from src_file.
+
+    Files are compared by size and modification time, or by content hash
+    when checksum is set. A hardlink to the source is always up to date.
+
+    Args:
+        src_file (str): Source file path.
+        dest_file (str): Destination file path.
+        checksum (bool, optional): Compare contents instead of mtimes. Defaults to False.
+    """
+    try:
+        dest_stat = os.stat(dest_file)
+    except OSError:
+        return True
+    src_stat = os.stat(src_file)
+    if (src_stat.st_dev, src_stat.st_ino) == (dest_stat.st_dev, dest_stat.st_ino):
+        return False
+    if src_stat.st_size != dest_stat.st_size:
+        return True
+    if checksum:
+        return hash_file(src_file) != hash_file(dest_file)
+    return src_stat.st_mtime_ns != dest_stat.st_mtime_ns
+
+
+def _reflink(src_file: str, tmp_file: str):
+    """Clones src_file to tmp_file, falling back to copy_file_range, which
+    the kernel can also serve with a reflink or a server side copy"""
+    import fcntl  # pylint: disable=import-outside-toplevel
+
+    with open(src_file, "rb") as src, open(tmp_file, "wb") as dest:
+        try:
+            fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+            return
+        except OSError:
+            pass
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(src.fileno(), dest.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+
+
+def transfer_file(src_file: str, dest_file: str, link_mode: str = "copy"):
+    """
+    Replaces dest_file with src_file. The new file is prepared next to the
+    destination and renamed over it, so the old file is never modified in place.
+
+    Args:
+        src_file (str): Source file path.
+        dest_file (str): Destination file path.
+        link_mode (str, optional): 'copy', 'hardlink' or 'reflink'. Hardlinks and
+            reflinks fall back to a copy when the filesystem does not support them.
+            Defaults to "copy".
+    """
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"unknown link mode: {link_mode}")
+
+    tmp_file = f"{dest_file}.tmp"
+    try:
+        if link_mode == "hardlink":
+            os.link(src_file, tmp_file)
+        elif link_mode == "reflink":
+            _reflink(src_file, tmp_file)
+            shutil.copystat(src_file, tmp_file)
+        else:
+            shutil.copy2(src_file, tmp_file)
+    except (OSError, AttributeError):
+        if os.path.lexists(tmp_file):
+            os.remove(tmp_file)
+        shutil.copy2(src_file, tmp_file)
+    os.replace(tmp_file, dest_file)
+
+
+def sync_file(
+    src_file: str, dest_file: str, link_mode: str = "copy", checksum: bool = False
+) -> bool:
     """
-    Recursively copies all contents from src to dest.
-    Deletes all existing content in dest before copying.
+    Copies src_file to dest_file unless dest_file is already up to date.
+
+    Args:
+        src_file (str): Source file path.
+        dest_file (str): Destination file path.
+        link_mode (str, optional): 'copy', 'hardlink' or 'reflink'. Defaults to "copy".
+        checksum (bool, optional): Compare file contents instead of mtimes. Defaults to False.
+
+    Returns:
+        bool: True if the file was copied
+    """
+    if not needs_update(src_file, dest_file, checksum):
+        return False
+    os.makedirs(os.path.dirname(dest_file), exist_ok=True)
+    transfer_file(src_file, dest_file, link_mode)
+    return True
+
+
+def copy_directory_recursive(
+    src: str,
+    dest: str,
+    manifest: BuildManifest | None = None,
+    link_mode: str = "copy",
+    checksum: bool = False,
+    replacements: dict[str, str] | None = None,
+):
+    """
+    Recursively syncs all contents from src to dest.
+    Only files that are missing or differ in dest are copied. Files synced by
+    a previous build whose source was deleted are removed when a manifest is
+    given; anything else in dest, like generated pages, is left alone.
 
     Args:
         src (str): Source directory path.
         dest (str): Destination directory path.
+        manifest (BuildManifest, optional): Manifest recording the synced files. Defaults to None.
+        link_mode (str, optional): 'copy', 'hardlink' or 'reflink'. Defaults to "copy".
+        checksum (bool, optional): Compare file contents instead of mtimes. Defaults to False.
+        replacements (dict[str, str], optional): Files to publish instead of some source
+            files, such as optimized images, by source file path. Defaults to None.
     """
+    reporter = get_reporter()
+    replacements = replacements or {}
     if not os.path.exists(src):
-        print(f"Source directory '{src}' does not exist.")
+        reporter.report(None, f"Source directory '{src}' does not exist.", QUIET)
+        reporter.flush()
         return
 
-    if os.path.exists(dest):
-        shutil.rmtree(dest)
-        print(f"Deleted all contents of '{dest}'")
-
     os.makedirs(dest, exist_ok=True)
+    synced = set()
 
-    for root, dirs, files in os.walk(src):
+    for root, _, files in os.walk(src):
         relative_path = os.path.relpath(root, src)
-        dest_dir = os.path.join(dest, relative_path)
+        dest_dir = os.path.normpath(os.path.join(dest, relative_path))
         os.makedirs(dest_dir, exist_ok=True)
 
         for file in files:
             src_file = os.path.join(root, file)
             dest_file = os.path.join(dest_dir, file)
-            shutil.copy2(src_file, dest_file)
-            print(f"Copied '{src_file}' to '{dest_file}'")
+            synced.add(os.path.relpath(dest_file, dest).replace(os.sep, "/"))
+            source = replacements.get(src_file, src_file)
+            if sync_file(source, dest_file, link_mode, checksum):
+                reporter.report("copied", f"Copied '{src_file}' to '{dest_file}'")
+
+    if manifest is None:
+        reporter.flush()
+        return
 
-        for directory in dirs:
-            os.makedirs(os.path.join(dest_dir, directory), exist_ok=True)
-            print(f"Created directory '{os.path.join(dest_dir, directory)}'")
+    for key in sorted(set(manifest.assets) - synced):
+        dest_file = os.path.join(dest, *key.split("/"))
+        if os.path.exists(dest_file):
+            os.remove(dest_file)
+            remove_empty_parents(os.path.dirname(dest_file), dest)
+            reporter.report("removed_file", f"Removed stale file '{dest_file}'")
+    manifest.assets = sorted(synced)
+    reporter.flush()
@@ -0,0 +1,179 @@
+"""This module contains the build daemon protocol: a long-lived build server
+listening on a Unix domain socket, and the thin client that sends it builds.
+
+A request is one JSON line, {"argv": [...], "cwd": ...} to build with
+the given command line arguments or {"stop": true} to stop the server. The
+server answers with one JSON line, {"status": int, "output": str}, and
+closes the connection.
+
+The client only imports the standard library, so a warm build costs the
+client's interpreter startup plus the build itself. Run it with:
+    python3 src/daemon.py [--socket PATH] [--stop] [build arguments]"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = "docs.sock"
+MAX_REQUEST_BYTES = 2**20
+
+
+def socket_path_for(dest_dir: str) -> str:
+    """Returns the daemon socket kept next to an output directory,
+    e.g. 'docs' -> 'docs.sock'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".sock"
+
+
+def _read_line(connection: socket.socket) -> bytes:
+    """Reads up to the first newline, or the end of the stream"""
+    data = bytearray()
+    while b"\n" not in data:
+        chunk = connection.recv(65536)
+        if not chunk:
+            break
+        data.extend(chunk)
+        if len(data) > MAX_REQUEST_BYTES:
+            raise ValueError("request too large")
+    return bytes(data).split(b"\n", 1)[0]
+
+
+def _send(connection: socket.socket, message: dict):
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+class BuildServer:
+    """Serves build requests one at a time on a Unix domain socket.
+
+    The handler is called with the arguments of each build and returns its
+    exit status and output. Builds run in the server's process, so whatever
+    the handler keeps between calls stays warm.
+    """
+
+    def __init__(self, socket_path: str, handler):
+        self.socket_path = socket_path
+        self.handler = handler
+        self.cwd = os.getcwd()
+        self.running = False
+        self._socket = None
+
+    def bind(self):
+        """
+        Listens on the socket path, replacing a stale socket file.
+
+        Raises:
+            ValueError: Raised when another server already listens on the path
+        """
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.remove(self.socket_path)
+            else:
+                raise ValueError(f"a build server already listens on {self.socket_path}")
+            finally:
+                probe.close()
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(self.socket_path)
+        self._socket.listen()
+
+    def serve_forever(self):
+        """Serves requests until one asks the server to stop"""
+        if self._socket is None:
+            self.bind()
+        self.running = True
+        try:
+            while self.running:
+                connection, _ = self._socket.accept()
+                with connection:
+                    try:
+                        self._serve(connection)
+                    except OSError:
+                        # The client went away; a build it asked for is complete
+                        pass
+        finally:
+            self._socket.close()
+            self._socket = None
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def _serve(self, connection: socket.socket):
+        """Answers one request"""
+        try:
+            request = json.loads(_read_line(connection))
+        except ValueError as error:
+            _send(connection, {"status": 2, "output": f"bad request: {error}\n"})
+            return
+        if request.get("stop"):
+            self.running = False
+            _send(connection, {"status": 0, "output": "Build server stopped\n"})
+            return
+        cwd = request.get("cwd", self.cwd)
+        if os.path.realpath(cwd) != os.path.realpath(self.cwd):
+            output = f"the build server serves {self.cwd}, not {cwd}\n"
+            _send(connection, {"status": 2, "output": output})
+            return
+        status, output = self.handler(request.get("argv", []))
+        _send(connection, {"status": status, "output": output})
+
+
+def request(socket_path: str, message: dict, timeout: float | None = None) -> dict:
+    """
+    Sends one request to a build server and waits for its answer.
+
+    Args:
+        socket_path (str): Path to the server's socket.
+        message (dict): Request, see the module docstring.
+        timeout (float, optional): Seconds to wait for the answer. Defaults to None.
+
+    Raises:
+        ValueError: Raised when the server closed the connection without answering
+
+    Returns:
+        dict: The server's answer
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        _send(connection, message)
+        line = _read_line(connection)
+    if not line:
+        raise ValueError("the build server closed the connection without answering")
+    return json.loads(line)
+
+
+def client_main(argv=None) -> int:
+    """Sends the command line's build to a running build server, prints its
+    output and returns its exit status"""
+    parser = argparse.ArgumentParser(
+        description="Runs a build on the build server started by main.py --serve",
+        epilog="Other arguments are passed on to the build, as for main.py",
+    )
+    parser.add_argument(
+        "--socket",
+        default=DEFAULT_SOCKET,
+        help=f"Socket of the build server. Defaults to {DEFAULT_SOCKET}",
+    )
+    parser.add_argument("--stop", action="store_true", help="Stop the build server")
+    args, build_argv = parser.parse_known_args(argv)
+    if args.stop:
+        message = {"stop": True}
+    else:
+        message = {"argv": build_argv, "cwd": os.getcwd()}
+    try:
+        answer = request(args.socket, message)
+    except (OSError, ValueError) as error:
+        print(f"No build server on {args.socket}: {error}", file=sys.stderr)
+        return 2
+    sys.stdout.write(answer["output"])
+    return answer["status"]
+
+
+if __name__ == "__main__":
+    sys.exit(client_main())
@@ -0,0 +1,97 @@
+"""This module contains the build dependency graph.
+
+The manifest's page entries are the output -> input edges: every page
+records its markdown source, the template files it resolved to, the
+basepath and the images it references, each with the fingerprint it was
+built with. A page is dirty
+when one of those fingerprints changed, so an edit only rebuilds the pages
+that depend on it. Links are recorded too; they don't change a page's
+output, but tell which pages point at a removed one."""
+
+import hashlib
+import os
+from collections import defaultdict
+
+from manifest import BuildManifest
+from utils import extract_markdown_images, extract_markdown_links
+
+def template_input(path: str) -> str:
+    """Returns the graph input id of a template file"""
+    return f"template:{os.path.abspath(path)}"
+
+
+def image_input(url: str) -> str:
+    """Returns the graph input id of an image URL"""
+    return f"image:{url}"
+
+
+def link_input(url: str) -> str:
+    """Returns the graph input id of a link URL"""
+    return f"link:{url}"
+
+
+def page_fingerprint(from_path: str, images=None) -> tuple[str, dict]:
+    """
+    Hashes a page's source and collects the edges of the page besides its
+    template, in one read of the file: its source path, the images it shows
+    with their current fingerprints, and the links it has.
+
+    Args:
+        from_path (str): Path to the source markdown file.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+
+    Returns:
+        tuple[str, dict]: SHA-256 of the source, and the entries to record in
+        the page's manifest entry
+    """
+    digest = hashlib.sha256()
+    image_urls = set()
+    links = set()
+    with open(from_path, "rb") as file:
+        for raw_line in file:
+            digest.update(raw_line)
+            if b"](" not in raw_line:
+                continue
+            line = raw_line.decode("utf-8")
+            image_urls.update(url for _, url in extract_markdown_images(line))
+            links.update(url for _, url in extract_markdown_links(line))
+    references = {
+        "source_path": from_path.replace(os.sep, "/"),
+        "images": {
+            url: None if images is None else images.fingerprint(url)
+            for url in sorted(image_urls)
+        },
+        "links": sorted(links),
+    }
+    return digest.hexdigest(), references
+
+
+class DependencyGraph:
+    """The input -> output edges of the last build, i.e. the reverse of the
+    edges its manifest records. Input ids are a source path, or
+    template_input(path), image_input(url) and link_input(url)."""
+
+    def __init__(self, manifest: BuildManifest):
+        self.manifest = manifest
+        self._dependents = defaultdict(set)
+        for key, entry in manifest.pages.items():
+            for path in entry.get("template_files", []):
+                self._dependents[template_input(path)].add(key)
+            if "source_path" in entry:
+                self._dependents[entry["source_path"]].add(key)
+            for url in entry.get("images", {}):
+                self._dependents[image_input(url)].add(key)
+            for url in entry.get("links", []):
+                self._dependents[link_input(url)].add(key)
+
+    def sources(self, input_id: str) -> list[str]:
+        """Returns the source paths of the pages built from an input
+
+        Args:
+            input_id (str): Input id, e.g. image_input('/images/logo.png')
+        """
+        return sorted(
+            self.manifest.pages[key]["source_path"]
+            for key in self._dependents.get(input_id, ())
+            if "source_path" in self.manifest.pages[key]
+        )
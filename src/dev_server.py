@@ -0,0 +1,249 @@
+"""This module contains the development server, which renders pages on
+demand instead of building the site first.
+
+A request URL is mapped to its markdown source, which is rendered on the
+first request and kept in memory until the file or the template changes.
+Other URLs are streamed from the static directory with sendfile. Every
+response carries a strong ETag, so a browser revalidating an unchanged
+page or file gets a 304 Not Modified."""
+
+import hashlib
+import mimetypes
+import os
+import posixpath
+import threading
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from generate_page import render_page_file
+from images import ImageCatalog
+from progress import VERBOSE, get_reporter
+from template import CompiledTemplate, template_path_for
+
+DEFAULT_PORT = 8888
+HTML_TYPE = "text/html; charset=utf-8"
+
+
+class RenderedPage:
+    """A page rendered in memory, with what it was rendered from"""
+
+    __slots__ = ("key", "body", "etag")
+
+    def __init__(self, key: tuple, body: bytes):
+        self.key = key
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class PageRenderer:
+    """Renders the pages of a content directory on request and caches them
+    by source path. A cached page is reused while the source's size and
+    mtime and the digest of its template, with its includes and the
+    templates it extends, are those it was rendered from."""
+
+    def __init__(
+        self,
+        content_dir: str,
+        template_path: str,
+        basepath: str = "/",
+        images: ImageCatalog | None = None,
+    ):
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.basepath = basepath
+        self.images = images
+        self.renders = 0
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def source_for(self, path: str) -> str | None:
+        """
+        Returns the markdown file a page path is rendered from, e.g.
+        'blog/tom/' -> '<content>/blog/tom/index.md' and 'about.html' ->
+        '<content>/about.md', or None when there is none.
+
+        Args:
+            path (str): URL path below the basepath, without its leading '/'
+        """
+        if path == "" or path.endswith("/"):
+            name = path + "index.md"
+        elif path.endswith(".html"):
+            name = path[: -len(".html")] + ".md"
+        else:
+            return None
+        from_path = os.path.join(self.content_dir, *name.split("/"))
+        return from_path if os.path.isfile(from_path) else None
+
+    def render(self, from_path: str) -> RenderedPage:
+        """
+        Returns the page rendered from a markdown file, rendering it only if
+        the file or the template changed since it was last rendered.
+
+        Args:
+            from_path (str): Path to the source markdown file.
+        """
+        template_path = template_path_for(from_path, self.content_dir, self.template_path)
+        template = CompiledTemplate.load(template_path, self.basepath)
+        stat = os.stat(from_path)
+        key = (stat.st_size, stat.st_mtime_ns, template.digest)
+        page = self._pages.get(from_path)
+        if page is not None and page.key == key:
+            return page
+        page = RenderedPage(key, render_page_file(from_path, template, self.images))
+        with self._lock:
+            self._pages[from_path] = page
+            self.renders += 1
+        return page
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Returns the ETag of a static file from its size and mtime"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+class DevServer(ThreadingHTTPServer):
+    """HTTP server for development, rendering pages on demand"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        content_dir: str,
+        static_dir: str,
+        template_path: str,
+        basepath: str = "/",
+        images: ImageCatalog | None = None,
+    ):
+        self.static_dir = static_dir
+        self.basepath = basepath
+        self.renderer = PageRenderer(content_dir, template_path, basepath, images)
+        super().__init__(address, DevRequestHandler)
+
+
+class DevRequestHandler(BaseHTTPRequestHandler):
+    """Answers GET and HEAD requests of a DevServer"""
+
+    server: DevServer
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serves a page or static file"""
+        self._serve(send_body=True)
+
+    def do_HEAD(self):  # pylint: disable=invalid-name
+        """Serves the headers of a page or static file"""
+        self._serve(send_body=False)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        reporter = get_reporter()
+        reporter.report(None, format % args, VERBOSE)
+        reporter.flush()
+
+    def _site_path(self) -> str | None:
+        """Returns the requested path below the basepath, without its leading
+        '/', or None when it is outside the basepath or leaves the site"""
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if not path.startswith(self.server.basepath):
+            return None
+        path = path[len(self.server.basepath) :]
+        if ".." in path.split("/") or "\0" in path:
+            return None
+        return path
+
+    def _serve(self, send_body: bool):
+        path = self._site_path()
+        if path is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        from_path = self.server.renderer.source_for(path)
+        if from_path is not None:
+            self._serve_page(from_path, send_body)
+            return
+        parts = posixpath.normpath(path).split("/")
+        static_path = os.path.join(self.server.static_dir, *parts)
+        if path and os.path.isfile(static_path):
+            self._serve_file(static_path, send_body)
+            return
+        if self.server.renderer.source_for(path + "/") is not None:
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header("Location", self.server.basepath + path + "/")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_error(HTTPStatus.NOT_FOUND)
+
+    def _not_modified(self, etag: str) -> bool:
+        """Answers 304 if the client already has this version"""
+        tags = [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]
+        if etag not in tags:
+            return False
+        self.send_response(HTTPStatus.NOT_MODIFIED)
+        self.send_header("ETag", etag)
+        self.end_headers()
+        return True
+
+    def _send_headers(self, content_type: str, length: int, etag: str):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(length))
+        self.send_header("ETag", etag)
+        # Revalidate every time, so edits show up on reload
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+    def _serve_page(self, from_path: str, send_body: bool):
+        try:
+            page = self.server.renderer.render(from_path)
+        except ValueError as error:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, f"{from_path}: {error}")
+            return
+        if self._not_modified(page.etag):
+            return
+        self._send_headers(HTML_TYPE, len(page.body), page.etag)
+        if send_body:
+            self.wfile.write(page.body)
+
+    def _serve_file(self, static_path: str, send_body: bool):
+        with open(static_path, "rb") as file:
+            stat = os.fstat(file.fileno())
+            etag = file_etag(stat)
+            if self._not_modified(etag):
+                return
+            content_type = mimetypes.guess_type(static_path)[0] or "application/octet-stream"
+            self._send_headers(content_type, stat.st_size, etag)
+            if send_body:
+                self.wfile.flush()
+                # socket.sendfile uses os.sendfile, so the data never enters Python
+                self.connection.sendfile(file)
+
+
+def serve_dev(
+    content_dir: str,
+    static_dir: str,
+    template_path: str,
+    basepath: str = "/",
+    port: int = DEFAULT_PORT,
+    images: ImageCatalog | None = None,
+):
+    """
+    Serves the site, rendering pages on demand, until interrupted.
+
+    Args:
+        content_dir (str): Path to the content directory containing markdown files.
+        static_dir (str): Path to the static directory.
+        template_path (str): Path to the HTML template file.
+        basepath (str, optional): The base path for URLs. Defaults to "/".
+        port (int, optional): Port to listen on. Defaults to DEFAULT_PORT.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+    """
+    server = DevServer(
+        ("", port), content_dir, static_dir, template_path, basepath, images
+    )
+    print(f"Serving the site on http://localhost:{server.server_port}{basepath}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,67 +1,579 @@
 """This module generates a web page from markdown file"""
 
+import contextlib
+import io
+import itertools
+import json
 import os
 
-from utils import extract_title, markdown_to_html_node
+from block_cache import BlockCache
+from buildcache import BuildCache, cache_key
+from block_scanner import read_lines, split_front_matter
+from depgraph import page_fingerprint
+from html_writer import HTMLWriter
+from htmlnode import HTMLNode
+from images import ImageCatalog
+from manifest import BuildManifest, hash_bytes
+from progress import QUIET, VERBOSE, get_reporter
+from staging import replace_if_changed
+from targets import FanoutWriter, Target
+from template import CompiledTemplate, TemplateSet
+from tracing import StageTimer, active_tracer, now_us, span
+from utils import markdown_lines_to_html_node, split_title
 
 
-def generate_page(from_path: str, template_path: str, dest_path: str, basepath: str):
+def write_page(
+    from_path: str,
+    template: CompiledTemplate,
+    dest_path: str,
+    block_cache: BlockCache | None = None,
+    images: ImageCatalog | None = None,
+) -> str:
     """
-    Generates an HTML page from a markdown file and template.
+    Renders a markdown file and streams the resulting HTML to dest_path.
+
+    The markdown is read line by line and rendered one block at a time, so
+    memory stays bounded even for very large pages. The HTML goes to a
+    temporary file that replaces dest_path only once the page is complete,
+    and only if the HTML differs from what dest_path already holds.
 
     Args:
         from_path (str): Path to the source markdown file.
-        template_path (str): Path to the HTML template file.
+        template (CompiledTemplate): The compiled HTML template.
         dest_path (str): Path to the destination HTML file.
-        basepath (str): The base path for URLs.
+        block_cache (BlockCache, optional): Cache of rendered blocks. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+
+    Returns:
+        str: SHA-256 of the generated HTML
+    """
+    return _traced_write(from_path, template, [dest_path], None, block_cache, images)[0]
+
+
+def write_page_variants(
+    from_path: str,
+    template: CompiledTemplate,
+    outputs: list[tuple[str, str]],
+    block_cache: BlockCache | None = None,
+    images: ImageCatalog | None = None,
+) -> list[str]:
+    """
+    Renders a markdown file once and streams it to several destinations,
+    each with the root-relative URLs rewritten for its own basepath.
+
+    Args:
+        from_path (str): Path to the source markdown file.
+        template (CompiledTemplate): The HTML template, compiled for the basepath "/".
+        outputs (list[tuple[str, str]]): (destination path, basepath) pairs.
+        block_cache (BlockCache, optional): Cache of rendered blocks. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+
+    Raises:
+        ValueError: Raised when the template was compiled for another basepath
+
+    Returns:
+        list[str]: SHA-256 of the HTML written to each destination
+    """
+    if template.basepath != "/":
+        raise ValueError("variants need a template compiled for the basepath '/'")
+    dest_paths = [dest_path for dest_path, _ in outputs]
+    basepaths = [basepath for _, basepath in outputs]
+    return _traced_write(from_path, template, dest_paths, basepaths, block_cache, images)
+
+
+def _traced_write(
+    from_path: str,
+    template: CompiledTemplate,
+    dest_paths: list[str],
+    basepaths: list[str] | None,
+    block_cache: BlockCache | None,
+    images: ImageCatalog | None,
+) -> list[str]:
+    """Runs _write_page, recording its stages while tracing is on"""
+    tracer = active_tracer()
+    if tracer is None:
+        return _write_page(
+            from_path, template, dest_paths, basepaths, block_cache, images, None
+        )
+
+    start = now_us()
+    stages = StageTimer()
+    try:
+        return _write_page(
+            from_path, template, dest_paths, basepaths, block_cache, images, stages
+        )
+    finally:
+        stages.record(tracer, from_path, start, {"output": ", ".join(dest_paths)})
+
+
+def _write_page(
+    from_path: str,
+    template: CompiledTemplate,
+    dest_paths: list[str],
+    basepaths: list[str] | None,
+    block_cache: BlockCache | None,
+    images: ImageCatalog | None,
+    stages: StageTimer | None,
+) -> list[str]:
+    """Renders a page once and streams it to every destination, charging each
+    stage to stages if given. Without basepaths the template's own basepath
+    applies; with them, URLs are rewritten per destination."""
+    title, html_node = _parse_page(from_path, block_cache, images, stages)
+    return _stream_page(template, title, html_node, dest_paths, basepaths, stages)
+
+
+def _parse_page(
+    from_path: str,
+    block_cache: BlockCache | None,
+    images: ImageCatalog | None,
+    stages: StageTimer | None = None,
+) -> tuple[str, HTMLNode]:
+    """Returns the title of a markdown file and the lazily rendered root node
+    of its content"""
+    lines = read_lines(from_path)
+    if stages is not None:
+        lines = stages.iterate("read", lines)
+    meta, lines = split_front_matter(lines)
+    title = meta.get("title")
+    if not title:
+        title, lines = split_title(lines)
+    html_node = markdown_lines_to_html_node(lines, block_cache, images)
+    if stages is not None:
+        html_node.children = stages.iterate("parse", html_node.children)
+    return title, html_node
+
+
+def render_page_file(
+    from_path: str,
+    template: CompiledTemplate,
+    images: ImageCatalog | None = None,
+) -> bytes:
+    """
+    Renders a markdown file in memory, to the same HTML write_page writes.
+
+    Args:
+        from_path (str): Path to the source markdown file.
+        template (CompiledTemplate): The compiled HTML template.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+
+    Returns:
+        bytes: The HTML of the page
+    """
+    title, html_node = _parse_page(from_path, None, images)
+    buffer = io.BytesIO()
+    writer = HTMLWriter(buffer)
+    template.write(writer.write, title, html_node)
+    writer.flush()
+    return buffer.getvalue()
+
+
+def write_node_variants(
+    template: CompiledTemplate,
+    title: str,
+    content_node: HTMLNode,
+    outputs: list[tuple[str, str]],
+) -> list[str]:
+    """
+    Renders already built page content into the template and streams it to
+    several destinations, each with the root-relative URLs rewritten for its
+    own basepath. Used for pages without a markdown source.
+
+    Args:
+        template (CompiledTemplate): The HTML template, compiled for the basepath "/".
+        title (str): Page title.
+        content_node (HTMLNode): Root node of the page content.
+        outputs (list[tuple[str, str]]): (destination path, basepath) pairs.
+
+    Raises:
+        ValueError: Raised when the template was compiled for another basepath
+
+    Returns:
+        list[str]: SHA-256 of the HTML written to each destination
+    """
+    if template.basepath != "/":
+        raise ValueError("variants need a template compiled for the basepath '/'")
+    dest_paths = [dest_path for dest_path, _ in outputs]
+    basepaths = [basepath for _, basepath in outputs]
+    return _stream_page(template, title, content_node, dest_paths, basepaths, None)
+
+
+def _stream_page(
+    template: CompiledTemplate,
+    title: str,
+    html_node: HTMLNode,
+    dest_paths: list[str],
+    basepaths: list[str] | None,
+    stages: StageTimer | None,
+) -> list[str]:
+    """Streams a rendered page to every destination through temporary files,
+    replacing each destination whose HTML changed"""
+    for dest_path in dest_paths:
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+
+    tmp_paths = [f"{dest_path}.tmp" for dest_path in dest_paths]
+    writers = []
+    try:
+        with contextlib.ExitStack() as stack:
+            for tmp_path in tmp_paths:
+                file = stack.enter_context(open(tmp_path, "wb"))
+                writers.append(HTMLWriter(file if stages is None else stages.sink(file)))
+            if basepaths is None:
+                write = writers[0].write
+            else:
+                write = FanoutWriter(writers, basepaths).write
+            if stages is None:
+                template.write(write, title, html_node)
+            else:
+                stages.enter("template")
+                try:
+                    template.write(write, title, stages.node("render", html_node))
+                finally:
+                    stages.leave()
+            for writer in writers:
+                writer.flush()
+    except BaseException:
+        for tmp_path in tmp_paths:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        raise
+    for tmp_path, dest_path in zip(tmp_paths, dest_paths):
+        # An identical page keeps its mtime, so deploys see it as unchanged
+        replace_if_changed(tmp_path, dest_path)
+
+    return [writer.hexdigest() for writer in writers]
+
+
+def dest_path_for(from_path: str, dir_path_content: str, dest_dir_path: str) -> str:
+    """
+    Maps a markdown file in the content directory to its HTML output path.
+
+    Args:
+        from_path (str): Path to the source markdown file.
+        dir_path_content (str): Path to the content directory containing markdown files.
+        dest_dir_path (str): Path to the destination directory for generated HTML files.
+    """
+    relative_path = os.path.relpath(from_path, dir_path_content)
+    return os.path.join(dest_dir_path, os.path.splitext(relative_path)[0] + ".html")
+
+
+def generate_single_page(
+    from_path: str,
+    template: CompiledTemplate,
+    dest_path: str,
+    manifest: BuildManifest | None = None,
+    block_cache: BlockCache | None = None,
+    images: ImageCatalog | None = None,
+) -> str:
     """
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}")
+    Generates one page with an already compiled template and records it in
+    the manifest.
 
-    with open(from_path, "r", encoding="utf-8") as file:
-        markdown_content = file.read()
+    Args:
+        from_path (str): Path to the source markdown file.
+        template (CompiledTemplate): The compiled HTML template.
+        dest_path (str): Path to the destination HTML file.
+        manifest (BuildManifest, optional): Manifest recording the build. Defaults to None.
+        block_cache (BlockCache, optional): Cache of rendered blocks. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
 
-    with open(template_path, "r", encoding="utf-8") as file:
-        template_content = file.read()
+    Returns:
+        str: SHA-256 of the generated HTML
+    """
+    if manifest is not None:
+        source_hash, references = page_fingerprint(from_path, images)
+    output_hash = write_page(from_path, template, dest_path, block_cache, images)
+    if manifest is not None:
+        manifest.record_page(
+            dest_path,
+            source_hash,
+            template.digest,
+            template.basepath,
+            output_hash,
+            references,
+            template.files,
+        )
+    return output_hash
 
-    html_node = markdown_to_html_node(markdown_content)
-    html_content = html_node.to_html()
 
-    title = extract_title(markdown_content)
+def page_cache_key(
+    source_hash: str, template_hash: str, basepath: str, references: dict
+) -> str:
+    """Returns the build cache key of a page: its HTML is a function of the
+    source, the template, the basepath and the sizes of its images
+
+    Args:
+        source_hash (str): SHA-256 of the markdown source
+        template_hash (str): Digest of the compiled template
+        basepath (str): The base path for URLs
+        references (dict): The page's references, see page_fingerprint
+    """
+    images = json.dumps(references["images"], sort_keys=True)
+    return cache_key("page", source_hash, template_hash, basepath, images)
 
-    final_content = template_content.replace("{{ Title }}", title)
-    final_content = final_content.replace("{{ Content }}", html_content)
-    final_content = final_content.replace('href="/', f'href="{basepath}')
-    final_content = final_content.replace('src="/', f'src="{basepath}')
 
+def write_cached_page(data: bytes, dest_path: str) -> str:
+    """
+    Writes a page fetched from the build cache, replacing the destination
+    only if its HTML changed.
+
+    Args:
+        data (bytes): HTML of the page
+        dest_path (str): Path to the destination HTML file.
+
+    Returns:
+        str: SHA-256 of the HTML
+    """
     os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(data)
+    replace_if_changed(tmp_path, dest_path)
+    return hash_bytes(data)
+
+
+def discover_sources(dir_path_content: str) -> list[str]:
+    """
+    Finds every markdown file under the content directory.
+
+    Args:
+        dir_path_content (str): Path to the content directory containing markdown files.
+
+    Returns:
+        list[str]: Source paths in walk order
+    """
+    sources = []
+    for root, _, files in os.walk(dir_path_content):
+        for file in files:
+            if file.endswith(".md"):
+                sources.append(os.path.join(root, file))
+    return sources
+
+
+def discover_pages(dir_path_content: str, dest_dir_path: str) -> list[tuple[str, str]]:
+    """
+    Finds every markdown file under the content directory.
 
-    with open(dest_path, "w", encoding="utf-8") as file:
-        file.write(final_content)
+    Args:
+        dir_path_content (str): Path to the content directory containing markdown files.
+        dest_dir_path (str): Path to the destination directory for generated HTML files.
+
+    Returns:
+        list[tuple[str, str]]: (source path, destination path) pairs in walk order
+    """
+    return [
+        (from_path, dest_path_for(from_path, dir_path_content, dest_dir_path))
+        for from_path in discover_sources(dir_path_content)
+    ]
 
-    print(f"Page generated at {dest_path}")
+
+def _generate_pages_serial(
+    pages: list[tuple[str, CompiledTemplate, list[tuple[str, str]]]],
+    block_cache: BlockCache | None,
+    images: ImageCatalog | None,
+):
+    """Generates pages one at a time, yielding (dest path, output hash) pairs"""
+    reporter = get_reporter()
+    for from_path, template, outputs in pages:
+        dest_paths = [dest_path for dest_path, _ in outputs]
+        reporter.report(
+            None,
+            f"Generating page from {from_path} to {', '.join(dest_paths)} "
+            f"using {os.path.relpath(template.files[0])}",
+            VERBOSE,
+        )
+        hashes = write_page_variants(from_path, template, outputs, block_cache, images)
+        yield from zip(dest_paths, hashes)
 
 
 def generate_pages_recursive(
-    dir_path_content: str, template_path: str, dest_dir_path: str, basepath : str
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    basepath: str,
+    manifest: BuildManifest | None = None,
+    incremental: bool = False,
+    jobs: int = 1,
+    block_cache: BlockCache | None = None,
+    images: ImageCatalog | None = None,
+    explain: bool = False,
+    build_cache: BuildCache | None = None,
 ):
     """
     Recursively generates HTML pages from markdown files.
 
+    When a manifest is given, every generated page is recorded in it and the
+    output of pages whose markdown source no longer exists is removed. In
+    incremental mode, pages whose source, template, basepath and images are
+    unchanged since the last build (and whose output is intact) are skipped.
+
     Args:
         dir_path_content (str): Path to the content directory containing markdown files.
         template_path (str): Path to the HTML template file.
         dest_dir_path (str): Path to the destination directory for generated HTML files.
         basepath (str): The base path for URLs.
+        manifest (BuildManifest, optional): Manifest recording the build. Defaults to None.
+        incremental (bool, optional): Skip unchanged pages. Defaults to False.
+        jobs (int, optional): Number of worker processes, 0 for one per CPU.
+            Defaults to 1 (serial).
+        block_cache (BlockCache, optional): Cache of rendered blocks. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+        explain (bool, optional): Report why each page is generated. Defaults to False.
+        build_cache (BuildCache, optional): Shared cache of generated pages. Defaults to None.
     """
-    for root, _, files in os.walk(dir_path_content):
-        for file in files:
-            if file.endswith(".md"):
-                from_path = os.path.join(root, file)
-                relative_path = os.path.relpath(from_path, dir_path_content)
-                dest_path = os.path.join(
-                    dest_dir_path, os.path.splitext(relative_path)[0] + ".html"
-                )
-
-                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-                generate_page(from_path, template_path, dest_path, basepath)
-                print(f"Generated page: {dest_path}")
+    generate_pages_for_targets(
+        dir_path_content,
+        template_path,
+        [Target(basepath, dest_dir_path, manifest)],
+        incremental=incremental,
+        jobs=jobs,
+        block_cache=block_cache,
+        images=images,
+        explain=explain,
+        build_cache=build_cache,
+    )
+
+
+def generate_pages_for_targets(
+    dir_path_content: str,
+    template_path: str,
+    targets: list[Target],
+    incremental: bool = False,
+    jobs: int = 1,
+    block_cache: BlockCache | None = None,
+    images: ImageCatalog | None = None,
+    explain: bool = False,
+    build_cache: BuildCache | None = None,
+    pool=None,
+):
+    """
+    Recursively generates HTML pages from markdown files for every target.
+
+    Each page is parsed and rendered once and streamed to all targets that
+    need it, with URLs rewritten for each target's basepath. Pages use the
+    nearest _template.html of their content directory, or template_path, see
+    template_path_for. Manifests, incremental skipping and stale page removal
+    work per target as in generate_pages_recursive. With a build cache, a page
+    another build already generated from the same inputs is fetched instead
+    of rendered, and rendered pages are stored in it.
+
+    Args:
+        dir_path_content (str): Path to the content directory containing markdown files.
+        template_path (str): Path to the site's HTML template file.
+        targets (list[Target]): Output directories and their basepaths.
+        incremental (bool, optional): Skip unchanged pages. Defaults to False.
+        jobs (int, optional): Number of worker processes, 0 for one per CPU.
+            Defaults to 1 (serial).
+        block_cache (BlockCache, optional): Cache of rendered blocks. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+        explain (bool, optional): Report why each page is generated. Defaults to False.
+        build_cache (BuildCache, optional): Shared cache of generated pages. Defaults to None.
+        pool (WorkerPool, optional): Worker processes kept across builds. Defaults to None.
+    """
+    reporter = get_reporter()
+    try:
+        templates = TemplateSet(dir_path_content, template_path)
+        with span("template", path=template_path):
+            templates.for_directory(dir_path_content)
+        with span("discover", content=dir_path_content):
+            sources = discover_sources(dir_path_content)
+        hashing = build_cache is not None or any(
+            target.manifest is not None for target in targets
+        )
+        source_hashes = {}
+        target_of = {}
+        source_of = {}
+        references = {}
+        cache_keys = {}
+        fetched = []
+        pending = []
+
+        with span("check manifest", pages=len(sources), targets=len(targets)):
+            for from_path in sources:
+                source_hash = None
+                if hashing:
+                    # One read of the source for its hash and its references
+                    source_hash, references[from_path] = page_fingerprint(
+                        from_path, images
+                    )
+                template = templates.for_source(from_path)
+                template_hash = template.digest
+                outputs = []
+                for target in targets:
+                    dest_path = dest_path_for(from_path, dir_path_content, target.dest_dir)
+                    if target.manifest is not None:
+                        reasons = []
+                        if incremental or explain:
+                            reasons = target.manifest.page_changes(
+                                dest_path,
+                                source_hash,
+                                template_hash,
+                                target.basepath,
+                                images,
+                            )
+                        if incremental and not reasons:
+                            reporter.report(
+                                "skipped", f"Skipped unchanged page: {dest_path}"
+                            )
+                            continue
+                        if explain:
+                            why = ", ".join(reasons) or "unchanged, not an incremental build"
+                            reporter.report(None, f"Rebuilding {dest_path}: {why}", QUIET)
+                        source_hashes[dest_path] = source_hash
+                    target_of[dest_path] = target
+                    source_of[dest_path] = from_path
+                    if build_cache is not None:
+                        key = page_cache_key(
+                            source_hash, template_hash, target.basepath, references[from_path]
+                        )
+                        data = build_cache.get(key)
+                        if data is not None:
+                            fetched.append((dest_path, write_cached_page(data, dest_path)))
+                            continue
+                        cache_keys[dest_path] = key
+                    outputs.append((dest_path, target.basepath))
+                if outputs:
+                    pending.append((from_path, template, outputs))
+
+        if jobs != 1 and len(pending) > 1:
+            # Imported here as the parallel engine itself builds on this module
+            from parallel import generate_pages_parallel  # pylint: disable=import-outside-toplevel
+
+            results = generate_pages_parallel(pending, jobs, block_cache, images, pool)
+        else:
+            results = _generate_pages_serial(pending, block_cache, images)
+
+        fetched_paths = {dest_path for dest_path, _ in fetched}
+        with span("generate", pages=len(pending), jobs=jobs):
+            for dest_path, output_hash in itertools.chain(fetched, results):
+                target = target_of[dest_path]
+                if target.manifest is not None:
+                    from_path = source_of[dest_path]
+                    template = templates.for_source(from_path)
+                    target.manifest.record_page(
+                        dest_path,
+                        source_hashes[dest_path],
+                        template.digest,
+                        target.basepath,
+                        output_hash,
+                        references[from_path],
+                        template.files,
+                    )
+                if dest_path in fetched_paths:
+                    reporter.report("fetched", f"Fetched page from cache: {dest_path}")
+                    continue
+                if dest_path in cache_keys:
+                    with open(dest_path, "rb") as file:
+                        build_cache.put(cache_keys[dest_path], file.read())
+                reporter.report("generated", f"Generated page: {dest_path}")
+
+        for target in targets:
+            if target.manifest is None:
+                continue
+            dest_paths = (
+                dest_path_for(from_path, dir_path_content, target.dest_dir)
+                for from_path in sources
+            )
+            for dest_path in target.manifest.remove_stale_pages(dest_paths):
+                reporter.report("removed_page", f"Removed stale page: {dest_path}")
+    finally:
+        reporter.flush()
@@ -0,0 +1,50 @@
+"""This module contains the buffered writer HTML is streamed through"""
+
+import hashlib
+import io
+
+DEFAULT_BUFFER_SIZE = 1 << 16
+
+
+class HTMLWriter:
+    """Collects HTML fragments and flushes them to a sink in large chunks.
+
+    The sink can be a text file, a binary file or a socket. Everything
+    written is also hashed, so callers get the output digest for free.
+    """
+
+    def __init__(self, sink, encoding="utf-8", buffer_size=DEFAULT_BUFFER_SIZE):
+        self.sink = sink
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self._fragments = []
+        self._buffered = 0
+        self._digest = hashlib.sha256()
+        self._text_sink = isinstance(sink, io.TextIOBase)
+        self._send = getattr(sink, "sendall", None) or sink.write
+
+    def write(self, fragment: str):
+        """Buffers an HTML fragment, flushing when the buffer is full
+
+        Args:
+            fragment (str): HTML fragment
+        """
+        self._fragments.append(fragment)
+        self._buffered += len(fragment)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered fragments to the sink"""
+        if not self._fragments:
+            return
+        chunk = "".join(self._fragments)
+        self._fragments.clear()
+        self._buffered = 0
+        data = chunk.encode(self.encoding)
+        self._digest.update(data)
+        self._send(chunk if self._text_sink else data)
+
+    def hexdigest(self) -> str:
+        """Returns the SHA-256 of everything flushed so far"""
+        return self._digest.hexdigest()
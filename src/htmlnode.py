@@ -4,6 +4,8 @@
 class HTMLNode:
     """Class file for HTML Node objects"""
 
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -12,14 +14,22 @@ class HTMLNode:
 
     def to_html(self):
         """Converts to HTML"""
+        fragments = []
+        self.write_html(fragments.append)
+        return "".join(fragments)
+
+    def write_html(self, write):
+        """Streams the HTML of the node as fragments
+
+        Args:
+            write (Callable[[str], Any]): Called with each HTML fragment in order,
+                e.g. list.append, a text file's write or HTMLWriter.write
+        """
         raise NotImplementedError
 
     def props_to_html(self):
         """Converts properties from dictionary to tag string"""
-        html_tag = ""
-        for key, value in self.props.items():
-            html_tag = html_tag + f' {key}="{value}"'
-        return html_tag
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
 
     def __eq__(self, node_two):
         """Checks for equivalence of two HTML nodes
@@ -0,0 +1,353 @@
+"""This module contains the image stage: intrinsic dimensions for image tags
+and lossless PNG recompression"""
+
+import hashlib
+import json
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from buildcache import GENERATOR_VERSION, BuildCache, cache_key
+from manifest import hash_file
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+CHUNK_HEADER = struct.Struct(">I4s")
+
+# Ancillary chunks that change how a PNG looks or how large it is shown;
+# every other one is metadata. Critical chunks (uppercase first letter) are
+# always kept.
+RENDERING_CHUNKS = frozenset(
+    {b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT", b"pHYs"}
+)
+
+# Animation control chunk of an APNG, whose frames live in fdAT chunks
+ANIMATION_CHUNK = b"acTL"
+
+# Attributes added to every image tag
+LAZY_PROPS = {"loading": "lazy", "decoding": "async"}
+
+
+def image_cache_path_for(dest_dir: str) -> str:
+    """Returns the image cache directory kept next to an output directory,
+    e.g. 'docs' -> 'docs.image-cache'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".image-cache"
+
+
+def png_dimensions(path: str) -> tuple[int, int] | None:
+    """Reads the width and height from the IHDR chunk of a PNG file
+
+    Args:
+        path (str): Image file path
+
+    Returns:
+        tuple[int, int] | None: (width, height), or None if it isn't a PNG
+    """
+    try:
+        with open(path, "rb") as file:
+            header = file.read(24)
+    except OSError:
+        return None
+    if not header.startswith(PNG_SIGNATURE) or header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+def read_chunks(data: bytes) -> list[tuple[bytes, bytes]]:
+    """Splits PNG data into its chunks
+
+    Args:
+        data (bytes): PNG file contents
+
+    Raises:
+        ValueError: Raised when the data isn't a well formed PNG
+
+    Returns:
+        list[tuple[bytes, bytes]]: (chunk type, chunk data) pairs
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset < len(data):
+        if offset + CHUNK_HEADER.size > len(data):
+            raise ValueError("truncated PNG chunk")
+        length, chunk_type = CHUNK_HEADER.unpack_from(data, offset)
+        start = offset + CHUNK_HEADER.size
+        end = start + length
+        if end + 4 > len(data):
+            raise ValueError("truncated PNG chunk")
+        chunks.append((chunk_type, data[start:end]))
+        offset = end + 4
+        if chunk_type == b"IEND":
+            break
+    return chunks
+
+
+def _chunk(chunk_type: bytes, body: bytes) -> bytes:
+    crc = zlib.crc32(body, zlib.crc32(chunk_type))
+    return CHUNK_HEADER.pack(len(body), chunk_type) + body + struct.pack(">I", crc)
+
+
+def _deflate(raw: bytes, strategy: int) -> bytes:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+    return compressor.compress(raw) + compressor.flush()
+
+
+def optimize_png(data: bytes) -> bytes:
+    """
+    Losslessly shrinks a PNG: metadata chunks are dropped, chunks that affect
+    rendering are kept, and the image data is recompressed at the highest
+    zlib level with the better of two strategies. Row filters are unchanged.
+    Animated PNGs are returned as they are.
+
+    Args:
+        data (bytes): PNG file contents
+
+    Raises:
+        ValueError: Raised when the data isn't a well formed PNG
+
+    Returns:
+        bytes: The smaller of the optimized and the original PNG
+    """
+    chunks = read_chunks(data)
+    if any(chunk_type == ANIMATION_CHUNK for chunk_type, _ in chunks):
+        return data
+    compressed = b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT")
+    try:
+        raw = zlib.decompress(compressed)
+    except zlib.error as error:
+        raise ValueError(f"corrupt PNG image data: {error}") from error
+    strategies = (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED)
+    idat = min((_deflate(raw, strategy) for strategy in strategies), key=len)
+
+    parts = [PNG_SIGNATURE]
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            if idat is not None:
+                parts.append(_chunk(b"IDAT", idat))
+                idat = None
+        elif chunk_type[0:1].isupper() or chunk_type in RENDERING_CHUNKS:
+            parts.append(_chunk(chunk_type, body))
+    optimized = b"".join(parts)
+    return optimized if len(optimized) < len(data) else data
+
+
+class ImageCatalog:
+    """Intrinsic dimensions of the PNG images of the static directory, by URL"""
+
+    def __init__(self, dimensions: dict[str, tuple[int, int]] | None = None):
+        self.dimensions = dimensions or {}
+        self.digest = self._digest()
+
+    def _digest(self) -> str:
+        encoded = json.dumps(sorted(self.dimensions.items())).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    @classmethod
+    def scan(cls, static_dir: str):
+        """Reads the dimensions of every PNG under static_dir
+
+        Args:
+            static_dir (str): Static directory, served at the site root
+        """
+        dimensions = {}
+        for path in find_pngs(static_dir):
+            size = png_dimensions(path)
+            if size is not None:
+                url = "/" + os.path.relpath(path, static_dir).replace(os.sep, "/")
+                dimensions[url] = size
+        return cls(dimensions)
+
+    def update(self, static_dir: str, path: str) -> str:
+        """Rereads the size of one image under static_dir, e.g. after an edit
+
+        Args:
+            static_dir (str): Static directory, served at the site root
+            path (str): Image file path, which may no longer exist
+
+        Returns:
+            str: The image's URL
+        """
+        url = "/" + os.path.relpath(path, static_dir).replace(os.sep, "/")
+        size = png_dimensions(path)
+        if size is None:
+            self.dimensions.pop(url, None)
+        else:
+            self.dimensions[url] = size
+        self.digest = self._digest()
+        return url
+
+    def size_of(self, url: str) -> tuple[int, int] | None:
+        """Returns the intrinsic size of the image at a URL, if known
+
+        Args:
+            url (str): Image URL as written in the markdown
+        """
+        return self.dimensions.get(url.split("?", 1)[0].split("#", 1)[0])
+
+    def fingerprint(self, url: str) -> str:
+        """Returns what the tag of the image at url depends on in this catalog,
+        e.g. '40x30', or '' when its size is unknown
+
+        Args:
+            url (str): Image URL as written in the markdown
+        """
+        size = self.size_of(url)
+        return "" if size is None else f"{size[0]}x{size[1]}"
+
+    def props(self, url: str) -> dict[str, str]:
+        """Returns the extra attributes of an image tag: its intrinsic size
+        when known, and lazy loading and async decoding
+
+        Args:
+            url (str): Image URL as written in the markdown
+        """
+        size = self.size_of(url)
+        if size is None:
+            return dict(LAZY_PROPS)
+        width, height = size
+        return {"width": str(width), "height": str(height), **LAZY_PROPS}
+
+
+def _optimize_file(src_file: str, cached_file: str):
+    with open(src_file, "rb") as file:
+        data = file.read()
+    try:
+        data = optimize_png(data)
+    except ValueError:
+        # Not something we can parse; it is published unchanged
+        pass
+    tmp_file = f"{cached_file}.tmp"
+    with open(tmp_file, "wb") as file:
+        file.write(data)
+    os.replace(tmp_file, cached_file)
+
+
+class ImageOptimizer:
+    """Optimizes PNGs into a cache directory keyed by content hash, so each
+    distinct image is recompressed once. Work runs on a thread pool, as zlib
+    releases the GIL while compressing. With a build cache, images missing
+    locally are fetched from it before being optimized, and optimized ones
+    are stored in it."""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        jobs: int | None = None,
+        build_cache: BuildCache | None = None,
+    ):
+        self.cache_dir = cache_dir
+        self.jobs = jobs
+        self.build_cache = build_cache
+        self.index_path = os.path.join(cache_dir, "index.json")
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _content_hash(self, src_file: str, index: dict) -> str:
+        """Returns the hash of a file, reusing the indexed one while its size
+        and mtime are unchanged"""
+        stat = os.stat(src_file)
+        entry = index.get(src_file)
+        if entry is not None and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return entry[2]
+        content_hash = hash_file(src_file)
+        index[src_file] = [stat.st_size, stat.st_mtime_ns, content_hash]
+        return content_hash
+
+    def _cache_key(self, cached_file: str) -> str:
+        # The key carries the generator version itself
+        content_hash = os.path.basename(cached_file).split("-", 1)[0]
+        return cache_key("png", content_hash)
+
+    def _fetch(self, cached_file: str) -> bool:
+        """Copies an optimized image from the build cache, if it has it"""
+        if self.build_cache is None:
+            return False
+        data = self.build_cache.get(self._cache_key(cached_file))
+        if data is None:
+            return False
+        tmp_path = f"{cached_file}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, cached_file)
+        return True
+
+    def optimize(self, src_files: list[str], prune: bool = True) -> dict[str, str]:
+        """
+        Optimizes the given PNGs, reusing cached results. Cache entries of
+        images no longer given are removed, unless prune is False.
+
+        Args:
+            src_files (list[str]): PNG file paths.
+            prune (bool, optional): Remove the cache entries of other images,
+                i.e. src_files are all the site's PNGs. Defaults to True.
+
+        Returns:
+            dict[str, str]: Optimized file path by source file path
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        index = self._load_index()
+        optimized = {}
+        missing = {}
+        for src_file in src_files:
+            # Versioned, so images optimized by an older generator are redone
+            content_hash = self._content_hash(src_file, index)
+            cached_file = os.path.join(
+                self.cache_dir, f"{content_hash}-{GENERATOR_VERSION}.png"
+            )
+            optimized[src_file] = cached_file
+            if not os.path.exists(cached_file) and not self._fetch(cached_file):
+                missing[cached_file] = src_file
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = [
+                    executor.submit(_optimize_file, src_file, cached_file)
+                    for cached_file, src_file in missing.items()
+                ]
+                for future in futures:
+                    future.result()
+            if self.build_cache is not None:
+                for cached_file in missing:
+                    with open(cached_file, "rb") as file:
+                        self.build_cache.put(self._cache_key(cached_file), file.read())
+
+        if prune:
+            index = {path: entry for path, entry in index.items() if path in optimized}
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(index, file)
+        os.replace(tmp_path, self.index_path)
+        if not prune:
+            return optimized
+
+        keep = set(optimized.values()) | {self.index_path}
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if path not in keep:
+                os.remove(path)
+        return optimized
+
+
+def find_pngs(static_dir: str) -> list[str]:
+    """Returns the paths of the PNG files under static_dir
+
+    Args:
+        static_dir (str): Static directory path
+    """
+    return [
+        os.path.join(root, file)
+        for root, _, files in os.walk(static_dir)
+        for file in files
+        if file.lower().endswith(".png")
+    ]
@@ -10,8 +10,13 @@ class LeafNode(HTMLNode):
         HTMLNode (HTMLNode): All leaf nodes are HTML Nodes
     """
 
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, None, props)
+        self.tag = tag
+        self.value = value
+        self.children = None
+        self.props = props
 
     def __eq__(self, node_two):
         """Checks for equivalence of two Leaf nodes
@@ -31,14 +36,11 @@ class LeafNode(HTMLNode):
     def to_html(self):
         if self.value is None:
             raise ValueError("all leaf nodes must have a value")
-        else:
-            if self.tag is None:
-                return self.value
-            else:
-                props_string = ""
-                if self.props is not None:
-                    for key, value in self.props.items():
-                        props_string = props_string + f' {key}="{value}"'
-                tag_string = f"<{self.tag}{props_string}>"
-                html_string = f"{tag_string}{self.value}</{self.tag}>"
-                return html_string
+        if self.tag is None:
+            return self.value
+        if self.props:
+            return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+        return f"<{self.tag}>{self.value}</{self.tag}>"
+
+    def write_html(self, write):
+        write(self.to_html())
@@ -0,0 +1,273 @@
+"""This module contains the generated section listings: paginated index pages
+linking to the pages of each content directory.
+
+Listings are built from the site catalog, never from page bodies. Every
+listing page is recorded in the manifest with a digest of exactly what it
+shows, so a change to one post only regenerates the listing pages that
+contain it."""
+
+import html
+import json
+import os
+
+from catalog import PageInfo, SiteCatalog
+from generate_page import write_node_variants
+from leafnode import LeafNode
+from manifest import hash_bytes
+from parentnode import ParentNode
+from progress import QUIET, get_reporter
+from targets import Target
+from template import CompiledTemplate, TemplateSet
+from tracing import span
+
+DEFAULT_PAGE_SIZE = 20
+
+# Listing pages after the first live under <section>/page/<n>/
+PAGE_DIR = "page"
+
+# Front matter key listings are sorted by, newest first
+ORDER_KEY = "date"
+
+
+def section_of(path: str) -> str | None:
+    """Returns the section a page is listed in: the directory holding it,
+    or holding its directory for an index.md. None for a section's own index.
+
+    Args:
+        path (str): Page path relative to the content directory, e.g. 'blog/tom/index.md'
+    """
+    directory, name = os.path.split(path)
+    if name == "index.md":
+        if not directory:
+            return None
+        return os.path.dirname(directory)
+    return directory
+
+
+def listing_key(section: str, number: int, has_index: bool) -> str:
+    """Returns the output path, relative to the output directory, of a
+    listing page. The first page is the section's index unless the section
+    has its own index.md.
+
+    Args:
+        section (str): Section directory, '' for the site root.
+        number (int): Page number, starting at 1.
+        has_index (bool): Whether the section has its own index.md.
+    """
+    prefix = f"{section}/" if section else ""
+    if number == 1 and not has_index:
+        return f"{prefix}index.html"
+    return f"{prefix}{PAGE_DIR}/{number}/index.html"
+
+
+def _escape(text: str) -> str:
+    return html.escape(text, quote=False)
+
+
+def _url_of(key: str) -> str:
+    return "/" + key[: -len("index.html")]
+
+
+class ListingPage:
+    """One page of a section listing"""
+
+    def __init__(
+        self,
+        section: str,
+        key: str,
+        title: str,
+        entries: list[PageInfo],
+        newer: str | None,
+        older: str | None,
+    ):
+        self.section = section
+        self.key = key
+        self.title = title
+        self.entries = entries
+        self.newer = newer
+        self.older = older
+        shown = [title, newer, older, [[page.title, page.url()] for page in entries]]
+        self.digest = hash_bytes(json.dumps(shown).encode("utf-8"))
+
+    def content_node(self) -> ParentNode:
+        """Returns the HTML of the listing, with root-relative URLs"""
+        items = [
+            ParentNode(
+                "li",
+                [LeafNode("a", _escape(page.title or page.path), {"href": page.url()})],
+            )
+            for page in self.entries
+        ]
+        children = [LeafNode("h1", _escape(self.title)), ParentNode("ul", items)]
+        links = []
+        if self.newer is not None:
+            links.append(LeafNode("a", "Newer", {"href": self.newer}))
+        if self.older is not None:
+            links.append(LeafNode("a", "Older", {"href": self.older}))
+        if links:
+            children.append(ParentNode("nav", links))
+        return ParentNode("div", children)
+
+
+def build_listings(
+    catalog: SiteCatalog, page_size: int = DEFAULT_PAGE_SIZE
+) -> list[ListingPage]:
+    """
+    Splits the pages of every section into listing pages, newest first by
+    their 'date' front matter.
+
+    Args:
+        catalog (SiteCatalog): Refreshed catalog of the content directory.
+        page_size (int, optional): Pages per listing page. Defaults to DEFAULT_PAGE_SIZE.
+
+    Raises:
+        ValueError: Raised when page_size isn't positive
+
+    Returns:
+        list[ListingPage]: Every listing page of the site
+    """
+    if page_size < 1:
+        raise ValueError(f"listing page size must be positive, got {page_size}")
+    sections = {}
+    for page in catalog.pages(order_by=ORDER_KEY, descending=True):
+        section = section_of(page.path)
+        if section is not None:
+            sections.setdefault(section, []).append(page)
+
+    listings = []
+    for section in sorted(sections):
+        pages = sections[section]
+        index = catalog.get(f"{section}/index.md" if section else "index.md")
+        if index is not None and index.title:
+            title = index.title
+        else:
+            title = os.path.basename(section).replace("-", " ").capitalize() or "Pages"
+        count = (len(pages) + page_size - 1) // page_size
+        keys = [
+            listing_key(section, number, index is not None)
+            for number in range(1, count + 1)
+        ]
+        for number, key in enumerate(keys, start=1):
+            listings.append(
+                ListingPage(
+                    section,
+                    key,
+                    title if number == 1 else f"{title} (page {number})",
+                    pages[(number - 1) * page_size : number * page_size],
+                    _url_of(keys[number - 2]) if number > 1 else None,
+                    _url_of(keys[number]) if number < count else None,
+                )
+            )
+    return listings
+
+
+class ListingGenerator:
+    """Writes the listing pages of every section, sourced from the catalog,
+    each with the template of its section's pages"""
+
+    def __init__(
+        self,
+        catalog: SiteCatalog,
+        template_path: str,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ):
+        self.catalog = catalog
+        self.template_path = template_path
+        self.page_size = page_size
+
+    def generate(
+        self, targets: list[Target], incremental: bool = False, explain: bool = False
+    ):
+        """
+        Refreshes the catalog and writes the listing pages of every section to
+        every target. Listing pages of a previous build that no longer exist
+        are removed.
+
+        Args:
+            targets (list[Target]): Output directories and their basepaths.
+            incremental (bool, optional): Skip unchanged listing pages. Defaults to False.
+            explain (bool, optional): Report why each listing page is generated.
+                Defaults to False.
+        """
+        reporter = get_reporter()
+        with span("listings"):
+            self.catalog.refresh()
+            templates = TemplateSet(self.catalog.content_dir, self.template_path)
+            listings = build_listings(self.catalog, self.page_size)
+            for listing in listings:
+                directory = os.path.join(self.catalog.content_dir, listing.section)
+                template = templates.for_directory(directory)
+                outputs = self._outputs(listing, template, targets, incremental, explain)
+                if outputs:
+                    self._write(listing, template, outputs)
+            self._remove_stale(targets, {listing.key for listing in listings})
+        reporter.flush()
+
+    def _outputs(
+        self,
+        listing: ListingPage,
+        template: CompiledTemplate,
+        targets: list[Target],
+        incremental: bool,
+        explain: bool,
+    ) -> list[tuple[Target, str]]:
+        """Returns the targets a listing page needs writing to, and its path in each"""
+        reporter = get_reporter()
+        outputs = []
+        for target in targets:
+            dest_path = os.path.join(target.dest_dir, *listing.key.split("/"))
+            if target.manifest is not None and (incremental or explain):
+                reasons = target.manifest.page_changes(
+                    dest_path, listing.digest, template.digest, target.basepath
+                )
+                if incremental and not reasons:
+                    reporter.report("skipped", f"Skipped unchanged listing: {dest_path}")
+                    continue
+                if explain:
+                    why = ", ".join(reasons) or "unchanged, not an incremental build"
+                    reporter.report(None, f"Rebuilding {dest_path}: {why}", QUIET)
+            outputs.append((target, dest_path))
+        return outputs
+
+    def _write(
+        self,
+        listing: ListingPage,
+        template: CompiledTemplate,
+        outputs: list[tuple[Target, str]],
+    ):
+        """Renders a listing page once for all its outputs and records them"""
+        reporter = get_reporter()
+        hashes = write_node_variants(
+            template,
+            listing.title,
+            listing.content_node(),
+            [(dest_path, target.basepath) for target, dest_path in outputs],
+        )
+        for (target, dest_path), output_hash in zip(outputs, hashes):
+            if target.manifest is not None:
+                target.manifest.record_page(
+                    dest_path,
+                    listing.digest,
+                    template.digest,
+                    target.basepath,
+                    output_hash,
+                    {"listing": True},
+                    template.files,
+                )
+            reporter.report("generated", f"Generated listing: {dest_path}")
+
+    def _remove_stale(self, targets: list[Target], keys: set[str]):
+        """Removes the recorded listing pages that are not in keys"""
+        reporter = get_reporter()
+        for target in targets:
+            if target.manifest is None:
+                continue
+            stale = [
+                key
+                for key, entry in target.manifest.pages.items()
+                if entry.get("listing") and key not in keys
+            ]
+            for key in stale:
+                dest_path = os.path.join(target.dest_dir, *key.split("/"))
+                target.manifest.remove_page(dest_path)
+                reporter.report("removed_page", f"Removed stale listing: {dest_path}")
@@ -1,16 +1,460 @@
 """Main module of the project"""
 
-import sys
+import argparse
+import contextlib
+import io
+import os
+import time
 
-from copy_directory import copy_directory_recursive
-from generate_page import generate_pages_recursive
+from block_cache import BlockCache, block_cache_path_for
+from buildcache import BuildCache
+from catalog import SiteCatalog, catalog_path_for
+from compress import ENCODINGS, Compressor, compress_index_path_for
+from copy_directory import LINK_MODES, copy_directory_recursive
+from daemon import BuildServer, socket_path_for
+from dev_server import DEFAULT_PORT, serve_dev
+from generate_page import discover_pages, generate_pages_for_targets
+from images import ImageCatalog, ImageOptimizer, find_pngs, image_cache_path_for
+from listings import DEFAULT_PAGE_SIZE, ListingGenerator
+from manifest import BuildManifest, manifest_path_for
+from parallel import WorkerPool
+from progress import NORMAL, QUIET, VERBOSE, ProgressReporter, set_reporter
+from search import SearchIndex, search_state_path_for
+from staging import discard_staging, prepare_staging, swap_in
+from targets import Target, parse_target
+from tracing import span, start_tracing, stop_tracing
+from watch import Rebuilder, watch
+
+
+def parse_args(argv=None):
+    """Parses the command line arguments"""
+    parser = argparse.ArgumentParser(description="Generates the static site")
+    parser.add_argument(
+        "basepath", nargs="?", default="/", help="The base path for URLs"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip pages whose source, template and basepath are unchanged",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes generating pages, 0 for one per CPU",
+    )
+    parser.add_argument(
+        "--link-mode",
+        choices=LINK_MODES,
+        default="copy",
+        help="How static files are placed in the output: copied, hardlinked "
+        "(outputs then share storage with static/) or reflinked",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="Compare static files by content instead of size and mtime",
+    )
+    parser.add_argument(
+        "--block-cache",
+        action="store_true",
+        help="Reuse rendered markdown blocks cached across builds",
+    )
+    parser.add_argument(
+        "--block-cache-size",
+        type=int,
+        default=64,
+        help="Size cap of the block cache in MiB",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="Print why each page is generated: which of its inputs changed",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="After building, keep rebuilding whatever content, static files "
+        "or the template change",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Stay running and build on request from src/daemon.py, keeping "
+        "the template, caches and worker processes warm between builds",
+    )
+    parser.add_argument(
+        "--dev-server",
+        action="store_true",
+        help="Serve the site without building it, rendering each page when it "
+        "is first requested and again once it changes",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port of the development server. Defaults to {DEFAULT_PORT}",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Unix socket the build server listens on. Defaults to the output "
+        "directory's path with .sock appended",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Watch by polling file stats instead of using inotify",
+    )
+    parser.add_argument(
+        "--optimize-images",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Give image tags their intrinsic size and lazy loading, and publish "
+        "losslessly recompressed PNGs",
+    )
+    parser.add_argument(
+        "--listings",
+        action="store_true",
+        help="Generate paginated listing pages of every content directory",
+    )
+    parser.add_argument(
+        "--listing-page-size",
+        type=int,
+        default=DEFAULT_PAGE_SIZE,
+        help="Number of pages per listing page",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="Write a sharded full-text search index of the pages to search/",
+    )
+    parser.add_argument(
+        "--compress",
+        action="append",
+        choices=sorted(ENCODINGS),
+        metavar="ENCODING",
+        help="Write precompressed sidecars of HTML, CSS and SVG outputs in this "
+        f"encoding ({', '.join(sorted(ENCODINGS))}); repeatable. Without it, the "
+        "sidecars of earlier builds are removed",
+    )
+    parser.add_argument(
+        "--build-cache",
+        metavar="LOCATION",
+        help="Fetch generated pages and optimized images from, and store them in, "
+        "a shared cache: a directory, a .tar.gz file or an http:// URL",
+    )
+    parser.add_argument(
+        "--staging",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Build in a sibling directory that atomically replaces the output "
+        "once complete, so the output is never half written",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write a Chrome trace of the build, per page and per stage, to PATH",
+    )
+    verbosity = parser.add_mutually_exclusive_group()
+    verbosity.add_argument(
+        "-q", "--quiet", action="store_true", help="Print nothing but problems"
+    )
+    verbosity.add_argument(
+        "-v", "--verbose", action="store_true", help="Also print every page as it starts"
+    )
+    parser.add_argument(
+        "--target",
+        action="append",
+        type=parse_target,
+        metavar="BASEPATH:OUTDIR",
+        help="Also emit the site to OUTDIR with URLs under BASEPATH; repeatable. "
+        "Pages are rendered once for all targets. Replaces the basepath and docs/",
+    )
+    args = parser.parse_args(argv)
+    if args.target is None:
+        args.target = [Target(args.basepath, "docs")]
+    dest_dirs = [os.path.normpath(target.dest_dir) for target in args.target]
+    if len(set(dest_dirs)) != len(dest_dirs):
+        parser.error("every --target needs its own output directory")
+    args.compress = args.compress or []
+    if args.listing_page_size < 1:
+        parser.error("--listing-page-size must be at least 1")
+    if args.watch and len(args.target) > 1:
+        parser.error("--watch supports a single target")
+    if sum((args.watch, args.serve, args.dev_server)) > 1:
+        parser.error("--watch, --serve and --dev-server are exclusive")
+    return args
+
+
+class BuildSession:
+    """State kept between the builds of one process: the block cache, the
+    site catalog and the worker pool. A build server keeps one session, so
+    its builds find them loaded and warm."""
+
+    def __init__(self):
+        self.block_cache = None
+        self.catalog = None
+        self.pool = WorkerPool()
+        self.images = None
+        self.optimizer = None
+        self.listings = None
+
+    def block_cache_for(self, path: str, max_bytes: int) -> BlockCache:
+        """Returns the block cache stored at path, loading it only once"""
+        if self.block_cache is None or (
+            self.block_cache.path,
+            self.block_cache.max_bytes,
+        ) != (path, max_bytes):
+            self.block_cache = BlockCache.load(path, max_bytes)
+        return self.block_cache
+
+    def catalog_for(self, content_dir: str, path: str) -> SiteCatalog:
+        """Returns the site catalog stored at path, opening it only once"""
+        if self.catalog is None or (self.catalog.content_dir, self.catalog.path) != (
+            content_dir,
+            path,
+        ):
+            if self.catalog is not None:
+                self.catalog.close()
+            self.catalog = SiteCatalog(content_dir, path)
+        return self.catalog
+
+    def close(self):
+        """Stops the workers and closes the catalog"""
+        self.pool.shutdown()
+        if self.catalog is not None:
+            self.catalog.close()
+            self.catalog = None
+
+
+def build(args, session: BuildSession) -> list[Target]:
+    """
+    Builds the site as the parsed command line asks.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments, see parse_args.
+        session (BuildSession): State kept between builds.
+
+    Returns:
+        list[Target]: The built targets, with their manifests
+    """
+    start = time.perf_counter()
+    level = QUIET if args.quiet else VERBOSE if args.verbose else NORMAL
+    reporter = ProgressReporter(level)
+    set_reporter(reporter)
+    tracer = start_tracing() if args.trace else None
+
+    targets = args.target
+    # Caches and manifests live next to the output, never in the staging copy
+    output_dirs = [target.dest_dir for target in targets]
+    build_cache = None
+    try:
+        if args.staging:
+            with span("prepare staging"):
+                for target, output_dir in zip(targets, output_dirs):
+                    target.dest_dir = prepare_staging(target.dest_dir)
+                    # Report paths as they are once swapped in
+                    reporter.alias_path(target.dest_dir, os.path.normpath(output_dir))
+        with span("load manifest"):
+            for target, output_dir in zip(targets, output_dirs):
+                target.manifest = BuildManifest.load(
+                    target.dest_dir, manifest_path_for(output_dir)
+                )
+        block_cache = None
+        if args.block_cache:
+            with span("load block cache"):
+                block_cache = session.block_cache_for(
+                    block_cache_path_for(output_dirs[0]), args.block_cache_size * 2**20
+                )
+        if args.build_cache:
+            with span("open build cache"):
+                build_cache = BuildCache.open(args.build_cache)
+        images = None
+        optimizer = None
+        replacements = None
+        if args.optimize_images:
+            with span("images"):
+                images = ImageCatalog.scan("static")
+                optimizer = ImageOptimizer(
+                    image_cache_path_for(output_dirs[0]), build_cache=build_cache
+                )
+                replacements = optimizer.optimize(find_pngs("static"))
+        session.images = images
+        session.optimizer = optimizer
+        with span("copy static"):
+            for target in targets:
+                copy_directory_recursive(
+                    "static",
+                    target.dest_dir,
+                    target.manifest,
+                    link_mode=args.link_mode,
+                    checksum=args.checksum,
+                    replacements=replacements,
+                )
+        generate_pages_for_targets(
+            "content",
+            "template.html",
+            targets,
+            incremental=args.incremental,
+            jobs=args.jobs,
+            block_cache=block_cache,
+            images=images,
+            explain=args.explain,
+            build_cache=build_cache,
+            pool=session.pool,
+        )
+        session.listings = None
+        if args.listings:
+            session.listings = ListingGenerator(
+                session.catalog_for("content", catalog_path_for(output_dirs[0])),
+                "template.html",
+                args.listing_page_size,
+            )
+            session.listings.generate(
+                targets, incremental=args.incremental, explain=args.explain
+            )
+        search_indexes = []
+        if args.search_index:
+            with span("search index"):
+                for target, output_dir in zip(targets, output_dirs):
+                    search_index = SearchIndex(
+                        target.dest_dir,
+                        target.basepath,
+                        state_path=search_state_path_for(output_dir),
+                    )
+                    indexed = search_index.update(
+                        discover_pages("content", target.dest_dir),
+                        target.manifest.source_hashes(),
+                    )
+                    search_indexes.append(search_index)
+                    reporter.report(None, f"Indexed {indexed} page(s) for search", VERBOSE)
+        with span("compress"):
+            for target, output_dir in zip(targets, output_dirs):
+                index_path = compress_index_path_for(output_dir)
+                compressor = Compressor(target.dest_dir, args.compress, index_path=index_path)
+                if args.compress:
+                    compressor.compress()
+                else:
+                    # Sidecars left by earlier builds would serve stale pages
+                    compressor.clear()
+        if args.staging:
+            with span("swap in"):
+                for target, output_dir in zip(targets, output_dirs):
+                    swap_in(target.dest_dir, output_dir)
+                    target.dest_dir = target.manifest.dest_dir = output_dir
+        with span("save manifest"):
+            for target in targets:
+                target.manifest.save()
+            # Only now are the shards these describe live
+            for search_index in search_indexes:
+                search_index.save()
+            if block_cache is not None:
+                block_cache.save()
+        if build_cache is not None:
+            with span("save build cache"):
+                build_cache.save()
+            reporter.report(
+                None,
+                f"Build cache: {build_cache.hits} hit(s), {build_cache.misses} miss(es)",
+                VERBOSE,
+            )
+
+        elapsed = (time.perf_counter() - start) * 1000
+        reporter.report(None, f"{reporter.summary()} in {elapsed:.1f} ms")
+        reporter.flush()
+        if tracer is not None:
+            tracer.save(args.trace)
+    finally:
+        # A failed build leaves neither tracing on, its build cache open nor
+        # its staging copy behind
+        stop_tracing()
+        if build_cache is not None:
+            build_cache.close()
+        for target, output_dir in zip(targets, output_dirs):
+            if target.dest_dir != output_dir:
+                discard_staging(target.dest_dir)
+                target.dest_dir = output_dir
+    return targets
+
+
+def serve(args):
+    """Builds on request from the socket until stopped, keeping a session warm"""
+    session = BuildSession()
+
+    def handle(argv: list[str]) -> tuple[int, str]:
+        output = io.StringIO()
+        status = 0
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                build_args = parse_args(argv)
+                if build_args.watch or build_args.serve or build_args.dev_server:
+                    raise ValueError("a build server only runs builds")
+                build(build_args, session)
+            except SystemExit as error:
+                # Raised by argparse for invalid arguments and --help
+                status = error.code if isinstance(error.code, int) else 1
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                print(f"Build failed: {type(error).__name__}: {error}")
+                status = 1
+        return status, output.getvalue()
+
+    server = BuildServer(args.socket or socket_path_for(args.target[0].dest_dir), handle)
+    server.bind()
+    print(f"Serving builds on {server.socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        session.close()
 
 
 def main():
     """Main function"""
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
-    copy_directory_recursive("static", "docs")
-    generate_pages_recursive("content", "template.html", "docs", basepath)
+    args = parse_args()
+    if args.serve:
+        serve(args)
+        return
+    if args.dev_server:
+        serve_dev(
+            "content",
+            "static",
+            "template.html",
+            args.target[0].basepath,
+            args.port,
+            ImageCatalog.scan("static") if args.optimize_images else None,
+        )
+        return
+    session = BuildSession()
+    try:
+        targets = build(args, session)
+        if args.watch:
+            rebuilder = Rebuilder(
+                "content",
+                "static",
+                "template.html",
+                targets[0].dest_dir,
+                targets[0].basepath,
+                targets[0].manifest,
+                link_mode=args.link_mode,
+                jobs=args.jobs,
+                block_cache=session.block_cache,
+                images=session.images,
+                listings=session.listings,
+                search_index=(
+                    SearchIndex(targets[0].dest_dir, targets[0].basepath)
+                    if args.search_index
+                    else None
+                ),
+                compressor=(
+                    Compressor(targets[0].dest_dir, args.compress) if args.compress else None
+                ),
+                optimizer=session.optimizer,
+            )
+            watch(rebuilder, polling=args.poll)
+    finally:
+        session.close()
 
 
-main()
+if __name__ == "__main__":
+    main()
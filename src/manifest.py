@@ -0,0 +1,247 @@
+"""This module contains the build manifest used for incremental builds"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    """Returns the hex encoded SHA-256 digest of the given bytes
+
+    Args:
+        data (bytes): Input bytes
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    """Returns the hex encoded SHA-256 digest of a file's contents
+
+    Args:
+        path (str): Path to the file
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_path_for(dest_dir: str) -> str:
+    """Returns the manifest path kept next to an output directory,
+    e.g. 'docs' -> 'docs.manifest.json'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".manifest.json"
+
+
+class BuildManifest:
+    """Records the inputs and output of every generated page, and every synced
+    static asset, so that unchanged files can be skipped on the next build"""
+
+    def __init__(
+        self,
+        path: str,
+        dest_dir: str,
+        pages: dict | None = None,
+        assets: list | None = None,
+    ):
+        self.path = path
+        self.dest_dir = dest_dir
+        self.pages = pages if pages is not None else {}
+        self.assets = assets if assets is not None else []
+
+    @classmethod
+    def load(cls, dest_dir: str, path: str | None = None):
+        """Loads the manifest for an output directory. A missing, unreadable or
+        outdated manifest results in an empty one, i.e. a full build.
+
+        Args:
+            dest_dir (str): Output directory the manifest describes.
+            path (str, optional): Manifest file path. Defaults to one next to dest_dir.
+        """
+        path = path or manifest_path_for(dest_dir)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cls(path, dest_dir)
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls(path, dest_dir)
+        return cls(path, dest_dir, data.get("pages", {}), data.get("assets", []))
+
+    def save(self):
+        """Writes the manifest to disk atomically"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "pages": self.pages,
+                    "assets": self.assets,
+                },
+                file,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+
+    def _key(self, dest_path: str) -> str:
+        return os.path.relpath(dest_path, self.dest_dir).replace(os.sep, "/")
+
+    def page_changes(
+        self,
+        dest_path: str,
+        source_hash: str,
+        template_hash: str,
+        basepath: str,
+        images=None,
+    ) -> list[str]:
+        """Lists why a page needs to be generated again: the recorded inputs
+        that differ from the given ones, or an output that is no longer the
+        one that was written.
+
+        Args:
+            dest_path (str): Path to the generated HTML file.
+            source_hash (str): Hash of the markdown source.
+            template_hash (str): Hash of the template.
+            basepath (str): The base path for URLs.
+            images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+
+        Returns:
+            list[str]: Reasons, empty if the page is up to date
+        """
+        entry = self.pages.get(self._key(dest_path))
+        if entry is None:
+            return ["not built before"]
+
+        reasons = []
+        if entry["source"] != source_hash:
+            reasons.append(f"{entry.get('source_path', 'source')} changed")
+        if entry["template"] != template_hash:
+            template_files = entry.get("template_files")
+            if template_files:
+                reasons.append(f"template {os.path.relpath(template_files[0])} changed")
+            else:
+                reasons.append("template changed")
+        if entry["basepath"] != basepath:
+            reasons.append(f"basepath changed from {entry['basepath']}")
+        for url, fingerprint in entry.get("images", {}).items():
+            current = None if images is None else images.fingerprint(url)
+            if current != fingerprint:
+                reasons.append(f"image {url} changed")
+        if reasons:
+            return reasons
+
+        try:
+            stat = os.stat(dest_path)
+        except OSError:
+            return ["output missing"]
+        if stat.st_size != entry["size"]:
+            return ["output modified"]
+        if stat.st_mtime_ns == entry["mtime_ns"]:
+            return []
+        if hash_file(dest_path) != entry["output"]:
+            return ["output modified"]
+        return []
+
+    def record_page(
+        self,
+        dest_path: str,
+        source_hash: str,
+        template_hash: str,
+        basepath: str,
+        output_hash: str,
+        references: dict | None = None,
+        template_files: list[str] | None = None,
+    ):
+        """Records the inputs and output of a freshly generated page
+
+        Args:
+            dest_path (str): Path to the generated HTML file.
+            source_hash (str): Hash of the markdown source.
+            template_hash (str): Hash of the template.
+            basepath (str): The base path for URLs.
+            output_hash (str): Hash of the written HTML.
+            references (dict, optional): Source path, images and links of the
+                page, see depgraph.page_fingerprint. Defaults to None.
+            template_files (list[str], optional): Files the page's template was
+                resolved from, its own first. Defaults to None.
+        """
+        stat = os.stat(dest_path)
+        entry = {
+            "source": source_hash,
+            "template": template_hash,
+            "basepath": basepath,
+            "output": output_hash,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        if references is not None:
+            entry.update(references)
+        if template_files:
+            entry["template_files"] = [path.replace(os.sep, "/") for path in template_files]
+        self.pages[self._key(dest_path)] = entry
+
+    def source_hashes(self) -> dict[str, str]:
+        """Returns the recorded source hash of every page, by destination path"""
+        return {
+            os.path.join(self.dest_dir, *key.split("/")): entry["source"]
+            for key, entry in self.pages.items()
+            if "source" in entry
+        }
+
+    def remove_page(self, dest_path: str) -> bool:
+        """Deletes a page's output and forgets it
+
+        Args:
+            dest_path (str): Path to the generated HTML file.
+
+        Returns:
+            bool: True if the page was recorded
+        """
+        recorded = self.pages.pop(self._key(dest_path), None) is not None
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+            remove_empty_parents(os.path.dirname(dest_path), self.dest_dir)
+        return recorded
+
+    def remove_stale_pages(self, current_dest_paths) -> list[str]:
+        """Deletes the output of every recorded page that is not part of the
+        current build, i.e. whose markdown source was deleted. Generated
+        listings are left to the listing stage.
+
+        Args:
+            current_dest_paths (Iterable[str]): Paths of the pages generated by this build.
+
+        Returns:
+            list[str]: Paths of the removed outputs
+        """
+        current = {self._key(path) for path in current_dest_paths}
+        removed = []
+        stale = [
+            key
+            for key, entry in self.pages.items()
+            if key not in current and not entry.get("listing")
+        ]
+        for key in stale:
+            dest_path = os.path.join(self.dest_dir, *key.split("/"))
+            self.remove_page(dest_path)
+            removed.append(dest_path)
+        return removed
+
+
+def remove_empty_parents(directory: str, stop_dir: str):
+    """Removes empty directories from directory upwards, stopping at stop_dir"""
+    stop_dir = os.path.abspath(stop_dir)
+    directory = os.path.abspath(directory)
+    while directory != stop_dir and directory.startswith(stop_dir + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
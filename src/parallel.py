@@ -0,0 +1,208 @@
+"""This module contains the process pool engine for generating pages in parallel"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from block_cache import BlockCache
+from generate_page import write_page_variants
+from images import ImageCatalog
+from template import CompiledTemplate
+from tracing import active_tracer, span, start_tracing
+
+MAX_BATCH_SIZE = 64
+
+
+class BuildError(Exception):
+    """Raised when one or more pages fail to generate
+
+    Args:
+        Exception (Exception): Base class Exception
+    """
+
+    def __init__(self, failures: list[tuple[str, str]]):
+        self.failures = failures
+        details = "\n".join(f"  {path}: {error}" for path, error in failures)
+        super().__init__(f"{len(failures)} page(s) failed to generate:\n{details}")
+
+
+def resolve_jobs(jobs: int) -> int:
+    """Returns the number of worker processes to use, 0 meaning one per CPU
+
+    Args:
+        jobs (int): Requested number of jobs
+    """
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def batch_size_for(page_count: int, jobs: int) -> int:
+    """Picks a batch size giving each worker several batches, so that
+    uneven page sizes still balance out, without paying IPC per page.
+
+    Args:
+        page_count (int): Number of pages to generate.
+        jobs (int): Number of worker processes.
+    """
+    return max(1, min(MAX_BATCH_SIZE, page_count // (jobs * 4)))
+
+
+# Block cache and image catalog of the worker process, set up by _init_worker
+_worker_block_cache = None
+_worker_images = None
+
+
+def _init_worker(
+    cache_path: str | None,
+    max_bytes: int | None,
+    trace: bool,
+    images: ImageCatalog | None,
+):
+    """Worker initializer loading the persisted block cache once per process
+    and turning tracing on when the parent traces"""
+    global _worker_block_cache, _worker_images  # pylint: disable=global-statement
+    _worker_images = images
+    if trace:
+        start_tracing("worker")
+    if max_bytes is None:
+        _worker_block_cache = None
+    elif cache_path is None:
+        _worker_block_cache = BlockCache(None, max_bytes)
+    else:
+        _worker_block_cache = BlockCache.load(cache_path, max_bytes)
+    if _worker_block_cache is not None:
+        _worker_block_cache.track_new = True
+
+
+def _generate_batch(batch: list[tuple[str, CompiledTemplate, list[tuple[str, str]]]]):
+    """Worker entry point generating a batch of pages. Pages sharing a
+    template share one copy of it, as a batch is pickled as a whole.
+
+    Returns:
+        tuple[list, list, list, list, list]: (dest path, output hash) results, (source
+        path, error) failures, the blocks newly added to the worker's block cache, the
+        keys of the blocks it served and the trace events recorded for the batch
+    """
+    results = []
+    failures = []
+    with span("batch", pages=len(batch)):
+        for from_path, template, outputs in batch:
+            try:
+                hashes = write_page_variants(
+                    from_path, template, outputs, _worker_block_cache, _worker_images
+                )
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                failures.append((from_path, f"{type(error).__name__}: {error}"))
+                continue
+            results.extend(zip((dest_path for dest_path, _ in outputs), hashes))
+    new_entries = []
+    hit_keys = []
+    if _worker_block_cache is not None:
+        new_entries = _worker_block_cache.take_new_entries()
+        hit_keys = _worker_block_cache.take_hit_keys()
+    tracer = active_tracer()
+    events = tracer.take_events() if tracer is not None else []
+    return results, failures, new_entries, hit_keys, events
+
+
+class WorkerPool:
+    """A process pool kept across builds, so a long-lived build process
+    starts its workers, and warms their block caches, once. The workers are
+    replaced when the number of jobs or the state they start from changes."""
+
+    def __init__(self):
+        self._executor = None
+        self._key = None
+
+    def executor(self, jobs: int, initargs: tuple) -> ProcessPoolExecutor:
+        """Returns the pool for jobs workers initialized with initargs
+
+        Args:
+            jobs (int): Number of worker processes.
+            initargs (tuple): Arguments of _init_worker.
+        """
+        cache_path, max_bytes, trace, images = initargs
+        key = (jobs, cache_path, max_bytes, trace, images and images.digest)
+        if key != self._key:
+            self.shutdown()
+            self._executor = ProcessPoolExecutor(
+                max_workers=jobs, initializer=_init_worker, initargs=initargs
+            )
+            self._key = key
+        return self._executor
+
+    def shutdown(self):
+        """Stops the workers"""
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._executor = None
+        self._key = None
+
+
+def _run_batches(executor, batches, block_cache, tracer, failures):
+    """Submits the batches and yields their results as they complete"""
+    futures = [executor.submit(_generate_batch, batch) for batch in batches]
+    for future in as_completed(futures):
+        results, batch_failures, new_entries, hit_keys, events = future.result()
+        failures.extend(batch_failures)
+        if block_cache is not None:
+            block_cache.merge(new_entries, hit_keys)
+        if tracer is not None:
+            tracer.merge(events)
+        yield from results
+
+
+def generate_pages_parallel(
+    pages: list[tuple[str, CompiledTemplate, list[tuple[str, str]]]],
+    jobs: int,
+    block_cache: BlockCache | None = None,
+    images: ImageCatalog | None = None,
+    pool: WorkerPool | None = None,
+):
+    """
+    Generates pages on a process pool, handing them out in batches.
+
+    Yields the results of successful pages as batches complete. Failures are
+    collected from every batch and raised together once all work is done.
+
+    Args:
+        pages (list[tuple[str, CompiledTemplate, list[tuple[str, str]]]]): Source paths,
+            each with its template, compiled for the basepath "/", and the
+            (destination path, basepath) pairs it is written to.
+        jobs (int): Number of worker processes.
+        block_cache (BlockCache, optional): Cache of rendered blocks. Workers start
+            from its file and their new blocks are merged into it. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+        pool (WorkerPool, optional): Pool to reuse instead of starting workers
+            for this call only. Defaults to None.
+
+    Raises:
+        BuildError: Raised when any page failed to generate
+
+    Yields:
+        tuple[str, str]: Destination path and hash of each written HTML file
+    """
+    jobs = resolve_jobs(jobs)
+    size = batch_size_for(len(pages), jobs)
+    batches = [pages[i : i + size] for i in range(0, len(pages), size)]
+    failures = []
+
+    tracer = active_tracer()
+    if block_cache is None:
+        initargs = (None, None, tracer is not None, images)
+    else:
+        initargs = (block_cache.path, block_cache.max_bytes, tracer is not None, images)
+
+    if pool is not None:
+        executor = pool.executor(jobs, initargs)
+        yield from _run_batches(executor, batches, block_cache, tracer, failures)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(batches)),
+            initializer=_init_worker,
+            initargs=initargs,
+        ) as executor:
+            yield from _run_batches(executor, batches, block_cache, tracer, failures)
+
+    if failures:
+        raise BuildError(sorted(failures))
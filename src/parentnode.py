@@ -10,8 +10,13 @@ class ParentNode(HTMLNode):
         HTMLNode (HTMLNode): All parent nodes are HTML Nodes
     """
 
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, None, children, props)
+        self.tag = tag
+        self.value = None
+        self.children = children
+        self.props = props
 
     def __eq__(self, node_two):
         if (
@@ -23,13 +28,12 @@ class ParentNode(HTMLNode):
         else:
             return False
 
-    def to_html(self):
+    def write_html(self, write):
         if self.tag is None:
             raise ValueError("parent nodes must have a tag")
-        elif self.children is None:
+        if self.children is None:
             raise ValueError("parent nodes must have child nodes")
-        else:
-            children_string = ""
-            for child_node in self.children:
-                children_string = children_string + child_node.to_html()
-            return f"<{self.tag}>{children_string}</{self.tag}>"
+        write(f"<{self.tag}>")
+        for child_node in self.children:
+            child_node.write_html(write)
+        write(f"</{self.tag}>")
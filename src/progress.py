@@ -0,0 +1,93 @@
+"""This module contains the buffered progress reporter used instead of printing
+one line per file"""
+
+import sys
+from collections import Counter
+
+QUIET = 0
+NORMAL = 1
+VERBOSE = 2
+
+# Summary wording of the counted events, in display order
+SUMMARY_LABELS = {
+    "generated": "page(s) generated",
+    "fetched": "page(s) fetched from cache",
+    "skipped": "page(s) unchanged",
+    "removed_page": "stale page(s) removed",
+    "copied": "file(s) copied",
+    "removed_file": "stale file(s) removed",
+    "compressed": "file(s) compressed",
+}
+
+DEFAULT_BUFFER_LINES = 512
+
+
+class ProgressReporter:
+    """Counts build events and buffers their messages, writing them to
+    stdout in batches. A message is shown when the reporter's level is at
+    least the message's level."""
+
+    def __init__(self, level: int = NORMAL, buffer_lines: int = DEFAULT_BUFFER_LINES):
+        self.level = level
+        self.buffer_lines = buffer_lines
+        self.counts = Counter()
+        self.path_aliases = {}
+        self._lines = []
+
+    def alias_path(self, path: str, shown_as: str):
+        """Shows a path as another in messages, e.g. a staging directory as
+        the output directory it becomes
+
+        Args:
+            path (str): Path as written in messages.
+            shown_as (str): Path shown instead.
+        """
+        self.path_aliases[path] = shown_as
+
+    def report(self, event: str | None, message: str, level: int = NORMAL):
+        """Counts an event and buffers its message
+
+        Args:
+            event (str | None): Event counted in the summary, None for none.
+            message (str): Message shown at or above level.
+            level (int, optional): QUIET, NORMAL or VERBOSE. Defaults to NORMAL.
+        """
+        if event is not None:
+            self.counts[event] += 1
+        if self.level >= level:
+            for path, shown_as in self.path_aliases.items():
+                message = message.replace(path, shown_as)
+            self._lines.append(message)
+            if len(self._lines) >= self.buffer_lines:
+                self.flush()
+
+    def flush(self):
+        """Writes the buffered messages"""
+        if not self._lines:
+            return
+        sys.stdout.write("\n".join(self._lines) + "\n")
+        sys.stdout.flush()
+        self._lines.clear()
+
+    def summary(self) -> str:
+        """Returns one line summarizing the counted events"""
+        parts = [
+            f"{self.counts[event]} {label}"
+            for event, label in SUMMARY_LABELS.items()
+            if self.counts[event]
+        ]
+        return ", ".join(parts) or "Nothing to do"
+
+
+_reporter = ProgressReporter()
+
+
+def get_reporter() -> ProgressReporter:
+    """Returns the reporter build messages go to"""
+    return _reporter
+
+
+def set_reporter(reporter: ProgressReporter):
+    """Replaces the reporter build messages go to"""
+    global _reporter  # pylint: disable=global-statement
+    _reporter = reporter
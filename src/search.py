@@ -0,0 +1,314 @@
+"""This module contains the search index stage, which writes an inverted
+index of the site's pages under the output directory, split into shards
+so a client only loads the shards of the terms it looks up.
+
+Layout under <output>/search/:
+    meta.json   {"version", "shards", "docs": {id: [url, title]}}
+    <nn>.json   {term: postings} for the terms with crc32(term) % shards == nn,
+                postings being [id gap, term frequency, id gap, ...] with
+                ascending ids, each gap relative to the previous id (the
+                first to 0)
+
+Each page's terms are kept in a state file next to the output directory,
+so a build only tokenizes changed pages and only rewrites the shards that
+hold their old or new terms."""
+
+import json
+import os
+import re
+import shutil
+import zlib
+from collections import Counter, defaultdict
+
+from block_scanner import FENCE, read_lines, scan_blocks, split_front_matter
+from enums import TextType
+from manifest import hash_file
+from staging import replace_if_changed
+from utils import extract_title_from_lines, text_to_textnodes
+
+SEARCH_VERSION = 1
+SEARCH_DIR = "search"
+DEFAULT_SHARDS = 64
+TOKEN_PATTERN = re.compile(r"\w{2,}")
+
+# Text node types whose text is visible on the page
+INDEXED_TEXT_TYPES = (
+    TextType.TEXT,
+    TextType.BOLD,
+    TextType.ITALICS,
+    TextType.CODE,
+    TextType.LINK,
+)
+
+
+def search_state_path_for(dest_dir: str) -> str:
+    """Returns the search index state kept next to an output directory,
+    e.g. 'docs' -> 'docs.search.json'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".search.json"
+
+
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase terms of two or more word characters
+
+    Args:
+        text (str): Text to split
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def shard_of(term: str, shards: int) -> int:
+    """Returns the shard a term's postings are in
+
+    Args:
+        term (str): Index term
+        shards (int): Number of shards
+    """
+    return zlib.crc32(term.encode("utf-8")) % shards
+
+
+def _block_text(block: str) -> str:
+    """Returns the visible text of a markdown block"""
+    if block.startswith(FENCE):
+        return block.strip("`")
+    try:
+        nodes = text_to_textnodes(block)
+    except ValueError:
+        return block
+    return " ".join(node.text for node in nodes if node.text_type in INDEXED_TEXT_TYPES)
+
+
+def page_terms(from_path: str) -> Counter:
+    """Counts the terms of the text nodes of a markdown page
+
+    Args:
+        from_path (str): Path to the source markdown file
+
+    Returns:
+        Counter: Frequency by term
+    """
+    terms = Counter()
+    _, lines = split_front_matter(read_lines(from_path))
+    for block in scan_blocks(lines):
+        terms.update(tokenize(_block_text(block)))
+    return terms
+
+
+def encode_postings(postings: dict[int, int]) -> list[int]:
+    """Encodes {doc id: term frequency} as [id gap, frequency, ...]
+
+    Args:
+        postings (dict[int, int]): Term frequency by document id
+    """
+    encoded = []
+    previous = 0
+    for doc_id in sorted(postings):
+        encoded.extend((doc_id - previous, postings[doc_id]))
+        previous = doc_id
+    return encoded
+
+
+def decode_postings(encoded: list[int]) -> dict[int, int]:
+    """Decodes the output of encode_postings
+
+    Args:
+        encoded (list[int]): [id gap, frequency, ...]
+    """
+    postings = {}
+    doc_id = 0
+    for index in range(0, len(encoded), 2):
+        doc_id += encoded[index]
+        postings[doc_id] = encoded[index + 1]
+    return postings
+
+
+def page_url(dest_path: str, dest_dir: str, basepath: str) -> str:
+    """Returns the URL a generated page is served at, e.g. 'docs/blog/index.html'
+    with the basepath '/' -> '/blog/'
+
+    Args:
+        dest_path (str): Path to the generated HTML file.
+        dest_dir (str): Output directory path.
+        basepath (str): The base path for URLs.
+    """
+    key = os.path.relpath(dest_path, dest_dir).replace(os.sep, "/")
+    if key == "index.html" or key.endswith("/index.html"):
+        key = key[: -len("index.html")]
+    return basepath + key
+
+
+class SearchIndex:
+    """The sharded inverted index of one output directory"""
+
+    def __init__(
+        self,
+        dest_dir: str,
+        basepath: str = "/",
+        shards: int = DEFAULT_SHARDS,
+        state_path: str | None = None,
+    ):
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.shards = shards
+        self.state_path = state_path or search_state_path_for(dest_dir)
+        self.search_dir = os.path.join(dest_dir, SEARCH_DIR)
+        self.docs = {}
+        self.next_id = 1
+        self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return
+        if (
+            not isinstance(state, dict)
+            or state.get("version") != SEARCH_VERSION
+            or state.get("shards") != self.shards
+            or state.get("basepath") != self.basepath
+            or not os.path.isfile(os.path.join(self.search_dir, "meta.json"))
+        ):
+            # Rebuilt from scratch; every shard is rewritten
+            return
+        self.docs = state["docs"]
+        self.next_id = state["next_id"]
+
+    def save(self):
+        """Writes the index state to disk atomically. Saved only once the
+        shards written by update are live, e.g. after the staging swap, so a
+        failed build never records pages as indexed."""
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "version": SEARCH_VERSION,
+                    "shards": self.shards,
+                    "basepath": self.basepath,
+                    "next_id": self.next_id,
+                    "docs": self.docs,
+                },
+                file,
+            )
+        os.replace(tmp_path, self.state_path)
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.search_dir, f"{shard:02x}.json")
+
+    def _read_shard(self, shard: int) -> dict[str, dict[int, int]]:
+        try:
+            with open(self._shard_path(shard), "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return {term: decode_postings(encoded) for term, encoded in data.items()}
+
+    def _write_json(self, path: str, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(
+                data, file, ensure_ascii=False, separators=(",", ":"), sort_keys=True
+            )
+        replace_if_changed(tmp_path, path)
+
+    def update(
+        self, pages: list[tuple[str, str]], source_hashes: dict[str, str] | None = None
+    ) -> int:
+        """
+        Brings the index up to date with the given pages: changed and new
+        pages are tokenized again, pages no longer given are dropped, and
+        only the shards holding affected terms are rewritten. The state is
+        kept in memory until save.
+
+        Args:
+            pages (list[tuple[str, str]]): (source path, destination path) of
+                every page of the site.
+            source_hashes (dict[str, str], optional): Source hash by destination
+                path, e.g. from the build manifest. Sources missing from it are
+                hashed. Defaults to None.
+
+        Returns:
+            int: Number of pages indexed
+        """
+        fresh = not self.docs
+        changes = {}
+        current = set()
+        for from_path, dest_path in pages:
+            key = os.path.relpath(dest_path, self.dest_dir).replace(os.sep, "/")
+            current.add(key)
+            source_hash = (source_hashes or {}).get(dest_path) or hash_file(from_path)
+            doc = self.docs.get(key)
+            if doc is not None and doc["source"] == source_hash:
+                continue
+            meta, title_lines = split_front_matter(read_lines(from_path))
+            try:
+                title = meta.get("title") or extract_title_from_lines(title_lines)
+            except ValueError:
+                title = key
+            changes[key] = (
+                doc,
+                {
+                    "id": doc["id"] if doc is not None else None,
+                    "source": source_hash,
+                    "url": page_url(dest_path, self.dest_dir, self.basepath),
+                    "title": title,
+                    "terms": dict(page_terms(from_path)),
+                },
+            )
+        for key in set(self.docs) - current:
+            changes[key] = (self.docs[key], None)
+
+        if not changes and not fresh:
+            return 0
+
+        for key, (old, new) in changes.items():
+            if new is None:
+                del self.docs[key]
+                continue
+            if new["id"] is None:
+                new["id"] = self.next_id
+                self.next_id += 1
+            self.docs[key] = new
+
+        removals = defaultdict(list)
+        additions = defaultdict(list)
+        for old, new in changes.values():
+            if old is not None:
+                for term in old["terms"]:
+                    removals[shard_of(term, self.shards)].append((term, old["id"]))
+            if new is not None:
+                for term, frequency in new["terms"].items():
+                    shard = shard_of(term, self.shards)
+                    additions[shard].append((term, new["id"], frequency))
+
+        if fresh and os.path.isdir(self.search_dir):
+            shutil.rmtree(self.search_dir)
+        os.makedirs(self.search_dir, exist_ok=True)
+        shards = range(self.shards) if fresh else sorted(set(removals) | set(additions))
+        for shard in shards:
+            index = {} if fresh else self._read_shard(shard)
+            for term, doc_id in removals.get(shard, ()):
+                index.get(term, {}).pop(doc_id, None)
+            for term, doc_id, frequency in additions.get(shard, ()):
+                index.setdefault(term, {})[doc_id] = frequency
+            self._write_json(
+                self._shard_path(shard),
+                {
+                    term: encode_postings(postings)
+                    for term, postings in index.items()
+                    if postings
+                },
+            )
+
+        meta = {
+            "version": SEARCH_VERSION,
+            "shards": self.shards,
+            "docs": {
+                str(doc["id"]): [doc["url"], doc["title"]] for doc in self.docs.values()
+            },
+        }
+        self._write_json(os.path.join(self.search_dir, "meta.json"), meta)
+        return sum(1 for _, new in changes.values() if new is not None)
@@ -0,0 +1,136 @@
+"""This module contains the staging build: the site is built in a sibling of
+the output directory, which then replaces it in one atomic rename.
+
+The staging directory starts as a hardlinked clone of the output, so only
+what changes is written. This relies on every writer replacing files
+(write a temporary file, then os.replace) instead of modifying them in
+place, which would also modify the live output through the shared inode."""
+
+import ctypes
+import ctypes.util
+import filecmp
+import os
+import shutil
+
+# renameat2(2) constants
+AT_FDCWD = -100
+RENAME_EXCHANGE = 2
+
+
+def staging_path_for(dest_dir: str) -> str:
+    """Returns the staging directory of an output directory,
+    e.g. 'docs' -> 'docs.staging'
+
+    Args:
+        dest_dir (str): Output directory path
+    """
+    return os.path.normpath(dest_dir) + ".staging"
+
+
+def replace_if_changed(tmp_path: str, dest_path: str) -> bool:
+    """
+    Moves tmp_path over dest_path unless dest_path already has the same
+    bytes, in which case tmp_path is removed and dest_path keeps its mtime.
+
+    Args:
+        tmp_path (str): Freshly written file.
+        dest_path (str): File it replaces.
+
+    Returns:
+        bool: True if dest_path was replaced
+    """
+    try:
+        unchanged = filecmp.cmp(tmp_path, dest_path, shallow=False)
+    except OSError:
+        unchanged = False
+    if unchanged:
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, dest_path)
+    return True
+
+
+def prepare_staging(dest_dir: str) -> str:
+    """
+    Creates the staging directory of dest_dir as a hardlinked clone of it,
+    replacing whatever an interrupted build left behind.
+
+    Args:
+        dest_dir (str): Output directory path
+
+    Returns:
+        str: The staging directory path
+    """
+    staging_dir = staging_path_for(dest_dir)
+    if os.path.lexists(staging_dir):
+        shutil.rmtree(staging_dir)
+    if not os.path.isdir(dest_dir):
+        os.makedirs(staging_dir)
+        return staging_dir
+    try:
+        shutil.copytree(dest_dir, staging_dir, symlinks=True, copy_function=os.link)
+    except (OSError, shutil.Error):
+        # No hardlinks here; a full copy still keeps contents and mtimes
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        shutil.copytree(dest_dir, staging_dir, symlinks=True)
+    return staging_dir
+
+
+def discard_staging(staging_dir: str):
+    """Removes the staging directory of a build that was not swapped in
+
+    Args:
+        staging_dir (str): Staging directory path
+    """
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+
+def exchange(path_a: str, path_b: str):
+    """Atomically swaps two paths with renameat2(RENAME_EXCHANGE)
+
+    Args:
+        path_a (str): First path
+        path_b (str): Second path
+
+    Raises:
+        OSError: Raised when the kernel, filesystem or libc can't exchange
+    """
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        raise OSError("libc not found")
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    try:
+        renameat2 = libc.renameat2
+    except AttributeError as error:
+        raise OSError("renameat2 is not available") from error
+    result = renameat2(
+        AT_FDCWD, os.fsencode(path_a), AT_FDCWD, os.fsencode(path_b), RENAME_EXCHANGE
+    )
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno), path_a)
+
+
+def swap_in(staging_dir: str, dest_dir: str):
+    """
+    Puts the staging directory in place of dest_dir and removes the old
+    output. Where paths can't be exchanged atomically, the old output is
+    renamed away first, leaving dest_dir missing for an instant.
+
+    Args:
+        staging_dir (str): Fully built staging directory.
+        dest_dir (str): Output directory it replaces.
+    """
+    if not os.path.lexists(dest_dir):
+        os.rename(staging_dir, dest_dir)
+        return
+    try:
+        exchange(staging_dir, dest_dir)
+        old_dir = staging_dir
+    except OSError:
+        old_dir = os.path.normpath(dest_dir) + ".old"
+        if os.path.lexists(old_dir):
+            shutil.rmtree(old_dir)
+        os.rename(dest_dir, old_dir)
+        os.rename(staging_dir, dest_dir)
+    shutil.rmtree(old_dir)
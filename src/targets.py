@@ -0,0 +1,78 @@
+"""This module contains the output targets a build emits pages to, each an
+output directory with its own basepath"""
+
+import re
+
+from html_writer import HTMLWriter
+from manifest import BuildManifest
+from template import rewrite_urls
+
+URL_PATTERN = re.compile(r'(href="/|src="/)')
+
+
+class Target:
+    """An output directory and the basepath of the URLs in its pages"""
+
+    def __init__(
+        self, basepath: str, dest_dir: str, manifest: BuildManifest | None = None
+    ):
+        self.basepath = basepath
+        self.dest_dir = dest_dir
+        self.manifest = manifest
+
+    def __repr__(self):
+        return f"Target({self.basepath!r}, {self.dest_dir!r})"
+
+
+def parse_target(text: str) -> Target:
+    """Parses a target given as BASEPATH:OUTDIR, e.g. '/archive/v1/:dist/v1'
+
+    Args:
+        text (str): Target specification
+
+    Raises:
+        ValueError: Raised when the basepath or the output directory is missing
+    """
+    basepath, separator, dest_dir = text.partition(":")
+    if not separator or not basepath or not dest_dir:
+        raise ValueError(f"expected BASEPATH:OUTDIR, got {text!r}")
+    return Target(basepath, dest_dir)
+
+
+class FanoutWriter:
+    """Streams one rendering of a page to several writers, rewriting the
+    root-relative URLs for each writer's basepath.
+
+    The URL positions of a fragment are found once and each writer only
+    joins the pieces with its own prefixes, so N targets cost one parse and
+    render plus N cheap writes.
+    """
+
+    def __init__(self, writers: list[HTMLWriter], basepaths: list[str]):
+        self.writers = writers
+        self.basepaths = basepaths
+        self._prefixes = [
+            {'href="/': f'href="{basepath}', 'src="/': f'src="{basepath}'}
+            for basepath in basepaths
+        ]
+        if len(writers) == 1:
+            self.write = self._write_single
+
+    def _write_single(self, fragment: str):
+        self.writers[0].write(rewrite_urls(fragment, self.basepaths[0]))
+
+    def write(self, fragment: str):
+        """Writes a fragment to every writer
+
+        Args:
+            fragment (str): HTML fragment, rendered with root-relative URLs
+        """
+        if '="/' not in fragment:
+            for writer in self.writers:
+                writer.write(fragment)
+            return
+        parts = URL_PATTERN.split(fragment)
+        urls = parts[1::2]
+        for writer, prefixes in zip(self.writers, self._prefixes):
+            parts[1::2] = [prefixes[url] for url in urls]
+            writer.write("".join(parts))
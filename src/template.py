@@ -0,0 +1,261 @@
+"""This module contains the compiled page template.
+
+Templates are HTML with two slots, {{ Title }} and {{ Content }}, and three
+tags resolved when the template is compiled, never per page:
+
+    {% include "partials/nav.html" %}   replaced by that file's template
+    {% extends "base.html" %}           first thing in a template: it is the
+                                        base template with the blocks below
+                                        replaced
+    {% block name %}...{% endblock %}   a replaceable part of a base template,
+                                        or its replacement in an extending one;
+                                        blocks don't nest
+
+Paths are relative to the file holding the tag. A content directory can
+hold a _template.html, used for its pages and those of its subdirectories
+instead of the site template."""
+
+import os
+import re
+
+from htmlnode import HTMLNode
+from manifest import hash_bytes
+
+SLOT_PATTERN = re.compile(r"\{\{ (Title|Content) \}\}")
+INCLUDE_PATTERN = re.compile(r'\{%\s*include\s+"([^"]+)"\s*%\}')
+EXTENDS_PATTERN = re.compile(r'\A\s*\{%\s*extends\s+"([^"]+)"\s*%\}')
+BLOCK_PATTERN = re.compile(
+    r"\{%\s*block\s+(\w+)\s*%\}(.*?)\{%\s*endblock\s*%\}", re.DOTALL
+)
+
+# Name of the per-directory template in the content directory
+SECTION_TEMPLATE = "_template.html"
+
+# The template last compiled by load for each template path and basepath, so
+# pages and sections with the same template share one. An edited template
+# replaces its entry, so long-running processes keep one per template.
+_compiled = {}
+
+
+def rewrite_urls(html: str, basepath: str) -> str:
+    """Rewrites root-relative href and src attributes to start with the basepath
+
+    Args:
+        html (str): HTML to rewrite.
+        basepath (str): The base path for URLs.
+    """
+    if basepath == "/":
+        return html
+    html = html.replace('href="/', f'href="{basepath}')
+    return html.replace('src="/', f'src="{basepath}')
+
+
+def _resolve(template_path: str, seen: tuple[str, ...]) -> tuple[str, list[str]]:
+    """Returns a template's source with includes and extends resolved but its
+    block tags kept, and every file read"""
+    path = os.path.abspath(template_path)
+    if path in seen:
+        chain = " -> ".join(seen + (path,))
+        raise ValueError(f"template includes or extends itself: {chain}")
+    seen += (path,)
+    with open(path, "r", encoding="utf-8") as file:
+        source = file.read()
+    files = [path]
+    directory = os.path.dirname(path)
+
+    def include(match: re.Match) -> str:
+        included, included_files = _resolve(os.path.join(directory, match[1]), seen)
+        files.extend(included_files)
+        return _strip_blocks(included)
+
+    source = INCLUDE_PATTERN.sub(include, source)
+    extends = EXTENDS_PATTERN.match(source)
+    if extends is None:
+        return source, files
+
+    base, base_files = _resolve(os.path.join(directory, extends[1]), seen)
+    files.extend(base_files)
+    overrides = {match[1]: match[2] for match in BLOCK_PATTERN.finditer(source)}
+
+    def override(match: re.Match) -> str:
+        body = overrides.get(match[1], match[2])
+        return f"{{% block {match[1]} %}}{body}{{% endblock %}}"
+
+    return BLOCK_PATTERN.sub(override, base), files
+
+
+def _strip_blocks(source: str) -> str:
+    """Replaces every block with its body"""
+    return BLOCK_PATTERN.sub(lambda match: match[2], source)
+
+
+def resolve_template(template_path: str) -> tuple[str, list[str]]:
+    """
+    Reads a template with its includes and the templates it extends into
+    one source with only the {{ Title }} and {{ Content }} slots left.
+
+    Args:
+        template_path (str): Path to the HTML template file.
+
+    Raises:
+        ValueError: Raised when a template includes or extends itself
+
+    Returns:
+        tuple[str, list[str]]: Resolved source and the absolute path of every file read
+    """
+    source, files = _resolve(template_path, ())
+    return _strip_blocks(source), files
+
+
+def template_path_for(from_path: str, content_dir: str, default_path: str) -> str:
+    """
+    Returns the template of a page: the _template.html nearest to it in the
+    content directory, or the site template.
+
+    Args:
+        from_path (str): Path to the source markdown file.
+        content_dir (str): Path to the content directory.
+        default_path (str): Path to the site template.
+    """
+    return template_path_for_directory(os.path.dirname(from_path), content_dir, default_path)
+
+
+def template_path_for_directory(directory: str, content_dir: str, default_path: str) -> str:
+    """Returns the template of the pages of a content directory, see template_path_for
+
+    Args:
+        directory (str): Directory within the content directory.
+        content_dir (str): Path to the content directory.
+        default_path (str): Path to the site template.
+    """
+    root = os.path.abspath(content_dir)
+    directory = os.path.abspath(directory)
+    while True:
+        candidate = os.path.join(directory, SECTION_TEMPLATE)
+        if os.path.isfile(candidate):
+            return candidate
+        if directory == root or not directory.startswith(root + os.sep):
+            return default_path
+        directory = os.path.dirname(directory)
+
+
+class CompiledTemplate:
+    """A page template split once into static chunks and the slots between them.
+
+    The basepath rewrite is applied to the static chunks when compiling, so
+    rendering a page only rewrites and joins the title and content.
+    """
+
+    def __init__(self, source: str, basepath: str = "/", files: list[str] | None = None):
+        self.basepath = basepath
+        self.files = files or []
+        self.digest = hash_bytes(source.encode("utf-8"))
+        parts = SLOT_PATTERN.split(source)
+        self.chunks = [rewrite_urls(chunk, basepath) for chunk in parts[0::2]]
+        self.slots = parts[1::2]
+
+    @classmethod
+    def load(cls, template_path: str, basepath: str = "/"):
+        """Reads and compiles a template file, with its includes and the
+        templates it extends. The template compiled last for the path is
+        returned instead of compiling it again while its resolved source and
+        the files it was resolved from are unchanged.
+
+        Args:
+            template_path (str): Path to the HTML template file.
+            basepath (str, optional): The base path for URLs. Defaults to "/".
+
+        Raises:
+            ValueError: Raised when a template includes or extends itself
+        """
+        source, files = resolve_template(template_path)
+        key = (os.path.abspath(template_path), basepath)
+        template = _compiled.get(key)
+        if template is None or (template.digest, template.files) != (
+            hash_bytes(source.encode("utf-8")),
+            files,
+        ):
+            template = cls(source, basepath, files)
+            _compiled[key] = template
+        return template
+
+    def render(self, title: str, content: str) -> str:
+        """Fills the slots with the page title and content
+
+        Args:
+            title (str): Page title.
+            content (str): Page HTML content.
+
+        Returns:
+            str: The final HTML of the page
+        """
+        values = {
+            "Title": rewrite_urls(title, self.basepath),
+            "Content": rewrite_urls(content, self.basepath),
+        }
+        parts = [self.chunks[0]]
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            parts.append(values[slot])
+            parts.append(chunk)
+        return "".join(parts)
+
+    def write(self, write, title: str, content_node: HTMLNode):
+        """Streams the page through write without building the document string.
+
+        The basepath rewrite is applied to each fragment of the content. Nodes
+        emit every attribute and every text value as a single fragment, so a
+        URL is never split between fragments.
+
+        Args:
+            write (Callable[[str], Any]): Called with each HTML fragment in order.
+            title (str): Page title.
+            content_node (HTMLNode): Root node of the page content.
+        """
+        if self.basepath == "/":
+            write_content = write
+        else:
+
+            def write_content(fragment):
+                write(rewrite_urls(fragment, self.basepath))
+
+        write(self.chunks[0])
+        for slot, chunk in zip(self.slots, self.chunks[1:]):
+            if slot == "Title":
+                write(rewrite_urls(title, self.basepath))
+            else:
+                content_node.write_html(write_content)
+            write(chunk)
+
+
+class TemplateSet:
+    """The templates of the pages of a content directory, each loaded once.
+    Meant to live for one build, so edits are seen by the next."""
+
+    def __init__(self, content_dir: str, default_path: str, basepath: str = "/"):
+        self.content_dir = content_dir
+        self.default_path = default_path
+        self.basepath = basepath
+        self._by_directory = {}
+
+    def for_directory(self, directory: str) -> CompiledTemplate:
+        """Returns the template of the pages of a content directory
+
+        Args:
+            directory (str): Directory within the content directory.
+        """
+        template = self._by_directory.get(directory)
+        if template is None:
+            path = template_path_for_directory(
+                directory, self.content_dir, self.default_path
+            )
+            template = CompiledTemplate.load(path, self.basepath)
+            self._by_directory[directory] = template
+        return template
+
+    def for_source(self, from_path: str) -> CompiledTemplate:
+        """Returns the template of a page
+
+        Args:
+            from_path (str): Path to the source markdown file.
+        """
+        return self.for_directory(os.path.dirname(from_path))
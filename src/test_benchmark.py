@@ -0,0 +1,45 @@
+"""This file contains the test cases for the benchmark harness"""
+
+import unittest
+
+from benchmark import STAGES, CorpusGenerator, parse_mix, run_benchmark
+from utils import extract_title, markdown_to_blocks, markdown_to_html_node
+
+
+class TestBenchmark(unittest.TestCase):
+    """This class file is used for testing the corpus generator and stage timings
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def test_corpus_deterministic(self):
+        """Tests that the same seed generates the same corpus"""
+        first = CorpusGenerator(seed=7).corpus(5, 10)
+        second = CorpusGenerator(seed=7).corpus(5, 10)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, CorpusGenerator(seed=8).corpus(5, 10))
+
+    def test_corpus_pages_parse(self):
+        """Tests that generated pages have a title and the requested block count"""
+        mix = {"list": 1, "code": 1, "quote": 1, "heading": 1, "inline": 1}
+        for page in CorpusGenerator(seed=1, mix=mix).corpus(10, 8):
+            self.assertTrue(extract_title(page))
+            self.assertEqual(len(markdown_to_blocks(page)), 9)
+            markdown_to_html_node(page).to_html()
+
+    def test_run_benchmark_results(self):
+        """Tests that every stage is timed in the results"""
+        results = run_benchmark(pages=3, blocks=5, repeat=1)
+        self.assertEqual(list(results["stages"]), list(STAGES))
+        self.assertEqual(results["config"]["pages"], 3)
+        for timing in results["stages"].values():
+            self.assertGreaterEqual(timing["total_ms"], 0)
+
+    def test_parse_mix(self):
+        """Tests parsing of block mix weights"""
+        self.assertEqual(parse_mix("list=2, code"), {"list": 2.0, "code": 1.0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""This file contains the test cases for the block render cache"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from block_cache import BlockCache, block_cache_path_for
+from generate_page import generate_pages_recursive
+from utils import markdown_to_html_node
+
+MARKDOWN = """# Title
+
+A paragraph with **bold** and a [link](/blog).
+
+- one
+- _two_
+
+```
+code
+```
+
+> quoted"""
+
+
+class TestBlockCache(unittest.TestCase):
+    """This class file is used for testing the block render cache
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "docs.block-cache.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cache_path(self):
+        self.assertEqual(block_cache_path_for("site/docs/"), "site/docs.block-cache.json")
+
+    def test_same_html_with_and_without_cache(self):
+        expected = markdown_to_html_node(MARKDOWN).to_html()
+        cache = BlockCache()
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (0, 5))
+        self.assertEqual(markdown_to_html_node(MARKDOWN, cache).to_html(), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 5))
+
+    def test_evicts_least_recently_used_by_size(self):
+        cache = BlockCache(max_bytes=10)
+        cache.put("a", "12345")
+        cache.put("b", "12345")
+        self.assertEqual(cache.get("a"), "12345")
+        cache.put("c", "123")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), "12345")
+        self.assertEqual(cache.size, 8)
+
+    def test_persists_between_builds(self):
+        cache = BlockCache(self.path)
+        markdown_to_html_node(MARKDOWN, cache)
+        cache.save()
+
+        loaded = BlockCache.load(self.path)
+        markdown_to_html_node(MARKDOWN, loaded)
+        self.assertEqual((loaded.hits, loaded.misses), (5, 0))
+
+    def test_ignores_cache_of_other_parser_version(self):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump({"version": -1, "entries": [[BlockCache.key("x"), "<p>y</p>"]]}, file)
+        self.assertIsNone(BlockCache.load(self.path).get("x"))
+
+    def test_merges_entries_of_workers(self):
+        parent = BlockCache()
+        parent.put("a", "<p>a</p>")
+        self.assertEqual(parent.new_entries, [])
+
+        worker = BlockCache()
+        worker.track_new = True
+        worker.put("a", "<p>a</p>")
+        entries = worker.take_new_entries()
+        self.assertEqual(worker.take_new_entries(), [])
+
+        cache = BlockCache()
+        cache.merge(entries)
+        self.assertEqual(cache.get("a"), "<p>a</p>")
+
+    def test_merges_hits_of_workers(self):
+        parent = BlockCache(max_bytes=len("<p>a</p>") * 2)
+        parent.put("a", "<p>a</p>")
+        parent.put("b", "<p>b</p>")
+
+        worker = BlockCache()
+        worker.track_new = True
+        worker.merge(list(parent.entries.items()))
+        worker.get("a")
+        worker.get("c")
+        worker.put("c", "<p>c</p>")
+        hit_keys = worker.take_hit_keys()
+        self.assertEqual(hit_keys, [BlockCache.key("a")])
+        self.assertEqual(worker.take_hit_keys(), [])
+
+        # "a" was used by the worker, so "b" is the one evicted for "c"
+        parent.merge(worker.take_new_entries(), hit_keys)
+        self.assertEqual(parent.get("a"), "<p>a</p>")
+        self.assertIsNone(parent.get("b"))
+        self.assertEqual(parent.get("c"), "<p>c</p>")
+
+    def test_parallel_build_fills_cache(self):
+        content = os.path.join(self.tmp.name, "content")
+        template = os.path.join(self.tmp.name, "template.html")
+        os.makedirs(content)
+        with open(template, "w", encoding="utf-8") as file:
+            file.write("{{ Title }}{{ Content }}")
+        for name in ("a", "b", "c"):
+            with open(os.path.join(content, f"{name}.md"), "w", encoding="utf-8") as file:
+                file.write(f"# {name}\n\nShared **paragraph**")
+
+        cache = BlockCache(self.path)
+        dest = os.path.join(self.tmp.name, "docs")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(content, template, dest, "/", jobs=2, block_cache=cache)
+        self.assertIsNotNone(cache.get("Shared **paragraph**"))
+        with open(os.path.join(dest, "b.html"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), "b<div><h1>b</h1><p>Shared <b>paragraph</b></p></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
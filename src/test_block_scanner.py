@@ -0,0 +1,78 @@
+"""This file contains the test cases for the streaming block scanner"""
+
+import os
+import tempfile
+import unittest
+
+from block_scanner import read_lines, scan_blocks
+from generate_page import write_page
+from template import CompiledTemplate
+from utils import markdown_to_blocks
+
+
+class TestBlockScanner(unittest.TestCase):
+    """This class file is used for testing the line based block scanner
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        """Writes a binary file in the temporary directory and returns its path"""
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as file:
+            file.write(data)
+        return path
+
+    def test_splits_on_empty_lines(self):
+        lines = ["  first\n", "still first \n", "\n", "\n", "\n", "second\n", "   \n"]
+        self.assertEqual(list(scan_blocks(lines)), ["first\nstill first", "second"])
+
+    def test_keeps_empty_lines_in_code_fences(self):
+        markdown = "Intro\n\n```\ndef f():\n\n    return 1\n```\n\nOutro"
+        self.assertEqual(
+            markdown_to_blocks(markdown),
+            ["Intro", "```\ndef f():\n\n    return 1\n```", "Outro"],
+        )
+
+    def test_single_line_fence_does_not_open_a_fence(self):
+        markdown = "```code```\n\nnext"
+        self.assertEqual(markdown_to_blocks(markdown), ["```code```", "next"])
+
+    def test_mapped_and_buffered_reads_match(self):
+        path = self.write("page.md", "# Tïtle\r\n\r\nline\rnext\n\nlast".encode("utf-8"))
+        lines = list(read_lines(path, use_mmap=False))
+        self.assertEqual(list(read_lines(path, use_mmap=True)), lines)
+        self.assertEqual(lines, ["# Tïtle\n", "\n", "line\n", "next\n", "\n", "last"])
+
+    def test_reads_empty_file(self):
+        path = self.write("empty.md", b"")
+        self.assertEqual(list(read_lines(path, use_mmap=True)), [])
+
+    def test_write_page_renders_fenced_code(self):
+        path = self.write("page.md", b"# Code\n\n```\na\n\nb\n```\n")
+        dest = os.path.join(self.tmp.name, "out", "page.html")
+        write_page(path, CompiledTemplate("{{ Title }}{{ Content }}"), dest)
+        with open(dest, encoding="utf-8") as file:
+            self.assertEqual(
+                file.read(), "Code<div><h1>Code</h1><pre><code>a\n\nb\n</code></pre></div>"
+            )
+
+    def test_failed_page_leaves_previous_output(self):
+        dest = self.write("page.html", b"previous")
+        path = self.write("page.md", b"# Broken\n\nan **unclosed delimiter")
+        with self.assertRaises(ValueError):
+            write_page(path, CompiledTemplate("{{ Content }}"), dest)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["page.html", "page.md"])
+        with open(dest, encoding="utf-8") as file:
+            self.assertEqual(file.read(), "previous")
+
+
+if __name__ == "__main__":
+    unittest.main()
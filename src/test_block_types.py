@@ -0,0 +1,119 @@
+"""This file contains the test cases for the block type registry"""
+
+import copy
+import unittest
+
+import utils
+from block_cache import BlockCache
+from block_types import BlockHandler, BlockRegistry
+from enums import BlockType
+from leafnode import LeafNode
+from parentnode import ParentNode
+from utils import block_to_block_type, markdown_to_html_node, register_block_type
+
+
+def is_table(block: str) -> bool:
+    return all(line.startswith("|") for line in block.split("\n"))
+
+
+def table_to_html_node(block: str, images=None):
+    rows = [
+        ParentNode(
+            tag="tr",
+            children=[LeafNode("td", cell.strip()) for cell in line.strip("|").split("|")],
+        )
+        for line in block.split("\n")
+    ]
+    return ParentNode(tag="table", children=rows)
+
+
+def is_admonition(block: str) -> bool:
+    return block.startswith("!!! ")
+
+
+def admonition_to_html_node(block: str, images=None):
+    kind, _, text = block[len("!!! ") :].partition("\n")
+    children = [LeafNode("b", kind.title()), *utils.text_to_children(" " + text, images)]
+    return ParentNode(tag="aside", children=children)
+
+
+class TestBlockTypes(unittest.TestCase):
+    """This class file is used for testing block classification and registered block types
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        # Registered types stay registered, so each test gets its own registry
+        self.registry = utils.BLOCK_TYPES
+        utils.BLOCK_TYPES = copy.deepcopy(self.registry)
+
+    def tearDown(self):
+        utils.BLOCK_TYPES = self.registry
+
+    def test_builtin_types(self):
+        cases = {
+            "###### h6": BlockType.HEADING,
+            "####### seven": BlockType.PARAGRAPH,
+            "#tag": BlockType.PARAGRAPH,
+            "```\ncode\n```": BlockType.CODE,
+            "```\nunclosed": BlockType.PARAGRAPH,
+            "> one\n>two": BlockType.QUOTE,
+            "> one\ntwo": BlockType.PARAGRAPH,
+            "- one\n- two": BlockType.UNORDERED_LIST,
+            "- one\n-two": BlockType.PARAGRAPH,
+            "1. one\n 2. two": BlockType.ORDERED_LIST,
+            "1. one\n3. three": BlockType.PARAGRAPH,
+            "2. two": BlockType.PARAGRAPH,
+            "": BlockType.PARAGRAPH,
+        }
+        for block, block_type in cases.items():
+            with self.subTest(block=block):
+                self.assertEqual(block_to_block_type(block), block_type)
+
+    def test_dispatches_on_first_character(self):
+        checked = []
+
+        def matches(block):
+            checked.append(block)
+            return True
+
+        registry = BlockRegistry(BlockHandler("p", "", None, None))
+        registry.register(BlockHandler("table", "|+", matches, None))
+        self.assertEqual(registry.classify("plain text").block_type, "p")
+        self.assertEqual(registry.classify("+--+").block_type, "table")
+        self.assertEqual(registry.classify("| a |").block_type, "table")
+        self.assertEqual(checked, ["+--+", "| a |"])
+
+    def test_register_rejects_duplicates(self):
+        register_block_type("table", "|", is_table, table_to_html_node)
+        with self.assertRaises(ValueError):
+            register_block_type("table", "+", is_table, table_to_html_node)
+        with self.assertRaises(ValueError):
+            register_block_type(BlockType.HEADING, "=", is_table, table_to_html_node)
+        with self.assertRaises(ValueError):
+            register_block_type("aside", "", is_admonition, admonition_to_html_node)
+
+    def test_registered_types_render(self):
+        register_block_type("table", "|", is_table, table_to_html_node)
+        register_block_type("admonition", "!", is_admonition, admonition_to_html_node)
+        markdown = "| a | b |\n| c | d |\n\n!!! note\nBe **careful**\n\n![image](/a.png) text"
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><table><tr><td>a</td><td>b</td></tr><tr><td>c</td><td>d</td></tr></table>"
+            "<aside><b>Note</b> Be <b>careful</b></aside>"
+            '<p><img src="/a.png" alt="image">image</img> text</p></div>',
+        )
+        self.assertEqual(utils.BLOCK_TYPES.signature, "table,admonition")
+
+    def test_registered_types_change_block_cache_keys(self):
+        cache = BlockCache()
+        markdown_to_html_node("| a |", cache)
+        register_block_type("table", "|", is_table, table_to_html_node)
+        html = markdown_to_html_node("| a |", cache).to_html()
+        self.assertEqual(html, "<div><table><tr><td>a</td></tr></table></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
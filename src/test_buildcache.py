@@ -0,0 +1,249 @@
+"""This file contains the test cases for the shared build cache"""
+
+import contextlib
+import gc
+import io
+import os
+import tempfile
+import threading
+import unittest
+import warnings
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from buildcache import (
+    BuildCache,
+    DirectoryBackend,
+    HTTPBackend,
+    TarballBackend,
+    cache_key,
+    open_backend,
+)
+from generate_page import generate_pages_recursive
+from images import ImageOptimizer
+from manifest import BuildManifest, hash_file
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+class CacheHandler(BaseHTTPRequestHandler):
+    """Serves GET and PUT of the entries of the server's store"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        data = self.server.store.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        length = int(self.headers["Content-Length"])
+        self.server.store[self.path] = self.rfile.read(length)
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class TestBuildCache(unittest.TestCase):
+    """This class file is used for testing the build cache and its backends
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome *home*")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path: str, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = "wb" if isinstance(data, bytes) else "w"
+        with open(path, mode) as file:
+            file.write(data)
+
+    def build(self, dest: str, build_cache: BuildCache, basepath: str = "/"):
+        manifest = BuildManifest.load(dest)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                dest,
+                basepath,
+                manifest,
+                build_cache=build_cache,
+            )
+        manifest.save()
+
+    def read_tree(self, dest: str) -> dict[str, bytes]:
+        tree = {}
+        for root, _, files in os.walk(dest):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as handle:
+                    tree[os.path.relpath(path, dest)] = handle.read()
+        return tree
+
+    def test_cache_key(self):
+        key = cache_key("page", "a", "b")
+        self.assertEqual(key, cache_key("page", "a", "b"))
+        self.assertNotEqual(key, cache_key("png", "a", "b"))
+        self.assertNotEqual(key, cache_key("page", "ab"))
+        self.assertEqual(len(key), 64)
+
+    def test_open_backend(self):
+        self.assertIsInstance(open_backend("http://localhost:8080/cache"), HTTPBackend)
+        self.assertIsInstance(open_backend("cache.tar.gz"), TarballBackend)
+        self.assertIsInstance(open_backend("cache"), DirectoryBackend)
+
+    def test_directory_backend(self):
+        path = os.path.join(self.tmp.name, "cache")
+        key = cache_key("page", "a")
+        backend = DirectoryBackend(path)
+        self.assertIsNone(backend.get(key))
+        backend.put(key, b"<p>a</p>")
+        self.assertEqual(DirectoryBackend(path).get(key), b"<p>a</p>")
+        self.assertTrue(os.path.isfile(os.path.join(path, key[:2], key)))
+
+    def test_tarball_backend_round_trip(self):
+        path = os.path.join(self.tmp.name, "cache.tar.gz")
+        first, second = cache_key("page", "1"), cache_key("page", "2")
+        backend = TarballBackend(path)
+        backend.put(first, b"one")
+        self.assertEqual(backend.get(first), b"one")
+        backend.save()
+        backend.close()
+
+        backend = TarballBackend(path)
+        self.assertEqual(backend.get(first), b"one")
+        backend.put(second, b"two")
+        backend.save()
+        backend.close()
+
+        backend = TarballBackend(path)
+        self.assertEqual(backend.get(first), b"one")
+        self.assertEqual(backend.get(second), b"two")
+        self.assertIsNone(backend.get(cache_key("page", "3")))
+        backend.close()
+
+    def test_tarball_backend_closes_its_file(self):
+        path = os.path.join(self.tmp.name, "cache.tar")
+        backend = TarballBackend(path)
+        backend.put(cache_key("page", "1"), b"one")
+        backend.save()
+        backend.close()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always", ResourceWarning)
+            # Read from but never saved, as in a build without changes
+            cache = BuildCache.open(path)
+            self.assertEqual(cache.get(cache_key("page", "1")), b"one")
+            cache.close()
+            del cache
+            gc.collect()
+        self.assertEqual([w for w in caught if w.category is ResourceWarning], [])
+
+    def test_tarball_compression_follows_extension(self):
+        for name, compressed in (("cache.tar", False), ("cache.tgz", True)):
+            path = os.path.join(self.tmp.name, name)
+            backend = TarballBackend(path)
+            backend.put(cache_key("page", "1"), b"one")
+            backend.save()
+            backend.close()
+            with open(path, "rb") as file:
+                self.assertEqual(file.read(2) == b"\x1f\x8b", compressed)
+            backend = TarballBackend(path)
+            self.assertEqual(backend.get(cache_key("page", "1")), b"one")
+            backend.close()
+
+    def test_http_backend(self):
+        server = HTTPServer(("127.0.0.1", 0), CacheHandler)
+        server.store = {}
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            backend = HTTPBackend(f"http://127.0.0.1:{server.server_port}/cache/")
+            key = cache_key("page", "a")
+            self.assertIsNone(backend.get(key))
+            backend.put(key, b"<p>a</p>")
+            self.assertEqual(server.store, {f"/cache/{key}": b"<p>a</p>"})
+            self.assertEqual(backend.get(key), b"<p>a</p>")
+            self.assertTrue(backend.available)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_unreachable_http_backend_is_disabled(self):
+        server = HTTPServer(("127.0.0.1", 0), CacheHandler)
+        port = server.server_port
+        server.server_close()
+        backend = HTTPBackend(f"http://127.0.0.1:{port}", timeout=1)
+        self.assertIsNone(backend.get(cache_key("page", "a")))
+        self.assertFalse(backend.available)
+        backend.put(cache_key("page", "a"), b"ignored")
+
+    def test_warm_build_fetches_every_page(self):
+        location = os.path.join(self.tmp.name, "cache.tar.gz")
+        cold = os.path.join(self.tmp.name, "cold", "docs")
+        build_cache = BuildCache.open(location)
+        self.build(cold, build_cache)
+        build_cache.save()
+        build_cache.close()
+        self.assertEqual((build_cache.hits, build_cache.misses), (0, 2))
+
+        warm = os.path.join(self.tmp.name, "warm", "docs")
+        build_cache = BuildCache.open(location)
+        self.build(warm, build_cache)
+        build_cache.close()
+        self.assertEqual((build_cache.hits, build_cache.misses), (2, 0))
+        self.assertEqual(self.read_tree(warm), self.read_tree(cold))
+
+        manifest = BuildManifest.load(warm)
+        self.assertEqual(len(manifest.pages), 2)
+        reasons = manifest.page_changes(
+            os.path.join(warm, "index.html"),
+            hash_file(os.path.join(self.content, "index.md")),
+            manifest.pages["index.html"]["template"],
+            "/",
+        )
+        self.assertEqual(reasons, [])
+
+    def test_changed_inputs_miss(self):
+        build_cache = BuildCache(DirectoryBackend(os.path.join(self.tmp.name, "cache")))
+        self.build(os.path.join(self.tmp.name, "a"), build_cache)
+        self.build(os.path.join(self.tmp.name, "b"), build_cache, basepath="/site/")
+        self.assertEqual(build_cache.hits, 0)
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nChanged")
+        self.build(os.path.join(self.tmp.name, "c"), build_cache)
+        self.assertEqual((build_cache.hits, build_cache.misses), (1, 5))
+        with open(os.path.join(self.tmp.name, "c", "index.html"), encoding="utf-8") as file:
+            self.assertIn("Changed", file.read())
+
+    def test_optimizer_fetches_from_cache(self):
+        png = os.path.join(self.tmp.name, "static", "logo.png")
+        self.write(png, b"\x89PNG\r\n\x1a\nnot really")
+        build_cache = BuildCache(DirectoryBackend(os.path.join(self.tmp.name, "cache")))
+        build_cache.put(cache_key("png", hash_file(png)), b"optimized")
+
+        optimizer = ImageOptimizer(
+            os.path.join(self.tmp.name, "docs.image-cache"), build_cache=build_cache
+        )
+        with open(optimizer.optimize([png])[png], "rb") as file:
+            self.assertEqual(file.read(), b"optimized")
+        self.assertEqual(build_cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
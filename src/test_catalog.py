@@ -0,0 +1,123 @@
+"""This file contains the test cases for the site catalog"""
+
+import os
+import tempfile
+import unittest
+
+from block_scanner import split_front_matter
+from catalog import PageInfo, SiteCatalog, catalog_path_for, scan_head
+from generate_page import write_page
+from template import CompiledTemplate
+
+POST = """---
+title: Second Breakfast
+date: 2024-03-01
+tags: hobbits, food
+---
+
+# Menu
+
+Body"""
+
+
+class TestCatalog(unittest.TestCase):
+    """This class file is used for testing the site catalog
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.write("index.md", "# Home\n\nWelcome")
+        self.write("blog/breakfast.md", POST)
+        self.write("blog/elevenses.md", "---\ndate: 2024-01-15\n---\n# Elevenses\n")
+        self.write("blog_old/notes.md", "no title here")
+        self.db = os.path.join(self.tmp.name, "docs.catalog.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path: str, text: str):
+        full_path = os.path.join(self.content, *path.split("/"))
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def test_catalog_path(self):
+        self.assertEqual(catalog_path_for("site/docs/"), "site/docs.catalog.sqlite")
+
+    def test_split_front_matter(self):
+        meta, rest = split_front_matter(POST.split("\n"))
+        self.assertEqual(
+            meta,
+            {"title": "Second Breakfast", "date": "2024-03-01", "tags": "hobbits, food"},
+        )
+        self.assertEqual(next(rest), "")
+        meta, rest = split_front_matter(["---", "not closed"])
+        self.assertEqual((meta, list(rest)), ({}, ["---", "not closed"]))
+        meta, rest = split_front_matter(["# Title"])
+        self.assertEqual((meta, list(rest)), ({}, ["# Title"]))
+
+    def test_pages_render_without_front_matter(self):
+        dest_path = os.path.join(self.tmp.name, "breakfast.html")
+        template = CompiledTemplate("<title>{{ Title }}</title>{{ Content }}")
+        write_page(os.path.join(self.content, "blog", "breakfast.md"), template, dest_path)
+        with open(dest_path, encoding="utf-8") as file:
+            self.assertEqual(
+                file.read(),
+                "<title>Second Breakfast</title>"
+                "<div><h1>Menu</h1><p>Body</p></div>",
+            )
+
+    def test_scan_head(self):
+        title, meta = scan_head(os.path.join(self.content, "blog", "breakfast.md"))
+        self.assertEqual((title, meta["date"]), ("Second Breakfast", "2024-03-01"))
+        self.assertEqual(
+            scan_head(os.path.join(self.content, "index.md")), ("Home", {})
+        )
+        self.assertEqual(
+            scan_head(os.path.join(self.content, "blog_old", "notes.md")), (None, {})
+        )
+
+    def test_queries(self):
+        catalog = SiteCatalog(self.content)
+        self.assertEqual(catalog.refresh(), 4)
+        self.assertEqual(catalog.count(), 4)
+        self.assertEqual(catalog.count("blog"), 2)
+        newest = catalog.pages("blog", order_by="date", descending=True)
+        self.assertEqual(
+            [page.title for page in newest], ["Second Breakfast", "Elevenses"]
+        )
+        self.assertEqual(
+            [page.path for page in catalog.pages(limit=2, offset=1)],
+            ["blog/elevenses.md", "blog_old/notes.md"],
+        )
+        self.assertEqual(catalog.get("index.md"), PageInfo("index.md", "Home", {}))
+        self.assertIsNone(catalog.get("missing.md"))
+        with self.assertRaises(ValueError):
+            catalog.pages(order_by="date; DROP TABLE pages")
+
+    def test_page_url(self):
+        self.assertEqual(PageInfo("index.md", None, {}).url(), "/")
+        self.assertEqual(PageInfo("blog/tom/index.md", None, {}).url("/v1/"), "/v1/blog/tom/")
+        self.assertEqual(PageInfo("blog/breakfast.md", None, {}).url(), "/blog/breakfast.html")
+
+    def test_refresh_is_incremental_and_persistent(self):
+        catalog = SiteCatalog(self.content, self.db)
+        catalog.refresh()
+        catalog.close()
+
+        catalog = SiteCatalog(self.content, self.db)
+        self.assertEqual(catalog.refresh(), 0)
+        self.write("index.md", "# New Home\n")
+        os.remove(os.path.join(self.content, "blog_old", "notes.md"))
+        self.assertEqual(catalog.refresh(), 1)
+        self.assertEqual(catalog.get("index.md").title, "New Home")
+        self.assertEqual(catalog.count(), 3)
+        catalog.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
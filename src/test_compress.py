@@ -0,0 +1,104 @@
+"""This file contains the test cases for the compression stage"""
+
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import Compressor, compress_index_path_for, find_compressible
+
+PAGE = "<html><body>" + "<p>Repeated paragraph text.</p>" * 100 + "</body></html>"
+
+
+class TestCompress(unittest.TestCase):
+    """This class file is used for testing the precompressed sidecars
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.dest, "blog"))
+        self.write("index.html", PAGE)
+        self.write("blog/index.html", PAGE)
+        self.write("index.css", "a{}")
+        self.write("logo.png", "not text")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, key: str, text: str):
+        with open(os.path.join(self.dest, key), "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self.dest, key))
+
+    def test_index_path(self):
+        self.assertEqual(compress_index_path_for("site/docs/"), "site/docs.compress.json")
+
+    def test_find_compressible(self):
+        self.assertEqual(
+            find_compressible(self.dest), ["blog/index.html", "index.css", "index.html"]
+        )
+
+    def test_writes_deterministic_sidecars(self):
+        self.assertEqual(Compressor(self.dest).compress(), 3)
+        path = os.path.join(self.dest, "index.html.gz")
+        with open(path, "rb") as file:
+            data = file.read()
+        self.assertEqual(gzip.decompress(data).decode("utf-8"), PAGE)
+        self.assertEqual(data, gzip.compress(PAGE.encode("utf-8"), 9, mtime=0))
+        self.assertEqual(
+            os.stat(path).st_mtime_ns,
+            os.stat(os.path.join(self.dest, "index.html")).st_mtime_ns,
+        )
+
+    def test_skips_files_that_do_not_shrink_enough(self):
+        Compressor(self.dest).compress()
+        self.assertFalse(self.exists("index.css.gz"))
+        self.assertFalse(self.exists("logo.png.gz"))
+
+    def test_only_changed_files_are_compressed(self):
+        Compressor(self.dest).compress()
+        self.assertEqual(Compressor(self.dest).compress(), 0)
+        self.write("blog/index.html", PAGE + "<p>new</p>")
+        self.assertEqual(Compressor(self.dest).compress(), 1)
+        with gzip.open(os.path.join(self.dest, "blog", "index.html.gz"), "rt") as file:
+            self.assertTrue(file.read().endswith("<p>new</p>"))
+
+    def test_removes_stale_sidecars(self):
+        Compressor(self.dest).compress()
+        os.remove(os.path.join(self.dest, "blog", "index.html"))
+        self.write("index.html", "tiny")
+        Compressor(self.dest).compress()
+        self.assertFalse(self.exists("blog/index.html.gz"))
+        self.assertFalse(self.exists("index.html.gz"))
+
+    def test_stale_sidecar_removal_removes_empty_directories(self):
+        os.makedirs(os.path.join(self.dest, "new"))
+        self.write("new/index.html", PAGE)
+        Compressor(self.dest).compress()
+        os.remove(os.path.join(self.dest, "new", "index.html"))
+        Compressor(self.dest).compress()
+        self.assertFalse(self.exists("new"))
+
+    def test_clear_removes_sidecars_and_index(self):
+        compressor = Compressor(self.dest)
+        compressor.compress()
+        self.assertTrue(self.exists("blog/index.html.gz"))
+        self.assertEqual(compressor.clear(), len(find_compressible(self.dest)))
+        self.assertFalse(self.exists("blog/index.html.gz"))
+        self.assertTrue(self.exists("blog/index.html"))
+        self.assertFalse(os.path.exists(compress_index_path_for(self.dest)))
+        self.assertEqual(compressor.clear(), 0)
+
+    def test_rejects_unknown_encoding(self):
+        with self.assertRaises(ValueError):
+            Compressor(self.dest, ["zstd"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""This file contains the test cases for syncing the static directory"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from copy_directory import copy_directory_recursive, needs_update
+from manifest import BuildManifest
+
+
+class TestCopyDirectory(unittest.TestCase):
+    """This class file is used for testing the incremental static sync
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        self.manifest = BuildManifest.load(self.dest)
+        self.write(os.path.join(self.src, "index.css"), "body {}")
+        self.write(os.path.join(self.src, "images", "a.png"), "png bytes")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        """Writes a text file, creating its directory"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def sync(self, **kwargs):
+        """Syncs static into docs and returns the printed output"""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            copy_directory_recursive(self.src, self.dest, self.manifest, **kwargs)
+        return output.getvalue()
+
+    def test_unchanged_files_not_copied(self):
+        """Tests that a second sync copies nothing"""
+        self.assertEqual(self.sync().count("Copied"), 2)
+        self.assertEqual(self.sync(), "")
+
+    def test_changed_file_copied(self):
+        """Tests that only a changed file is copied again"""
+        self.sync()
+        self.write(os.path.join(self.src, "index.css"), "body { margin: 0 }")
+        output = self.sync()
+        self.assertEqual(output.count("Copied"), 1)
+        self.assertIn("index.css", output)
+
+    def test_generated_pages_left_alone(self):
+        """Tests that files not synced from static survive the sync"""
+        self.sync()
+        page = os.path.join(self.dest, "blog", "index.html")
+        self.write(page, "<p>generated</p>")
+        self.sync()
+        self.assertTrue(os.path.exists(page))
+
+    def test_stale_file_removed(self):
+        """Tests that a deleted static file is removed from the output"""
+        self.sync()
+        os.remove(os.path.join(self.src, "images", "a.png"))
+        output = self.sync()
+        self.assertIn("Removed stale file", output)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertEqual(self.manifest.assets, ["index.css"])
+
+    def test_hardlink_mode(self):
+        """Tests that hardlinked files share the source inode and stay current"""
+        self.sync(link_mode="hardlink")
+        src_file = os.path.join(self.src, "index.css")
+        dest_file = os.path.join(self.dest, "index.css")
+        self.assertEqual(os.stat(src_file).st_ino, os.stat(dest_file).st_ino)
+        self.assertFalse(needs_update(src_file, dest_file))
+
+    def test_reflink_mode(self):
+        """Tests that reflink mode produces an identical file"""
+        self.sync(link_mode="reflink")
+        with open(os.path.join(self.dest, "images", "a.png"), encoding="utf-8") as file:
+            self.assertEqual(file.read(), "png bytes")
+
+    def test_checksum_detects_same_size_change(self):
+        """Tests that checksum mode catches a same size edit with the same mtime"""
+        self.sync()
+        src_file = os.path.join(self.src, "index.css")
+        stat = os.stat(src_file)
+        self.write(src_file, "body{ }")
+        os.utime(src_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(self.sync(), "")
+        self.assertIn("Copied", self.sync(checksum=True))
+
+    def test_unknown_link_mode(self):
+        """Tests that an unknown link mode is rejected"""
+        with self.assertRaises(ValueError):
+            self.sync(link_mode="symlink")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""This file contains the test cases for the build server and its client"""
+
+import contextlib
+import io
+import os
+import socket
+import tempfile
+import threading
+import unittest
+
+from daemon import BuildServer, client_main, request, socket_path_for
+
+
+class TestBuildServer(unittest.TestCase):
+    """This class file is used for testing the build daemon protocol
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp.name, "docs.sock")
+        self.builds = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def handle(self, argv):
+        self.builds.append(argv)
+        if "--fail" in argv:
+            return 1, "Build failed\n"
+        return 0, f"Built {' '.join(argv)}\n"
+
+    @contextlib.contextmanager
+    def serving(self):
+        server = BuildServer(self.socket_path, self.handle)
+        server.bind()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield server
+        finally:
+            if thread.is_alive():
+                request(self.socket_path, {"stop": True}, timeout=5)
+            thread.join(5)
+
+    def client(self, *argv) -> tuple[int, str]:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            status = client_main(["--socket", self.socket_path, *argv])
+        return status, output.getvalue()
+
+    def test_socket_path(self):
+        self.assertEqual(socket_path_for("site/docs/"), "site/docs.sock")
+
+    def test_builds_on_request(self):
+        with self.serving():
+            self.assertEqual(self.client("/site/", "-j", "2"), (0, "Built /site/ -j 2\n"))
+            self.assertEqual(self.client("--fail"), (1, "Build failed\n"))
+        self.assertEqual(self.builds, [["/site/", "-j", "2"], ["--fail"]])
+
+    def test_stop_removes_socket(self):
+        with self.serving():
+            self.assertEqual(self.client("--stop"), (0, "Build server stopped\n"))
+        self.assertFalse(os.path.exists(self.socket_path))
+        status, output = self.client()
+        self.assertEqual(status, 2)
+        self.assertIn("No build server", output)
+
+    def test_rejects_other_directory(self):
+        with self.serving():
+            answer = request(self.socket_path, {"argv": [], "cwd": self.tmp.name}, 5)
+        self.assertEqual(answer["status"], 2)
+        self.assertIn("serves", answer["output"])
+        self.assertEqual(self.builds, [])
+
+    def test_bad_request(self):
+        with self.serving():
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.connect(self.socket_path)
+                connection.sendall(b"not json\n")
+                answer = connection.makefile("rb").readline()
+            self.assertIn(b"bad request", answer)
+            self.assertEqual(self.client("ok"), (0, "Built ok\n"))
+
+    def test_replaces_stale_socket_but_not_live_server(self):
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.socket_path)
+        stale.close()
+        with self.serving():
+            with self.assertRaises(ValueError):
+                BuildServer(self.socket_path, self.handle).bind()
+            self.assertEqual(self.client("ok"), (0, "Built ok\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+"""This file contains the test cases for the build dependency graph"""
+
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from depgraph import (
+    DependencyGraph,
+    image_input,
+    link_input,
+    page_fingerprint,
+    template_input,
+)
+from generate_page import generate_pages_recursive
+from images import ImageCatalog
+from manifest import BuildManifest, hash_file
+from watch import Rebuilder
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+def png_header(width: int, height: int) -> bytes:
+    """Returns the start of a PNG file, enough for its dimensions"""
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    crc = struct.pack(">I", zlib.crc32(b"IHDR" + ihdr))
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + crc
+
+
+class TestDependencyGraph(unittest.TestCase):
+    """This class file is used for testing dependency edges and invalidation
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n![logo](/images/logo.png) and [the post](/post)",
+        )
+        self.write(os.path.join(self.content, "post.md"), "# Post\n\n[home](/)")
+        self.logo = os.path.join(self.static, "images", "logo.png")
+        self.write(self.logo, png_header(40, 30))
+        self.manifest = BuildManifest.load(self.dest)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path: str, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        mode = "wb" if isinstance(data, bytes) else "w"
+        with open(path, mode) as file:
+            file.write(data)
+
+    def build(self, images, explain=False) -> str:
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                self.dest,
+                "/",
+                self.manifest,
+                incremental=True,
+                images=images,
+                explain=explain,
+            )
+        return output.getvalue()
+
+    def test_page_fingerprint(self):
+        from_path = os.path.join(self.content, "index.md")
+        source_hash, references = page_fingerprint(from_path, ImageCatalog.scan(self.static))
+        self.assertEqual(source_hash, hash_file(from_path))
+        self.assertEqual(references["images"], {"/images/logo.png": "40x30"})
+        self.assertEqual(references["links"], ["/post"])
+        self.assertTrue(references["source_path"].endswith("content/index.md"))
+        _, without_catalog = page_fingerprint(from_path)
+        self.assertEqual(without_catalog["images"], {"/images/logo.png": None})
+
+    def test_sources(self):
+        self.build(ImageCatalog.scan(self.static))
+        graph = DependencyGraph(self.manifest)
+        home = os.path.join(self.content, "index.md")
+        post = os.path.join(self.content, "post.md")
+        self.assertEqual(graph.sources(template_input(self.template)), [home, post])
+        self.assertEqual(graph.sources(image_input("/images/logo.png")), [home])
+        self.assertEqual(graph.sources(link_input("/")), [post])
+        self.assertEqual(graph.sources(image_input("/images/other.png")), [])
+
+    def test_section_template_edges(self):
+        section_template = os.path.join(self.content, "blog", "_template.html")
+        self.write(section_template, "<h1>Blog</h1>{{ Content }}")
+        self.write(os.path.join(self.content, "blog", "first.md"), "# First")
+        self.build(None)
+        graph = DependencyGraph(self.manifest)
+        self.assertEqual(
+            graph.sources(template_input(section_template)),
+            [os.path.join(self.content, "blog", "first.md")],
+        )
+        self.assertNotIn(
+            os.path.join(self.content, "blog", "first.md"),
+            graph.sources(template_input(self.template)),
+        )
+
+        self.write(section_template, "<h2>Blog</h2>{{ Content }}")
+        output = self.build(None, explain=True)
+        self.assertIn(
+            f"Rebuilding {os.path.join(self.dest, 'blog', 'first.html')}: "
+            f"template {os.path.relpath(section_template)} changed",
+            output,
+        )
+        self.assertIn(f"Skipped unchanged page: {os.path.join(self.dest, 'post.html')}", output)
+
+    def test_image_change_only_dirties_its_pages(self):
+        self.build(ImageCatalog.scan(self.static))
+        self.write(self.logo, png_header(80, 60))
+        output = self.build(ImageCatalog.scan(self.static), explain=True)
+        self.assertIn(
+            f"Rebuilding {os.path.join(self.dest, 'index.html')}: "
+            "image /images/logo.png changed",
+            output,
+        )
+        self.assertIn(f"Skipped unchanged page: {os.path.join(self.dest, 'post.html')}", output)
+        with open(os.path.join(self.dest, "index.html"), encoding="utf-8") as file:
+            self.assertIn('width="80" height="60"', file.read())
+
+    def test_page_changes(self):
+        self.build(None)
+        home = os.path.join(self.dest, "index.html")
+        entry = self.manifest.pages["index.html"]
+        args = (home, entry["source"], entry["template"], "/")
+        self.assertEqual(self.manifest.page_changes(*args), [])
+        self.assertEqual(
+            self.manifest.page_changes(home, "other", "other", "/v1/"),
+            [
+                f"{entry['source_path']} changed",
+                f"template {os.path.relpath(self.template)} changed",
+                "basepath changed from /",
+            ],
+        )
+        self.assertEqual(
+            self.manifest.page_changes(*args, ImageCatalog()),
+            ["image /images/logo.png changed"],
+        )
+        self.write(home, "edited by hand")
+        self.assertEqual(self.manifest.page_changes(*args), ["output modified"])
+        os.remove(home)
+        self.assertEqual(self.manifest.page_changes(*args), ["output missing"])
+        self.assertEqual(
+            self.manifest.page_changes(os.path.join(self.dest, "new.html"), "", "", "/"),
+            ["not built before"],
+        )
+
+    def test_watch_rebuilds_pages_of_a_resized_image(self):
+        images = ImageCatalog.scan(self.static)
+        self.build(images)
+        rebuilder = Rebuilder(
+            self.content,
+            self.static,
+            self.template,
+            self.dest,
+            "/",
+            self.manifest,
+            images=images,
+        )
+        self.write(self.logo, png_header(20, 10))
+        with contextlib.redirect_stdout(io.StringIO()):
+            actions = rebuilder.apply([self.logo])
+        self.assertEqual(
+            actions,
+            [
+                f"Copied '{os.path.abspath(self.logo)}' to "
+                f"'{os.path.join(self.dest, 'images', 'logo.png')}'",
+                f"Generated page: {os.path.join(self.dest, 'index.html')}",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+"""This file contains the test cases for the development server"""
+
+import http.client
+import os
+import tempfile
+import threading
+import unittest
+
+from dev_server import DevServer
+from generate_page import write_page
+from template import CompiledTemplate
+
+TEMPLATE = '<title>{{ Title }}</title><link href="/index.css">{{ Content }}'
+
+
+class TestDevServer(unittest.TestCase):
+    """This class file is used for testing on demand rendering and revalidation
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[Blog](/blog/)")
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog\n\n*posts*")
+        self.write(os.path.join(self.content, "about.md"), "# About\n\nUs")
+        self.write(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        self.write(os.path.join(root, "secret.txt"), "secret")
+
+        self.server = DevServer(
+            ("127.0.0.1", 0), self.content, self.static, self.template, "/site/"
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, args=(0.05,), daemon=True
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join(5)
+        self.tmp.cleanup()
+
+    def write(self, path: str, text: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def get(self, path: str, etag: str | None = None, method: str = "GET"):
+        connection = http.client.HTTPConnection("127.0.0.1", self.server.server_port)
+        try:
+            headers = {} if etag is None else {"If-None-Match": etag}
+            connection.request(method, path, headers=headers)
+            response = connection.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            connection.close()
+
+    def test_renders_requested_page_only(self):
+        status, headers, body = self.get("/site/blog/")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Type"], "text/html; charset=utf-8")
+        dest = os.path.join(self.tmp.name, "blog.html")
+        write_page(
+            os.path.join(self.content, "blog", "index.md"),
+            CompiledTemplate.load(self.template, "/site/"),
+            dest,
+        )
+        with open(dest, "rb") as file:
+            self.assertEqual(body, file.read())
+        self.assertEqual(self.server.renderer.renders, 1)
+
+        self.assertEqual(self.get("/site/about.html")[0], 200)
+        self.assertIn(b'<a href="/site/blog/">', self.get("/site/")[2])
+        self.assertEqual(self.server.renderer.renders, 3)
+
+    def test_etag_revalidation(self):
+        _, headers, _ = self.get("/site/")
+        etag = headers["ETag"]
+        status, headers, body = self.get("/site/", etag)
+        self.assertEqual((status, headers["ETag"], body), (304, etag, b""))
+        self.assertEqual(self.server.renderer.renders, 1)
+
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nEdited")
+        status, headers, body = self.get("/site/", etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(headers["ETag"], etag)
+        self.assertIn(b"Edited", body)
+
+    def test_template_change_rerenders(self):
+        _, headers, _ = self.get("/site/about.html")
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        status, _, body = self.get("/site/about.html", headers["ETag"])
+        self.assertEqual(status, 200)
+        self.assertTrue(body.startswith(b"<h1>About</h1>"))
+
+    def test_static_files(self):
+        status, headers, body = self.get("/site/index.css")
+        self.assertEqual((status, body), (200, b"body { margin: 0 }"))
+        self.assertEqual(headers["Content-Type"], "text/css")
+        self.assertEqual(self.get("/site/index.css", headers["ETag"])[0], 304)
+
+        status, headers, body = self.get("/site/index.css", method="HEAD")
+        self.assertEqual((status, headers["Content-Length"], body), (200, "18", b""))
+
+    def test_redirects_and_missing(self):
+        status, headers, _ = self.get("/site/blog")
+        self.assertEqual((status, headers["Location"]), (301, "/site/blog/"))
+        self.assertEqual(self.get("/site/missing.html")[0], 404)
+        self.assertEqual(self.get("/elsewhere/")[0], 404)
+        self.assertEqual(self.get("/site/../secret.txt")[0], 404)
+        self.assertEqual(self.get("/site/%2e%2e/secret.txt")[0], 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
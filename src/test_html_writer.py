@@ -0,0 +1,65 @@
+"""This file contains the test cases for the buffered HTML writer"""
+
+import hashlib
+import io
+import unittest
+
+from html_writer import HTMLWriter
+
+
+class FakeSocket:
+    """Collects the bytes passed to sendall"""
+
+    def __init__(self):
+        self.sent = []
+
+    def sendall(self, data):
+        """Records the sent data"""
+        self.sent.append(data)
+
+
+class TestHTMLWriter(unittest.TestCase):
+    """This class file is used for testing the buffered HTML writer
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    fragments = ["<p>", "café ", "<b>bold</b>", "</p>"]
+    html = "<p>café <b>bold</b></p>"
+
+    def write_all(self, writer):
+        """Writes every fragment and flushes the writer"""
+        for fragment in self.fragments:
+            writer.write(fragment)
+        writer.flush()
+
+    def test_text_sink(self):
+        """Tests that text sinks receive strings"""
+        sink = io.StringIO()
+        self.write_all(HTMLWriter(sink))
+        self.assertEqual(sink.getvalue(), self.html)
+
+    def test_binary_sink(self):
+        """Tests that binary sinks receive encoded bytes"""
+        sink = io.BytesIO()
+        self.write_all(HTMLWriter(sink))
+        self.assertEqual(sink.getvalue(), self.html.encode("utf-8"))
+
+    def test_socket_sink(self):
+        """Tests that sockets are written with sendall in buffered chunks"""
+        sink = FakeSocket()
+        self.write_all(HTMLWriter(sink, buffer_size=8))
+        self.assertGreater(len(sink.sent), 1)
+        self.assertEqual(b"".join(sink.sent), self.html.encode("utf-8"))
+
+    def test_digest(self):
+        """Tests that the writer hashes everything it flushed"""
+        writer = HTMLWriter(io.BytesIO(), buffer_size=4)
+        self.write_all(writer)
+        expected = hashlib.sha256(self.html.encode("utf-8")).hexdigest()
+        self.assertEqual(writer.hexdigest(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
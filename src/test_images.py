@@ -0,0 +1,160 @@
+"""This file contains the test cases for the image stage"""
+
+import contextlib
+import io
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from block_cache import BlockCache
+from copy_directory import copy_directory_recursive
+from images import (
+    ImageCatalog,
+    ImageOptimizer,
+    find_pngs,
+    optimize_png,
+    png_dimensions,
+    read_chunks,
+)
+from utils import markdown_to_html_node
+
+
+def chunk(chunk_type: bytes, body: bytes) -> bytes:
+    """Encodes one PNG chunk"""
+    crc = zlib.crc32(chunk_type + body)
+    return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", crc)
+
+
+def make_png(width: int, height: int, ancillary=()) -> bytes:
+    """Builds a black RGB PNG, poorly compressed, with the given ancillary
+    chunks before its image data"""
+    rows = b"".join(b"\x00" + bytes(3 * width) for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    parts = [b"\x89PNG\r\n\x1a\n", chunk(b"IHDR", header)]
+    parts.extend(chunk(chunk_type, body) for chunk_type, body in ancillary)
+    parts.append(chunk(b"IDAT", zlib.compress(rows, 0)))
+    parts.append(chunk(b"IEND", b""))
+    return b"".join(parts)
+
+
+def image_data(data: bytes) -> bytes:
+    """Returns the decompressed image data of a PNG"""
+    chunks = read_chunks(data)
+    return zlib.decompress(b"".join(body for kind, body in chunks if kind == b"IDAT"))
+
+
+class TestImages(unittest.TestCase):
+    """This class file is used for testing image sizes and PNG optimization
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.png = make_png(
+            40, 30, [(b"tEXt", b"Comment\x00" + b"x" * 200), (b"tRNS", bytes(6))]
+        )
+        self.path = os.path.join(self.static, "images", "hero.png")
+        with open(self.path, "wb") as file:
+            file.write(self.png)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_png_dimensions(self):
+        self.assertEqual(png_dimensions(self.path), (40, 30))
+        other = os.path.join(self.static, "notes.txt")
+        with open(other, "w", encoding="utf-8") as file:
+            file.write("not an image")
+        self.assertIsNone(png_dimensions(other))
+        self.assertIsNone(png_dimensions(os.path.join(self.static, "missing.png")))
+
+    def test_optimize_png_is_lossless_and_keeps_rendering_chunks(self):
+        optimized = optimize_png(self.png)
+        self.assertLess(len(optimized), len(self.png))
+        self.assertEqual(image_data(optimized), image_data(self.png))
+        kinds = [kind for kind, _ in read_chunks(optimized)]
+        self.assertEqual(kinds, [b"IHDR", b"tRNS", b"IDAT", b"IEND"])
+
+    def test_optimize_png_keeps_physical_size_and_animations(self):
+        png = make_png(40, 30, [(b"pHYs", bytes(9)), (b"tEXt", b"x" * 200)])
+        kinds = [kind for kind, _ in read_chunks(optimize_png(png))]
+        self.assertEqual(kinds, [b"IHDR", b"pHYs", b"IDAT", b"IEND"])
+        animated = make_png(40, 30, [(b"acTL", bytes(8)), (b"tEXt", b"x" * 200)])
+        self.assertIs(optimize_png(animated), animated)
+
+    def test_optimize_png_never_grows(self):
+        optimized = optimize_png(self.png)
+        self.assertIs(optimize_png(optimized), optimized)
+
+    def test_optimize_png_rejects_other_data(self):
+        with self.assertRaises(ValueError):
+            optimize_png(b"GIF89a")
+        with self.assertRaises(ValueError):
+            optimize_png(self.png[:40])
+
+    def test_catalog_props(self):
+        catalog = ImageCatalog.scan(self.static)
+        self.assertEqual(catalog.dimensions, {"/images/hero.png": (40, 30)})
+        self.assertEqual(
+            catalog.props("/images/hero.png?v=2"),
+            {"width": "40", "height": "30", "loading": "lazy", "decoding": "async"},
+        )
+        self.assertEqual(
+            catalog.props("https://example.com/x.png"),
+            {"loading": "lazy", "decoding": "async"},
+        )
+        self.assertNotEqual(catalog.digest, ImageCatalog().digest)
+
+    def test_image_tags_get_props(self):
+        catalog = ImageCatalog.scan(self.static)
+        html = markdown_to_html_node("![hero](/images/hero.png)", images=catalog).to_html()
+        self.assertEqual(
+            html,
+            '<div><p><img src="/images/hero.png" alt="hero" width="40" height="30" '
+            'loading="lazy" decoding="async">hero</img></p></div>',
+        )
+
+    def test_block_cache_separates_catalogs(self):
+        cache = BlockCache()
+        markdown = "![hero](/images/hero.png)\n\nplain text"
+        plain = markdown_to_html_node(markdown, cache).to_html()
+        catalog = ImageCatalog.scan(self.static)
+        sized = markdown_to_html_node(markdown, cache, catalog).to_html()
+        self.assertIn('width="40"', sized)
+        self.assertNotIn("width", plain)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_optimizer_caches_and_prunes(self):
+        cache_dir = os.path.join(self.tmp.name, "docs.image-cache")
+        optimizer = ImageOptimizer(cache_dir)
+        optimized = optimizer.optimize(find_pngs(self.static))
+        cached_file = optimized[self.path]
+        with open(cached_file, "rb") as file:
+            self.assertEqual(file.read(), optimize_png(self.png))
+        mtime = os.stat(cached_file).st_mtime_ns
+
+        self.assertEqual(optimizer.optimize([self.path]), optimized)
+        self.assertEqual(os.stat(cached_file).st_mtime_ns, mtime)
+
+        optimizer.optimize([])
+        self.assertEqual(os.listdir(cache_dir), ["index.json"])
+
+    def test_copy_publishes_replacements(self):
+        optimized = ImageOptimizer(os.path.join(self.tmp.name, "cache")).optimize(
+            find_pngs(self.static)
+        )
+        dest = os.path.join(self.tmp.name, "docs")
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_directory_recursive(self.static, dest, replacements=optimized)
+        with open(os.path.join(dest, "images", "hero.png"), "rb") as file:
+            self.assertEqual(file.read(), optimize_png(self.png))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -44,3 +44,9 @@ class TestLeafNode(unittest.TestCase):
         """This test checks the to_html function of the leaf nodes"""
         node = LeafNode("p", "Hello, world!")
         self.assertEqual(node.to_html(), "<p>Hello, world!</p>")
+
+    def test_no_instance_dict(self):
+        """This test checks that leaf nodes are slotted and carry no __dict__"""
+        node = LeafNode("p", "Hello, world!")
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertIsNone(node.children)
@@ -0,0 +1,138 @@
+"""This file contains the test cases for the generated section listings"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from catalog import SiteCatalog
+from generate_page import generate_pages_recursive
+from listings import ListingGenerator, build_listings, listing_key, section_of
+from manifest import BuildManifest
+from targets import Target
+
+TEMPLATE = "<title>{{ Title }}</title>{{ Content }}"
+
+
+class TestListings(unittest.TestCase):
+    """This class file is used for testing paginated section listings
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, TEMPLATE)
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        for day in range(1, 6):
+            self.write(
+                os.path.join(self.content, "blog", f"post{day}.md"),
+                f"---\ndate: 2024-01-0{day}\n---\n# Post {day}\n\nBody",
+            )
+        self.catalog = SiteCatalog(self.content)
+        self.manifest = BuildManifest.load(self.dest)
+
+    def tearDown(self):
+        self.catalog.close()
+        self.tmp.cleanup()
+
+    def write(self, path: str, text: str):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def read(self, *parts) -> str:
+        with open(os.path.join(self.dest, *parts), encoding="utf-8") as file:
+            return file.read()
+
+    def generate(self, basepath: str = "/") -> list[str]:
+        """Builds the pages and listings, returning the generated listings"""
+        output = io.StringIO()
+        generator = ListingGenerator(self.catalog, self.template, page_size=2)
+        with contextlib.redirect_stdout(output):
+            generate_pages_recursive(
+                self.content, self.template, self.dest, basepath, self.manifest, True
+            )
+            generator.generate(
+                [Target(basepath, self.dest, self.manifest)], incremental=True
+            )
+        return [
+            line.removeprefix("Generated listing: ")
+            for line in output.getvalue().splitlines()
+            if line.startswith("Generated listing: ")
+        ]
+
+    def test_section_of(self):
+        self.assertEqual(section_of("blog/tom/index.md"), "blog")
+        self.assertEqual(section_of("blog/post.md"), "blog")
+        self.assertEqual(section_of("about.md"), "")
+        self.assertIsNone(section_of("index.md"))
+
+    def test_listing_key(self):
+        self.assertEqual(listing_key("blog", 1, False), "blog/index.html")
+        self.assertEqual(listing_key("blog", 1, True), "blog/page/1/index.html")
+        self.assertEqual(listing_key("", 3, True), "page/3/index.html")
+
+    def test_pagination(self):
+        self.catalog.refresh()
+        listings = build_listings(self.catalog, page_size=2)
+        self.assertEqual(
+            [(listing.key, listing.title) for listing in listings],
+            [
+                ("blog/index.html", "Blog"),
+                ("blog/page/2/index.html", "Blog (page 2)"),
+                ("blog/page/3/index.html", "Blog (page 3)"),
+            ],
+        )
+        first, second, last = listings
+        self.assertEqual([page.title for page in first.entries], ["Post 5", "Post 4"])
+        self.assertEqual((first.newer, first.older), (None, "/blog/page/2/"))
+        self.assertEqual((second.newer, second.older), ("/blog/", "/blog/page/3/"))
+        self.assertEqual(len(last.entries), 1)
+        with self.assertRaises(ValueError):
+            build_listings(self.catalog, page_size=0)
+
+    def test_rendered_through_template(self):
+        self.generate("/v1/")
+        self.assertEqual(
+            self.read("blog", "page", "3", "index.html"),
+            "<title>Blog (page 3)</title><div><h1>Blog (page 3)</h1><ul>"
+            '<li><a href="/v1/blog/post1.html">Post 1</a></li></ul>'
+            '<nav><a href="/v1/blog/page/2/">Newer</a></nav></div>',
+        )
+
+    def test_only_listings_showing_a_change_are_regenerated(self):
+        self.assertEqual(len(self.generate()), 3)
+        self.assertEqual(self.generate(), [])
+
+        self.write(
+            os.path.join(self.content, "blog", "post1.md"),
+            "---\ndate: 2024-01-01\n---\n# Renamed\n\nBody",
+        )
+        self.assertEqual(
+            self.generate(), [os.path.join(self.dest, "blog", "page", "3", "index.html")]
+        )
+
+        self.write(
+            os.path.join(self.content, "blog", "post3.md"),
+            "---\ndate: 2024-01-03\n---\n# Post 3\n\nNew body",
+        )
+        self.assertEqual(self.generate(), [])
+
+    def test_stale_listings_are_removed(self):
+        self.generate()
+        os.remove(os.path.join(self.content, "blog", "post1.md"))
+        self.generate()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "page", "3")))
+        self.assertIn("blog/page/2/index.html", self.manifest.pages)
+        self.assertNotIn("blog/page/3/index.html", self.manifest.pages)
+
+
+if __name__ == "__main__":
+    unittest.main()
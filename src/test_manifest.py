@@ -0,0 +1,103 @@
+"""This file contains the test cases for the build manifest and incremental builds"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from generate_page import generate_pages_recursive
+from manifest import BuildManifest, manifest_path_for
+
+
+class TestBuildManifest(unittest.TestCase):
+    """This class file is used for testing incremental builds driven by the manifest
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.dest = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        """Writes a text file, creating its directory"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def build(self, incremental=True):
+        """Runs a build with a freshly loaded manifest and returns its output"""
+        manifest = BuildManifest.load(self.dest)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            generate_pages_recursive(
+                self.content, self.template, self.dest, "/", manifest, incremental
+            )
+        manifest.save()
+        return output.getvalue()
+
+    def test_manifest_saved_next_to_output(self):
+        """Tests that the manifest is written next to the output directory"""
+        self.build()
+        self.assertTrue(os.path.exists(manifest_path_for(self.dest)))
+        manifest = BuildManifest.load(self.dest)
+        self.assertEqual(sorted(manifest.pages), ["blog/post.html", "index.html"])
+
+    def test_unchanged_pages_skipped(self):
+        """Tests that a second build skips every unchanged page"""
+        self.build()
+        output = self.build()
+        self.assertNotIn("Generated page", output)
+        self.assertEqual(output.count("Skipped unchanged page"), 2)
+
+    def test_only_changed_page_rebuilt(self):
+        """Tests that editing one source only regenerates that page"""
+        self.build()
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nFixed")
+        output = self.build()
+        self.assertEqual(output.count("Generated page"), 1)
+        self.assertIn("post.html", output)
+
+    def test_template_change_rebuilds_all(self):
+        """Tests that editing the template regenerates every page"""
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        output = self.build()
+        self.assertEqual(output.count("Generated page"), 2)
+
+    def test_modified_output_rebuilt(self):
+        """Tests that a page whose output was tampered with is regenerated"""
+        self.build()
+        self.write(os.path.join(self.dest, "index.html"), "broken")
+        output = self.build()
+        self.assertEqual(output.count("Generated page"), 1)
+
+    def test_full_build_ignores_manifest(self):
+        """Tests that a non incremental build regenerates every page"""
+        self.build()
+        output = self.build(incremental=False)
+        self.assertEqual(output.count("Generated page"), 2)
+
+    def test_deleted_source_removes_output(self):
+        """Tests that the output of a deleted page is removed"""
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+        self.assertEqual(list(BuildManifest.load(self.dest).pages), ["index.html"])
+
+
+if __name__ == "__main__":
+    unittest.main()
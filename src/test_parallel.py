@@ -0,0 +1,130 @@
+"""This file contains the test cases for parallel page generation"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from generate_page import generate_pages_for_targets, generate_pages_recursive
+from manifest import BuildManifest
+from parallel import BuildError, WorkerPool, batch_size_for
+from targets import Target
+
+
+class TestParallel(unittest.TestCase):
+    """This class file is used for testing the process pool engine
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, '<title>{{ Title }}</title><a href="/">{{ Content }}')
+        for i in range(12):
+            self.write(
+                os.path.join(self.content, f"section{i % 3}", f"page{i}.md"),
+                f"# Page {i}\n\nSee [home](/) and **bold {i}**\n\n- one\n- two",
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        """Writes a text file, creating its directory"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def build(self, dest, jobs):
+        """Builds the content into dest and returns the outputs by relative path"""
+        manifest = BuildManifest.load(dest)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content, self.template, dest, "/base/", manifest, jobs=jobs
+            )
+        return self.read_outputs(dest), manifest
+
+    def read_outputs(self, dest):
+        """Returns the files under dest by relative path"""
+        outputs = {}
+        for root, _, files in os.walk(dest):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, "rb") as handle:
+                    outputs[os.path.relpath(path, dest)] = handle.read()
+        return outputs
+
+    def test_parallel_matches_serial(self):
+        """Tests that the parallel engine writes byte-identical output"""
+        serial, serial_manifest = self.build(os.path.join(self.root, "serial"), 1)
+        parallel, parallel_manifest = self.build(os.path.join(self.root, "parallel"), 4)
+        self.assertEqual(len(serial), 12)
+        self.assertEqual(serial, parallel)
+        self.assertEqual(
+            {key: entry["output"] for key, entry in serial_manifest.pages.items()},
+            {key: entry["output"] for key, entry in parallel_manifest.pages.items()},
+        )
+
+    def test_section_templates_in_workers(self):
+        """Tests that workers render each page with its section's template"""
+        self.write(
+            os.path.join(self.content, "section1", "_template.html"),
+            "<h2>{{ Title }}</h2>{{ Content }}",
+        )
+        serial, serial_manifest = self.build(os.path.join(self.root, "serial"), 1)
+        parallel, _ = self.build(os.path.join(self.root, "parallel"), 3)
+        self.assertEqual(serial, parallel)
+        self.assertTrue(serial[os.path.join("section1", "page1.html")].startswith(b"<h2>"))
+        self.assertTrue(serial[os.path.join("section0", "page0.html")].startswith(b"<title>"))
+        self.assertNotEqual(
+            serial_manifest.pages["section1/page1.html"]["template"],
+            serial_manifest.pages["section0/page0.html"]["template"],
+        )
+
+    def test_errors_reported_to_parent(self):
+        """Tests that failing pages are raised together after the others are written"""
+        self.write(os.path.join(self.content, "broken.md"), "No title here")
+        dest = os.path.join(self.root, "out")
+        with self.assertRaises(BuildError) as context:
+            self.build(dest, 3)
+        self.assertEqual(len(context.exception.failures), 1)
+        self.assertIn("No title found", str(context.exception))
+        self.assertTrue(os.path.exists(os.path.join(dest, "section0", "page0.html")))
+
+    def test_worker_pool_kept_across_builds(self):
+        """Tests that a worker pool serves several builds until its setup changes"""
+        serial, _ = self.build(os.path.join(self.root, "serial"), 1)
+        pool = WorkerPool()
+        try:
+            executors = []
+            for name in ("first", "second"):
+                dest = os.path.join(self.root, name)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_pages_for_targets(
+                        self.content,
+                        self.template,
+                        [Target("/base/", dest, BuildManifest.load(dest))],
+                        jobs=2,
+                        pool=pool,
+                    )
+                executors.append(pool.executor(2, (None, None, False, None)))
+                self.assertEqual(self.read_outputs(dest), serial)
+            self.assertIs(executors[0], executors[1])
+            self.assertIsNot(pool.executor(3, (None, None, False, None)), executors[0])
+        finally:
+            pool.shutdown()
+
+    def test_batch_size(self):
+        """Tests that batches give every worker several batches within bounds"""
+        self.assertEqual(batch_size_for(3, 8), 1)
+        self.assertEqual(batch_size_for(800, 4), 50)
+        self.assertEqual(batch_size_for(100000, 32), 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
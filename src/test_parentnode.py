@@ -64,3 +64,23 @@ class TestParentNode(unittest.TestCase):
             parent_node.to_html(),
             "<div><span><b>grandchild</b></span></div>",
         )
+
+    def test_write_html_streams_fragments(self):
+        """This test checks that write_html emits the same HTML as to_html in fragments"""
+        items = [ParentNode("li", [LeafNode(None, f"item {i}")]) for i in range(3)]
+        node = ParentNode("ul", items)
+        fragments = []
+        node.write_html(fragments.append)
+        self.assertGreater(len(fragments), 1)
+        self.assertEqual("".join(fragments), node.to_html())
+
+    def test_write_html_without_tag(self):
+        """This test checks that streaming a parent without a tag raises"""
+        with self.assertRaises(ValueError):
+            ParentNode(None, []).write_html(lambda fragment: None)
+
+    def test_no_instance_dict(self):
+        """This test checks that parent nodes are slotted and carry no __dict__"""
+        node = ParentNode("p", [])
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertIsNone(node.value)
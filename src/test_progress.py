@@ -0,0 +1,67 @@
+"""This file contains the test cases for the progress reporter"""
+
+import contextlib
+import io
+import unittest
+
+from progress import NORMAL, QUIET, VERBOSE, ProgressReporter
+
+
+class TestProgressReporter(unittest.TestCase):
+    """This class file is used for testing the buffered progress reporter
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def run_reporter(self, level):
+        """Reports one message per level and returns the output"""
+        reporter = ProgressReporter(level)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            reporter.report(None, "problem", QUIET)
+            reporter.report("generated", "page", NORMAL)
+            reporter.report(None, "detail", VERBOSE)
+            reporter.flush()
+        return output.getvalue()
+
+    def test_levels(self):
+        self.assertEqual(self.run_reporter(QUIET), "problem\n")
+        self.assertEqual(self.run_reporter(NORMAL), "problem\npage\n")
+        self.assertEqual(self.run_reporter(VERBOSE), "problem\npage\ndetail\n")
+
+    def test_buffers_until_full(self):
+        reporter = ProgressReporter(NORMAL, buffer_lines=3)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            reporter.report(None, "one")
+            reporter.report(None, "two")
+            self.assertEqual(output.getvalue(), "")
+            reporter.report(None, "three")
+            self.assertEqual(output.getvalue(), "one\ntwo\nthree\n")
+
+    def test_summary_counts_events_at_any_level(self):
+        reporter = ProgressReporter(QUIET)
+        self.assertEqual(reporter.summary(), "Nothing to do")
+        reporter.report("generated", "a")
+        reporter.report("generated", "b")
+        reporter.report("copied", "c")
+        self.assertEqual(reporter.summary(), "2 page(s) generated, 1 file(s) copied")
+
+    def test_aliased_paths(self):
+        reporter = ProgressReporter(NORMAL)
+        reporter.alias_path("docs.staging", "docs")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            reporter.report("generated", "Generated page: docs.staging/blog/index.html")
+            reporter.report(None, "Rebuilding docs.staging/index.html: template changed")
+            reporter.flush()
+        self.assertEqual(
+            output.getvalue(),
+            "Generated page: docs/blog/index.html\n"
+            "Rebuilding docs/index.html: template changed\n",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""This file contains the test cases for the search index"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from search import (
+    SearchIndex,
+    decode_postings,
+    encode_postings,
+    page_terms,
+    page_url,
+    search_state_path_for,
+    shard_of,
+    tokenize,
+)
+
+SHARDS = 8
+
+
+class TestSearch(unittest.TestCase):
+    """This class file is used for testing the sharded search index
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.home = os.path.join(self.content, "index.md")
+        self.post = os.path.join(self.content, "blog", "index.md")
+        self.write(self.home, "# Home\n\nWelcome to the **elven** [archive](/blog)")
+        self.write(self.post, "# Elves\n\n- Elven rings\n- Elven _ships_")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path: str, text: str):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def pages(self):
+        return [
+            (self.home, os.path.join(self.dest, "index.html")),
+            (self.post, os.path.join(self.dest, "blog", "index.html")),
+        ]
+
+    def lookup(self, term: str) -> list[str]:
+        """Looks a term up the way a client would, returning page URLs"""
+        search_dir = os.path.join(self.dest, "search")
+        with open(os.path.join(search_dir, "meta.json"), encoding="utf-8") as file:
+            meta = json.load(file)
+        shard_path = os.path.join(search_dir, f"{shard_of(term, meta['shards']):02x}.json")
+        with open(shard_path, encoding="utf-8") as file:
+            postings = decode_postings(json.load(file).get(term, []))
+        return [meta["docs"][str(doc_id)][0] for doc_id in postings]
+
+    def update(self, pages, source_hashes=None) -> int:
+        """Updates the index from its saved state and saves it again"""
+        search_index = SearchIndex(self.dest, shards=SHARDS)
+        indexed = search_index.update(pages, source_hashes)
+        search_index.save()
+        return indexed
+
+    def test_paths(self):
+        self.assertEqual(search_state_path_for("site/docs/"), "site/docs.search.json")
+        self.assertEqual(page_url("docs/blog/index.html", "docs", "/v1/"), "/v1/blog/")
+        self.assertEqual(page_url("docs/about.html", "docs", "/"), "/about.html")
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Élan, a DOG's 2nd-best"), ["élan", "dog", "2nd", "best"])
+
+    def test_postings_round_trip(self):
+        postings = {12: 1, 3: 2, 40: 5}
+        self.assertEqual(encode_postings(postings), [3, 2, 9, 1, 28, 5])
+        self.assertEqual(decode_postings(encode_postings(postings)), postings)
+
+    def test_page_terms_use_visible_text(self):
+        terms = page_terms(self.home)
+        self.assertEqual(terms["elven"], 1)
+        self.assertEqual(terms["archive"], 1)
+        self.assertNotIn("blog", terms)
+
+    def test_build_and_lookup(self):
+        self.assertEqual(self.update(self.pages()), 2)
+        self.assertEqual(self.lookup("elven"), ["/", "/blog/"])
+        self.assertEqual(self.lookup("ships"), ["/blog/"])
+        self.assertEqual(self.lookup("missing"), [])
+        shard_files = os.listdir(os.path.join(self.dest, "search"))
+        self.assertEqual(len(shard_files), SHARDS + 1)
+
+    def test_incremental_update(self):
+        self.update(self.pages())
+        self.assertEqual(self.update(self.pages()), 0)
+
+        ships = os.path.join(self.dest, "search", f"{shard_of('ships', SHARDS):02x}.json")
+        with open(ships, encoding="utf-8") as file:
+            before = file.read()
+        self.write(self.home, "# Home\n\nWelcome to the hobbit archive")
+        self.assertEqual(self.update(self.pages()), 1)
+        self.assertEqual(self.lookup("elven"), ["/blog/"])
+        self.assertEqual(self.lookup("hobbit"), ["/"])
+        if shard_of("ships", SHARDS) not in {
+            shard_of(term, SHARDS) for term in ("elven", "hobbit", "welcome", "to", "the")
+        }:
+            with open(ships, encoding="utf-8") as file:
+                self.assertEqual(file.read(), before)
+
+    def test_state_saved_only_on_save(self):
+        SearchIndex(self.dest, shards=SHARDS).update(self.pages())
+        self.assertFalse(os.path.exists(search_state_path_for(self.dest)))
+        self.assertEqual(self.update(self.pages()), 2)
+
+    def test_uses_given_source_hashes(self):
+        self.update(self.pages())
+        self.write(self.home, "# Home\n\nWelcome to the hobbit archive")
+        recorded = {dest_path: "recorded" for _, dest_path in self.pages()}
+        self.update(self.pages(), recorded)
+        self.assertEqual(self.update(self.pages(), recorded), 0)
+        self.assertEqual(self.lookup("hobbit"), ["/"])
+
+    def test_removed_page_is_dropped(self):
+        self.update(self.pages())
+        self.update(self.pages()[:1])
+        self.assertEqual(self.lookup("ships"), [])
+        self.assertEqual(self.lookup("elven"), ["/"])
+
+
+if __name__ == "__main__":
+    unittest.main()
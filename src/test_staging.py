@@ -0,0 +1,116 @@
+"""This file contains the test cases for the staging build"""
+
+import os
+import tempfile
+import time
+import unittest
+
+from generate_page import write_page
+from staging import (
+    discard_staging,
+    prepare_staging,
+    replace_if_changed,
+    staging_path_for,
+    swap_in,
+)
+from template import CompiledTemplate
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+
+class TestStaging(unittest.TestCase):
+    """This class file is used for testing the staging directory and its swap
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.dest, "blog"))
+        self.write(os.path.join(self.dest, "index.html"), "old home")
+        self.write(os.path.join(self.dest, "blog", "index.html"), "old blog")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path: str, text: str):
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def read(self, path: str) -> str:
+        with open(path, "r", encoding="utf-8") as file:
+            return file.read()
+
+    def test_staging_path(self):
+        self.assertEqual(staging_path_for("site/docs/"), "site/docs.staging")
+
+    def test_staging_is_a_hardlinked_clone(self):
+        staging = prepare_staging(self.dest)
+        self.assertEqual(staging, self.dest + ".staging")
+        live = os.stat(os.path.join(self.dest, "blog", "index.html"))
+        staged = os.stat(os.path.join(staging, "blog", "index.html"))
+        self.assertEqual((live.st_ino, live.st_mtime_ns), (staged.st_ino, staged.st_mtime_ns))
+
+    def test_prepare_replaces_leftovers(self):
+        staging = prepare_staging(self.dest)
+        self.write(os.path.join(staging, "half-written.html"), "")
+        staging = prepare_staging(self.dest)
+        self.assertEqual(sorted(os.listdir(staging)), ["blog", "index.html"])
+
+    def test_discard_keeps_output(self):
+        staging = prepare_staging(self.dest)
+        self.write(os.path.join(staging, "index.html.tmp"), "half written")
+        discard_staging(staging)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["docs"])
+        self.assertEqual(self.read(os.path.join(self.dest, "index.html")), "old home")
+
+    def test_prepare_without_output(self):
+        staging = prepare_staging(os.path.join(self.tmp.name, "new"))
+        self.assertEqual(os.listdir(staging), [])
+
+    def test_swap_in(self):
+        staging = prepare_staging(self.dest)
+        tmp_path = os.path.join(staging, "index.html.tmp")
+        self.write(tmp_path, "new home")
+        replace_if_changed(tmp_path, os.path.join(staging, "index.html"))
+        self.assertEqual(self.read(os.path.join(self.dest, "index.html")), "old home")
+
+        swap_in(staging, self.dest)
+        self.assertEqual(self.read(os.path.join(self.dest, "index.html")), "new home")
+        self.assertEqual(self.read(os.path.join(self.dest, "blog", "index.html")), "old blog")
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["docs"])
+
+    def test_swap_in_without_output(self):
+        new = os.path.join(self.tmp.name, "new")
+        staging = prepare_staging(new)
+        swap_in(staging, new)
+        self.assertTrue(os.path.isdir(new))
+        self.assertFalse(os.path.exists(staging))
+
+    def test_replace_if_changed(self):
+        path = os.path.join(self.dest, "index.html")
+        mtime = os.stat(path).st_mtime_ns
+        self.write(path + ".tmp", "old home")
+        self.assertFalse(replace_if_changed(path + ".tmp", path))
+        self.assertFalse(os.path.exists(path + ".tmp"))
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        self.write(path + ".tmp", "new home")
+        self.assertTrue(replace_if_changed(path + ".tmp", path))
+        self.assertEqual(self.read(path), "new home")
+
+    def test_identical_page_keeps_mtime(self):
+        source = os.path.join(self.tmp.name, "index.md")
+        self.write(source, "# Home\n\nHello")
+        template = CompiledTemplate(TEMPLATE)
+        dest_path = os.path.join(self.dest, "index.html")
+        first = write_page(source, template, dest_path)
+        mtime = os.stat(dest_path).st_mtime_ns
+        time.sleep(0.01)
+        self.assertEqual(write_page(source, template, dest_path), first)
+        self.assertEqual(os.stat(dest_path).st_mtime_ns, mtime)
+
+
+if __name__ == "__main__":
+    unittest.main()
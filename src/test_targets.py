@@ -0,0 +1,127 @@
+"""This file contains the test cases for emitting several basepath targets"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from generate_page import (
+    generate_pages_for_targets,
+    generate_pages_recursive,
+    write_page_variants,
+)
+from html_writer import HTMLWriter
+from manifest import BuildManifest
+from targets import FanoutWriter, Target, parse_target
+from template import CompiledTemplate, rewrite_urls
+
+
+class TestTargets(unittest.TestCase):
+    """This class file is used for testing multi-target output
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.template = os.path.join(self.root, "template.html")
+        self.write(self.template, '<link href="/index.css">{{ Title }}{{ Content }}')
+        self.write(
+            os.path.join(self.content, "index.md"),
+            "# Home\n\n[Blog](/blog) and ![logo](/logo.png)",
+        )
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        """Writes a text file, creating its directory"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def read_tree(self, directory):
+        """Returns the HTML files of a directory by relative path"""
+        outputs = {}
+        for root, _, files in os.walk(directory):
+            for file in files:
+                path = os.path.join(root, file)
+                with open(path, encoding="utf-8") as handle:
+                    outputs[os.path.relpath(path, directory)] = handle.read()
+        return outputs
+
+    def test_parse_target(self):
+        target = parse_target("/archive/v1/:dist/v1")
+        self.assertEqual((target.basepath, target.dest_dir), ("/archive/v1/", "dist/v1"))
+        with self.assertRaises(ValueError):
+            parse_target("dist")
+
+    def test_fanout_matches_rewrite(self):
+        basepaths = ["/", "/staging/", "/archive/v1/"]
+        sinks = [io.StringIO() for _ in basepaths]
+        fanout = FanoutWriter([HTMLWriter(sink) for sink in sinks], basepaths)
+        fragments = ['<a href="/blog">', "plain", '<img src="/a.png" href="/b">']
+        for fragment in fragments:
+            fanout.write(fragment)
+        for writer in fanout.writers:
+            writer.flush()
+        for sink, basepath in zip(sinks, basepaths):
+            self.assertEqual(sink.getvalue(), rewrite_urls("".join(fragments), basepath))
+
+    def test_targets_match_separate_builds(self):
+        basepaths = ["/", "/staging/", "/archive/v1/"]
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i, basepath in enumerate(basepaths):
+                dest = os.path.join(self.root, f"single{i}")
+                generate_pages_recursive(self.content, self.template, dest, basepath)
+            generate_pages_for_targets(
+                self.content,
+                self.template,
+                [
+                    Target(basepath, os.path.join(self.root, f"multi{i}"))
+                    for i, basepath in enumerate(basepaths)
+                ],
+            )
+        for i in range(len(basepaths)):
+            single = self.read_tree(os.path.join(self.root, f"single{i}"))
+            self.assertEqual(len(single), 2)
+            self.assertEqual(single, self.read_tree(os.path.join(self.root, f"multi{i}")))
+
+    def test_incremental_per_target(self):
+        def build():
+            targets = [
+                Target("/", os.path.join(self.root, "a")),
+                Target("/b/", os.path.join(self.root, "b")),
+            ]
+            for target in targets:
+                target.manifest = BuildManifest.load(target.dest_dir)
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                generate_pages_for_targets(
+                    self.content, self.template, targets, incremental=True, jobs=2
+                )
+            for target in targets:
+                target.manifest.save()
+            return output.getvalue()
+
+        self.assertEqual(build().count("Generated page"), 4)
+        os.remove(os.path.join(self.root, "b", "index.html"))
+        output = build()
+        self.assertEqual(output.count("Generated page"), 1)
+        self.assertEqual(output.count("Skipped unchanged page"), 3)
+
+    def test_variants_need_root_template(self):
+        template = CompiledTemplate("{{ Content }}", "/site/")
+        source = os.path.join(self.content, "index.md")
+        dest = os.path.join(self.root, "x.html")
+        with self.assertRaises(ValueError):
+            write_page_variants(source, template, [(dest, "/")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""This file contains the test cases for the compiled page template"""
+
+import os
+import tempfile
+import unittest
+
+import template as template_module
+from template import (
+    CompiledTemplate,
+    TemplateSet,
+    resolve_template,
+    rewrite_urls,
+    template_path_for,
+)
+
+
+def reference_render(source, title, content, basepath):
+    """The replace based rendering the compiled template must match"""
+    final_content = source.replace("{{ Title }}", title)
+    final_content = final_content.replace("{{ Content }}", content)
+    final_content = final_content.replace('href="/', f'href="{basepath}')
+    return final_content.replace('src="/', f'src="{basepath}')
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    """This class file is used for testing compiled templates
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    source = (
+        '<title>{{ Title }}</title><link href="/index.css" />'
+        "<h1>{{ Title }}</h1><article>{{ Content }}</article>"
+    )
+    content = '<p><a href="/blog">Blog</a><img src="/images/a.png" alt="a"></img></p>'
+
+    def test_chunks_and_slots(self):
+        """Tests that the template is split into chunks around its slots"""
+        template = CompiledTemplate(self.source)
+        self.assertEqual(template.slots, ["Title", "Title", "Content"])
+        self.assertEqual(len(template.chunks), 4)
+
+    def test_basepath_applied_to_chunks(self):
+        """Tests that the basepath rewrite is applied to the template once"""
+        template = CompiledTemplate(self.source, "/site/")
+        self.assertIn('href="/site/index.css"', template.chunks[1])
+
+    def test_render_matches_replace(self):
+        """Tests that rendering matches the replace based rendering"""
+        for basepath in ["/", "/site/", "https://example.com/"]:
+            template = CompiledTemplate(self.source, basepath)
+            self.assertEqual(
+                template.render("Title", self.content),
+                reference_render(self.source, "Title", self.content, basepath),
+            )
+
+    def test_template_without_slots(self):
+        """Tests that a template without slots renders unchanged"""
+        template = CompiledTemplate("<p>static</p>")
+        self.assertEqual(template.render("Title", "body"), "<p>static</p>")
+
+    def test_rewrite_urls_root_basepath(self):
+        """Tests that the root basepath leaves URLs untouched"""
+        self.assertEqual(rewrite_urls(self.content, "/"), self.content)
+
+    def test_load_reuses_compiled_template_until_changed(self):
+        """Tests that loading an unchanged file returns the compiled template"""
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "template.html")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(self.source)
+            template = CompiledTemplate.load(path)
+            self.assertIs(CompiledTemplate.load(path), template)
+            self.assertIsNot(CompiledTemplate.load(path, "/site/"), template)
+
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("<p>{{ Content }}</p>")
+            changed = CompiledTemplate.load(path)
+            self.assertIsNot(changed, template)
+            self.assertEqual(changed.render("Title", "body"), "<p>body</p>")
+
+
+
+class TestTemplateEngine(unittest.TestCase):
+    """This class file is used for testing includes, layouts and section templates
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = os.path.join(self.root, "content")
+        self.write(
+            "base.html",
+            '<head>{% block head %}<title>{{ Title }}</title>{% endblock %}</head>'
+            '{% include "partials/nav.html" %}'
+            "<main>{% block main %}{{ Content }}{% endblock %}</main>",
+        )
+        self.write("partials/nav.html", '<nav><a href="/">Home</a></nav>')
+        self.write(
+            "template.html",
+            '{% extends "base.html" %}{% block main %}<article>{{ Content }}</article>'
+            "{% endblock %}ignored outside blocks",
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str) -> str:
+        path = os.path.join(self.root, *name.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return path
+
+    def test_extends_and_includes(self):
+        """Tests that blocks are replaced, defaults kept and includes inlined"""
+        source, files = resolve_template(os.path.join(self.root, "template.html"))
+        self.assertEqual(
+            source,
+            "<head><title>{{ Title }}</title></head>"
+            '<nav><a href="/">Home</a></nav>'
+            "<main><article>{{ Content }}</article></main>",
+        )
+        self.assertEqual(
+            sorted(os.path.relpath(path, self.root) for path in files),
+            ["base.html", os.path.join("partials", "nav.html"), "template.html"],
+        )
+
+    def test_multi_level_layouts(self):
+        """Tests that a template can extend a template that extends another"""
+        path = self.write(
+            "post.html", '{% extends "template.html" %}{% block head %}<b>{% endblock %}'
+        )
+        template = CompiledTemplate.load(path, "/site/")
+        self.assertEqual(
+            template.render("T", "C"),
+            '<head><b></head><nav><a href="/site/">Home</a></nav>'
+            "<main><article>C</article></main>",
+        )
+
+    def test_cycle_raises(self):
+        """Tests that a template including itself is an error"""
+        path = self.write("loop.html", '<p>{% include "loop.html" %}</p>')
+        with self.assertRaises(ValueError):
+            resolve_template(path)
+
+    def test_identical_templates_compiled_once(self):
+        """Tests that loading an unchanged template returns the compiled one"""
+        path = os.path.join(self.root, "template.html")
+        template = CompiledTemplate.load(path)
+        self.assertIs(CompiledTemplate.load(path), template)
+        self.write("partials/nav.html", "<nav></nav>")
+        changed = CompiledTemplate.load(path)
+        self.assertNotEqual(changed.digest, template.digest)
+        compiled = template_module._compiled  # pylint: disable=protected-access
+        entries = [key for key in compiled if key[0] == path]
+        self.assertEqual(entries, [(path, "/")])
+
+    def test_section_templates(self):
+        """Tests that pages use the nearest _template.html of their directory"""
+        default = os.path.join(self.root, "template.html")
+        blog = self.write("content/blog/_template.html", "<h2>{{ Title }}</h2>")
+        post = os.path.join(self.content, "blog", "2024", "post.md")
+        home = os.path.join(self.content, "index.md")
+        self.assertEqual(template_path_for(post, self.content, default), blog)
+        self.assertEqual(template_path_for(home, self.content, default), default)
+
+        templates = TemplateSet(self.content, default)
+        self.assertEqual(templates.for_source(post).render("Post", ""), "<h2>Post</h2>")
+        self.assertIs(templates.for_source(post), templates.for_source(post))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -41,5 +41,13 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("Not Random text", TextType.ITALICS, "https://www.yahoo.co.in")
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        """This test checks that text nodes are slotted and carry no __dict__"""
+        node = TextNode("Random text", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "value"
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,118 @@
+"""This file contains the test cases for build tracing"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from generate_page import generate_pages_recursive
+from leafnode import LeafNode
+from template import CompiledTemplate
+from tracing import (
+    PAGE_STAGES,
+    StageTimer,
+    Tracer,
+    active_tracer,
+    start_tracing,
+    stop_tracing,
+)
+
+
+class TestTracing(unittest.TestCase):
+    """This class file is used for testing trace spans and stage timing
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.template = os.path.join(self.tmp.name, "template.html")
+        self.dest = os.path.join(self.tmp.name, "docs")
+        os.makedirs(self.content)
+        with open(self.template, "w", encoding="utf-8") as file:
+            file.write("{{ Title }}{{ Content }}")
+        for name in ("a", "b", "c"):
+            path = os.path.join(self.content, f"{name}.md")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(f"# {name}\n\nSome **text**")
+
+    def tearDown(self):
+        stop_tracing()
+        self.tmp.cleanup()
+
+    def build(self, jobs):
+        """Builds the pages and returns the recorded events"""
+        tracer = start_tracing()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                self.content, self.template, self.dest, "/", jobs=jobs
+            )
+        return tracer.events
+
+    def test_stage_timer_charges_innermost_stage(self):
+        timer = StageTimer()
+        lines = list(timer.iterate("read", iter(["a", "b"])))
+        self.assertEqual(lines, ["a", "b"])
+        self.assertGreater(timer.totals["read"], 0)
+        timer.enter("write")
+        timer.leave()
+        self.assertGreater(timer.totals["write"], 0)
+
+    def test_template_fill_is_its_own_stage(self):
+        template = CompiledTemplate("<title>{{ Title }}</title>{{ Content }}")
+        timer = StageTimer()
+        timer.enter("template")
+        fragments = []
+        template.write(fragments.append, "T", timer.node("render", LeafNode("p", "x")))
+        timer.leave()
+        self.assertEqual("".join(fragments), "<title>T</title><p>x</p>")
+        self.assertGreater(timer.totals["template"], 0)
+        self.assertGreater(timer.totals["render"], 0)
+
+    def test_stage_spans_fill_page_span(self):
+        tracer = Tracer()
+        timer = StageTimer()
+        timer.record(tracer, "page.md", 100.0, {"output": "page.html"})
+        page, *stages = tracer.events[1:]
+        self.assertEqual(page["name"], "page.md")
+        self.assertEqual([stage["name"] for stage in stages], list(PAGE_STAGES))
+        self.assertAlmostEqual(sum(stage["dur"] for stage in stages), page["dur"])
+        self.assertEqual(stages[-1]["ts"] + stages[-1]["dur"], page["ts"] + page["dur"])
+        self.assertIn("render_ms", page["args"])
+
+    def test_serial_build_records_pages_and_stages(self):
+        events = self.build(jobs=1)
+        names = [event["name"] for event in events]
+        for name in ("template", "discover", "generate") + PAGE_STAGES:
+            self.assertIn(name, names)
+        pages = [event for event in events if event.get("cat") == "page"]
+        self.assertEqual(len(pages), 3)
+
+    def test_parallel_build_collects_worker_events(self):
+        events = self.build(jobs=2)
+        pids = {event["pid"] for event in events if event.get("cat") == "page"}
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(len([event for event in events if event.get("cat") == "page"]), 3)
+        self.assertIn("batch", [event["name"] for event in events])
+
+    def test_save_writes_chrome_trace(self):
+        tracer = Tracer()
+        with tracer.span("work", files=2):
+            pass
+        path = os.path.join(self.tmp.name, "trace.json")
+        tracer.save(path)
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        self.assertEqual(data["traceEvents"][0]["ph"], "M")
+        self.assertEqual(data["traceEvents"][1]["args"], {"files": 2})
+
+    def test_tracing_off_by_default(self):
+        self.assertIsNone(active_tracer())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
 """This module contains the test cases for testing the utils class"""
 
+import random
 import textwrap
 import unittest
 
@@ -13,7 +14,10 @@ from utils import (
     markdown_to_html_node,
     split_nodes_delimiter,
     split_nodes_image,
+    split_nodes_inline,
     split_nodes_link,
+    split_nodes_multipass,
+    split_title,
     text_to_textnodes,
 )
 
@@ -248,6 +252,47 @@ class TestUtils(unittest.TestCase):
         # Adjust this test based on how split_nodes_link works
         self.assertTrue(any(node.text_type == TextType.LINK for node in result))
 
+    def test_single_pass_mixed_inline(self):
+        """Tests that the single pass tokenizer handles every inline construct"""
+        text = "**b** _i_ `c` ![alt](img.png) [text](https://x.com/a?b=1)"
+        self.assertEqual(
+            split_nodes_inline(text),
+            [
+                TextNode("b", TextType.BOLD),
+                TextNode(" ", TextType.TEXT),
+                TextNode("i", TextType.ITALICS),
+                TextNode(" ", TextType.TEXT),
+                TextNode("c", TextType.CODE),
+                TextNode(" ", TextType.TEXT),
+                TextNode("alt", TextType.IMAGE, "img.png"),
+                TextNode(" ", TextType.TEXT),
+                TextNode("text", TextType.LINK, "https://x.com/a?b=1"),
+            ],
+        )
+
+    def test_single_pass_unmatched_delimiter(self):
+        """Tests that unmatched delimiters raise the same error as the splitters"""
+        self.assertIsNone(split_nodes_inline("This is **unclosed"))
+        with self.assertRaises(ValueError) as context:
+            text_to_textnodes("This is **unclosed")
+        self.assertIn('"**"', str(context.exception))
+
+    def test_single_pass_matches_multipass(self):
+        """Tests the single pass tokenizer against the multi-pass splitters
+        on random combinations of inline markdown"""
+        pieces = ["**", "*", "_", "`", "[", "]", "(", ")", "!", "a", " ", "\n",
+                  "![x](y)", "[l](u)", "**b**", "_i_", "`c`"]
+        rng = random.Random(5)
+        for _ in range(5000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 10)))
+            try:
+                expected = split_nodes_multipass(text)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    text_to_textnodes(text)
+                continue
+            self.assertEqual(text_to_textnodes(text), expected, repr(text))
+
     def test_single_paragraph_block(self):
         """Test that a single paragraph is correctly parsed into one block."""
         md = "This is a single paragraph."
@@ -574,3 +619,11 @@ class TestUtils(unittest.TestCase):
         with self.assertRaises(ValueError) as context:
             extract_title(markdown)
         self.assertEqual(str(context.exception), "No title found")
+
+    def test_split_title_keeps_lines(self):
+        lines = iter(["Intro\n", "# The Title\n", "\n", "Body\n"])
+        title, rest = split_title(lines)
+        self.assertEqual(title, "The Title")
+        self.assertEqual(list(rest), ["Intro\n", "# The Title\n", "\n", "Body\n"])
+        with self.assertRaises(ValueError):
+            split_title(["no title\n"])
@@ -0,0 +1,198 @@
+"""This file contains the test cases for the watch mode"""
+
+import contextlib
+import io
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import zlib
+
+from copy_directory import copy_directory_recursive
+from generate_page import generate_pages_recursive
+from images import ImageOptimizer, optimize_png
+from manifest import BuildManifest
+from watch import PollingWatcher, Rebuilder, create_watcher
+
+
+class TestWatch(unittest.TestCase):
+    """This class file is used for testing targeted rebuilds in watch mode
+
+    Args:
+        unittest (TestCase): Base class TestCase
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.dest = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        self.write(os.path.join(self.content, "blog", "post.md"), "# Post\n\nText")
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+
+        self.manifest = BuildManifest.load(self.dest)
+        with contextlib.redirect_stdout(io.StringIO()):
+            copy_directory_recursive(self.static, self.dest, self.manifest)
+            generate_pages_recursive(
+                self.content, self.template, self.dest, "/", self.manifest
+            )
+        self.rebuilder = Rebuilder(
+            self.content, self.static, self.template, self.dest, "/", self.manifest
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        """Writes a text file, creating its directory"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def read(self, *parts):
+        """Reads a file of the output directory"""
+        with open(os.path.join(self.dest, *parts), encoding="utf-8") as file:
+            return file.read()
+
+    def apply(self, *paths):
+        """Applies changes and returns the actions, silencing page output"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.rebuilder.apply(paths)
+
+    def test_markdown_edit_rebuilds_one_page(self):
+        """Tests that editing a page regenerates only that page"""
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Post\n\nEdited")
+        actions = self.apply(post)
+        self.assertEqual(len(actions), 1)
+        self.assertIn("Edited", self.read("blog", "post.html"))
+
+    def test_deleted_markdown_removes_page(self):
+        """Tests that deleting a page removes its output"""
+        post = os.path.join(self.content, "blog", "post.md")
+        os.remove(post)
+        self.assertEqual(self.apply(post), [f"Removed stale page: {self.dest}/blog/post.html"])
+        self.assertNotIn("blog/post.html", self.manifest.pages)
+
+    def test_broken_markdown_reported(self):
+        """Tests that a page failing to generate is reported instead of raising"""
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "no title")
+        self.assertIn("Failed to generate", self.apply(post)[0])
+
+    def test_template_edit_rebuilds_all_pages(self):
+        """Tests that editing the template regenerates every page"""
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.apply(self.template)
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+        self.assertTrue(self.read("blog", "post.html").startswith("<h1>Post</h1>"))
+
+    def test_template_change_errors_reported(self):
+        """Tests that a broken template or page keeps the watch going"""
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "no title")
+        self.assertIn("Failed to regenerate", self.apply(self.template)[0])
+
+        self.write(post, "# Post\n\nFixed")
+        self.apply(self.template)
+        self.assertTrue(self.read("blog", "post.html").startswith("<h1>Post</h1>"))
+
+    def test_broken_template_keeps_previous_one(self):
+        """Tests that pages use the last template that compiled until it is fixed"""
+        self.write(self.template, '{% include "missing.html" %}{{ Content }}')
+        self.assertIn("Failed to compile", self.apply(self.template)[0])
+        home = os.path.join(self.content, "index.md")
+        self.write(home, "# Home\n\nEdited")
+        self.apply(home)
+        self.assertTrue(self.read("index.html").startswith("<title>Home</title>"))
+
+        self.write(os.path.join(os.path.dirname(self.template), "missing.html"), "<nav/>")
+        self.apply(self.template)
+        self.assertTrue(self.read("index.html").startswith("<nav/><div><h1>Home</h1>"))
+
+    def test_section_template_edit_rebuilds_its_pages(self):
+        """Tests that adding a section template regenerates only that section"""
+        home = os.stat(os.path.join(self.dest, "index.html")).st_mtime_ns
+        section_template = os.path.join(self.content, "blog", "_template.html")
+        self.write(section_template, "<h2>{{ Title }}</h2>{{ Content }}")
+        self.apply(section_template)
+        self.assertTrue(self.read("blog", "post.html").startswith("<h2>Post</h2>"))
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.html")).st_mtime_ns, home)
+
+    def test_asset_changes(self):
+        """Tests that asset edits, additions and deletions sync one file"""
+        css = os.path.join(self.static, "index.css")
+        self.write(css, "body { margin: 0 }")
+        self.apply(css)
+        self.assertEqual(self.read("index.css"), "body { margin: 0 }")
+
+        image = os.path.join(self.static, "images", "a.png")
+        self.write(image, "png")
+        self.apply(image)
+        self.assertIn("images/a.png", self.manifest.assets)
+
+        os.remove(image)
+        self.apply(image)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "images")))
+        self.assertEqual(self.manifest.assets, ["index.css"])
+
+    def test_png_change_publishes_optimized_image(self):
+        """Tests that an edited PNG is published as a full build would"""
+
+        def chunk(chunk_type: bytes, body: bytes) -> bytes:
+            crc = struct.pack(">I", zlib.crc32(chunk_type + body))
+            return struct.pack(">I", len(body)) + chunk_type + body + crc
+
+        rows = b"".join(b"\x00" + bytes(30) for _ in range(10))
+        png = b"".join(
+            [
+                b"\x89PNG\r\n\x1a\n",
+                chunk(b"IHDR", struct.pack(">IIBBBBB", 10, 10, 8, 2, 0, 0, 0)),
+                chunk(b"tEXt", b"Comment\x00" + b"x" * 100),
+                chunk(b"IDAT", zlib.compress(rows, 0)),
+                chunk(b"IEND", b""),
+            ]
+        )
+        image = os.path.join(self.static, "a.png")
+        with open(image, "wb") as file:
+            file.write(png)
+        self.rebuilder.optimizer = ImageOptimizer(os.path.join(self.tmp.name, "cache"))
+        self.apply(image)
+        with open(os.path.join(self.dest, "a.png"), "rb") as file:
+            self.assertEqual(file.read(), optimize_png(png))
+
+    def test_polling_watcher(self):
+        """Tests that the polling watcher reports changed and deleted files"""
+        watcher = PollingWatcher([self.content], interval=0.001)
+        post = os.path.join(self.content, "blog", "post.md")
+        self.write(post, "# Post\n\nChanged text")
+        os.remove(os.path.join(self.content, "index.md"))
+        self.assertEqual(
+            watcher.changes(0.1), {post, os.path.join(self.content, "index.md")}
+        )
+        self.assertEqual(watcher.changes(0.01), set())
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_watcher(self):
+        """Tests that the inotify watcher reports files in new directories"""
+        watcher = create_watcher([self.content])
+        try:
+            new_dir = os.path.join(self.content, "new")
+            os.makedirs(new_dir)
+            self.assertEqual(watcher.changes(1), set())
+            page = os.path.join(new_dir, "page.md")
+            self.write(page, "# New")
+            changed = watcher.changes(1)
+            self.assertIn(page, changed)
+        finally:
+            watcher.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,8 @@
 class TextNode:
     """Text node class"""
 
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -0,0 +1,216 @@
+"""This module records build spans in the Chrome trace event format.
+
+The resulting JSON file opens in chrome://tracing and https://ui.perfetto.dev.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Stages a page goes through; "template" is filling the template around the
+# content, whose HTML is charged to "render"
+PAGE_STAGES = ("read", "parse", "render", "template", "write")
+
+
+def now_us() -> float:
+    """Returns a timestamp in microseconds on a clock shared by all processes"""
+    return time.monotonic_ns() / 1000
+
+
+class Tracer:
+    """Collects trace events of one process"""
+
+    def __init__(self, process_name: str = "build"):
+        self.pid = os.getpid()
+        self.events = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": 0,
+                "args": {"name": f"{process_name} ({self.pid})"},
+            }
+        ]
+
+    def add_span(
+        self,
+        name: str,
+        start: float,
+        duration: float,
+        category: str = "build",
+        args: dict | None = None,
+    ):
+        """Records a complete span
+
+        Args:
+            name (str): Span name.
+            start (float): Start timestamp in microseconds, see now_us.
+            duration (float): Duration in microseconds.
+            category (str, optional): Span category. Defaults to "build".
+            args (dict, optional): Details shown with the span. Defaults to None.
+        """
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start,
+            "dur": duration,
+            "pid": self.pid,
+            "tid": threading.get_native_id(),
+        }
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, category: str = "build", **args):
+        """Records the time spent in the with block as a span"""
+        start = now_us()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, now_us() - start, category, args)
+
+    def take_events(self) -> list[dict]:
+        """Returns and forgets the events recorded so far"""
+        events, self.events = self.events, []
+        return events
+
+    def merge(self, events: list[dict]):
+        """Adds events recorded by another process, e.g. a worker"""
+        self.events.extend(events)
+
+    def save(self, path: str):
+        """Writes the events as a Chrome trace file
+
+        Args:
+            path (str): Trace file path
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, file)
+
+
+class StageTimer:
+    """Splits the time spent on a page between its stages.
+
+    Streaming interleaves reading, parsing, rendering and writing, so each
+    stage is charged only while it is the innermost stage running.
+    """
+
+    def __init__(self, base_stage: str = "render"):
+        self.totals = dict.fromkeys(PAGE_STAGES, 0)
+        self._stack = [base_stage]
+        self._mark = time.perf_counter_ns()
+
+    def _charge(self):
+        now = time.perf_counter_ns()
+        self.totals[self._stack[-1]] += now - self._mark
+        self._mark = now
+
+    def enter(self, stage: str):
+        """Starts charging time to stage until the matching leave"""
+        self._charge()
+        self._stack.append(stage)
+
+    def leave(self):
+        """Goes back to charging the enclosing stage"""
+        self._charge()
+        self._stack.pop()
+
+    def iterate(self, stage: str, iterable):
+        """Yields from iterable, charging the time taken by each step to stage"""
+        iterator = iter(iterable)
+        while True:
+            self.enter(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.leave()
+            yield item
+
+    def sink(self, sink):
+        """Wraps a binary sink so its writes are charged to the write stage"""
+        return _TimedSink(sink, self)
+
+    def node(self, stage: str, node):
+        """Wraps a node so writing its HTML is charged to stage"""
+        return _TimedNode(node, stage, self)
+
+    def record(self, tracer: Tracer, name: str, start: float, args: dict):
+        """Records the page span followed by one span per stage. The stage
+        spans are laid out back to back inside the page span, each as long
+        as the total time charged to it.
+
+        Args:
+            tracer (Tracer): Tracer to record into.
+            name (str): Name of the page span.
+            start (float): Start timestamp of the page in microseconds.
+            args (dict): Details shown with the page span.
+        """
+        self._charge()
+        durations = {stage: total / 1000 for stage, total in self.totals.items()}
+        args = dict(args, **{f"{stage}_ms": us / 1000 for stage, us in durations.items()})
+        tracer.add_span(name, start, sum(durations.values()), "page", args)
+        for stage in PAGE_STAGES:
+            tracer.add_span(stage, start, durations[stage], "stage")
+            start += durations[stage]
+
+
+class _TimedSink:
+    def __init__(self, sink, timer: StageTimer):
+        self._sink = sink
+        self._timer = timer
+
+    def write(self, data):
+        self._timer.enter("write")
+        try:
+            return self._sink.write(data)
+        finally:
+            self._timer.leave()
+
+
+class _TimedNode:
+    def __init__(self, node, stage: str, timer: StageTimer):
+        self._node = node
+        self._stage = stage
+        self._timer = timer
+
+    def write_html(self, write):
+        self._timer.enter(self._stage)
+        try:
+            self._node.write_html(write)
+        finally:
+            self._timer.leave()
+
+
+# Tracer of the current process, None while tracing is off
+_tracer = None
+
+
+def start_tracing(process_name: str = "build") -> Tracer:
+    """Turns tracing on for the current process and returns its tracer"""
+    global _tracer  # pylint: disable=global-statement
+    _tracer = Tracer(process_name)
+    return _tracer
+
+
+def stop_tracing():
+    """Turns tracing off for the current process"""
+    global _tracer  # pylint: disable=global-statement
+    _tracer = None
+
+
+def active_tracer() -> Tracer | None:
+    """Returns the tracer of the current process, None while tracing is off"""
+    return _tracer
+
+
+def span(name: str, category: str = "build", **args):
+    """Records the with block as a span while tracing is on, else does nothing"""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.span(name, category, **args)
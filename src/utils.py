@@ -1,6 +1,11 @@
 """This file contains the util functions used in the project"""
 
+import io
+import itertools
 import re
+from collections.abc import Iterator
+from block_scanner import scan_blocks
+from block_types import BlockHandler, BlockRegistry
 from htmlnode import HTMLNode
 from leafnode import LeafNode
 from parentnode import ParentNode
@@ -133,8 +138,69 @@ def split_nodes_link(old_nodes: list[TextNode]):
     return new_node_list
 
 
-def text_to_textnodes(text: str):
-    """Converts a raw string of markdown-flavored text into a list of TextNode objects
+# Image and link text and URLs may not contain the delimiters, which the
+# split pipeline would have consumed before the image and link passes ran
+_INLINE_LABEL = r"(?:[^\[\]_`*]|\*(?!\*))*"
+_INLINE_URL = r"(?:[^()_`*]|\*(?!\*))*"
+
+# One alternation per inline construct, matched in a single left-to-right
+# walk. Italic and code spans cannot contain a delimiter that the split
+# pipeline applies before them; those inputs fall through to "stray".
+INLINE_PATTERN = re.compile(
+    r"\*\*(?P<bold>.*?)\*\*"
+    r"|_(?P<italic>(?:[^_*]|\*(?!\*))*?)_"
+    r"|`(?P<code>(?:[^`_*]|\*(?!\*))*?)`"
+    rf"|!\[(?P<alt>{_INLINE_LABEL})\]\((?P<src>{_INLINE_URL})\)"
+    rf"|(?<!!)\[(?P<anchor>{_INLINE_LABEL})\]\((?P<href>{_INLINE_URL})\)"
+    r"|(?P<stray>\*\*|[_`])",
+    re.DOTALL,
+)
+
+_INLINE_TEXT_TYPES = {
+    "bold": TextType.BOLD,
+    "italic": TextType.ITALICS,
+    "code": TextType.CODE,
+}
+
+
+def split_nodes_inline(text: str) -> list[TextNode] | None:
+    """Tokenizes inline markdown into text nodes in a single pass
+
+    Args:
+        text (str): Markdown text
+
+    Returns:
+        list[TextNode] | None: Text nodes, or None when the text contains an
+        unmatched delimiter
+    """
+    nodes_list = []
+    last_index = 0
+
+    for match in INLINE_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "stray":
+            return None
+
+        start = match.start()
+        if start > last_index:
+            nodes_list.append(TextNode(text[last_index:start], TextType.TEXT))
+
+        if kind == "src":
+            nodes_list.append(TextNode(match["alt"], TextType.IMAGE, match["src"]))
+        elif kind == "href":
+            nodes_list.append(TextNode(match["anchor"], TextType.LINK, match["href"]))
+        else:
+            nodes_list.append(TextNode(match[kind], _INLINE_TEXT_TYPES[kind]))
+        last_index = match.end()
+
+    if last_index < len(text):
+        nodes_list.append(TextNode(text[last_index:], TextType.TEXT))
+    return nodes_list
+
+
+def split_nodes_multipass(text: str) -> list[TextNode]:
+    """Converts text to text nodes by running the delimiter, image and link
+    splitters one after the other
 
     Args:
         text (str): Markdown text
@@ -153,6 +219,24 @@ def text_to_textnodes(text: str):
     return nodes_list
 
 
+def text_to_textnodes(text: str):
+    """Converts a raw string of markdown-flavored text into a list of TextNode objects
+
+    The text is tokenized in a single pass. Text with an unmatched delimiter
+    goes through the multi-pass splitters, which raise the matching error.
+
+    Args:
+        text (str): Markdown text
+
+    Returns:
+        List(TextNode): Textnodes created from Markdown text
+    """
+    nodes_list = split_nodes_inline(text)
+    if nodes_list is None:
+        return split_nodes_multipass(text)
+    return nodes_list
+
+
 def markdown_to_blocks(text: str):
     """Converts a markdown string to list of block strings
 
@@ -162,8 +246,107 @@ def markdown_to_blocks(text: str):
     Returns:
         list(str): list of block strings
     """
-    blocks = [block.strip() for block in text.split("\n\n") if block.strip()]
-    return blocks
+    return list(scan_blocks(text.split("\n")))
+
+
+# One to six '#' and a space; seven '#' backtrack into a '#' and fail
+HEADING_PATTERN = re.compile(r"#{1,6} ")
+
+
+def _is_heading(block: str) -> bool:
+    return HEADING_PATTERN.match(block) is not None
+
+
+def _is_code(block: str) -> bool:
+    return block.startswith("```") and block.endswith("```")
+
+
+def _is_quote(block: str) -> bool:
+    # Every line starts with '>': the first, and each one after a newline
+    return block.startswith(">") and block.count("\n") == block.count("\n>")
+
+
+def _is_unordered_list(block: str) -> bool:
+    return block.startswith("- ") and block.count("\n") == block.count("\n- ")
+
+
+def _is_ordered_list(block: str) -> bool:
+    return all(
+        line.lstrip().startswith(f"{i}. ")
+        for i, line in enumerate(block.split("\n"), start=1)
+    )
+
+
+def _paragraph_to_html_node(block: str, images=None) -> HTMLNode:
+    return ParentNode(tag="p", children=text_to_children(block, images))
+
+
+def _heading_to_html_node(block: str, images=None) -> HTMLNode:
+    heading_level = min(block.count("#"), 6)
+    return ParentNode(
+        tag=f"h{heading_level}", children=text_to_children(block.lstrip("# "), images)
+    )
+
+
+def _code_to_html_node(block: str, images=None) -> HTMLNode:
+    code_lines = block.splitlines()[1:-1]
+    code_text = "\n".join(code_lines) + "\n"
+    code_node = LeafNode(tag="code", value=code_text)
+    return ParentNode(tag="pre", children=[code_node])
+
+
+def _quote_to_html_node(block: str, images=None) -> HTMLNode:
+    quote_text = "\n".join(line.lstrip("> ") for line in block.splitlines())
+    return ParentNode(tag="blockquote", children=text_to_children(quote_text, images))
+
+
+def _unordered_list_to_html_node(block: str, images=None) -> HTMLNode:
+    items = [line.lstrip("- ") for line in block.splitlines()]
+    list_items = [
+        ParentNode(tag="li", children=text_to_children(item, images)) for item in items
+    ]
+    return ParentNode(tag="ul", children=list_items)
+
+
+def _ordered_list_to_html_node(block: str, images=None) -> HTMLNode:
+    items = [line.split(". ", 1)[1] for line in block.splitlines()]
+    list_items = [
+        ParentNode(tag="li", children=text_to_children(item, images)) for item in items
+    ]
+    return ParentNode(tag="ol", children=list_items)
+
+
+BLOCK_TYPES = BlockRegistry(
+    BlockHandler(BlockType.PARAGRAPH, "", None, _paragraph_to_html_node)
+)
+for _handler in (
+    BlockHandler(BlockType.HEADING, "#", _is_heading, _heading_to_html_node),
+    BlockHandler(BlockType.CODE, "`", _is_code, _code_to_html_node),
+    BlockHandler(BlockType.QUOTE, ">", _is_quote, _quote_to_html_node),
+    BlockHandler(BlockType.UNORDERED_LIST, "-", _is_unordered_list, _unordered_list_to_html_node),
+    # Numbering starts at 1, and blocks are stripped, so no other first character
+    BlockHandler(BlockType.ORDERED_LIST, "1", _is_ordered_list, _ordered_list_to_html_node),
+):
+    BLOCK_TYPES.register(_handler, builtin=True)
+
+
+def register_block_type(block_type, first_chars: str, matches, to_html_node):
+    """
+    Adds a block type to the parser, e.g. tables or admonitions. A block is
+    checked against the types registered for its first character in
+    registration order, after the built-in ones, and is a paragraph when
+    none matches.
+
+    Args:
+        block_type (Hashable): Name of the type, e.g. "table".
+        first_chars (str): Every character a block of this type can start with.
+        matches (Callable[[str], bool]): Whether a block is of this type.
+        to_html_node (Callable[[str, ImageCatalog | None], HTMLNode | None]): Renders a block.
+
+    Raises:
+        ValueError: Raised when the type is already registered or first_chars is empty
+    """
+    BLOCK_TYPES.register(BlockHandler(block_type, first_chars, matches, to_html_node))
 
 
 def block_to_block_type(block: str):
@@ -174,97 +357,99 @@ def block_to_block_type(block: str):
         block (str): A single block of markdown text with leading and trailing whitespace removed.
 
     Returns:
-        BlockType: The type of the markdown block.
+        BlockType: The type of the markdown block, or the name of a registered type.
     """
-    lines = block.split("\n")
-
-    if block.startswith("# ") or any(
-        block.startswith(f"{'#' * i} ") for i in range(1, 7)
-    ):
-        return BlockType.HEADING
+    return BLOCK_TYPES.classify(block).block_type
 
-    if block.startswith("```") and block.endswith("```"):
-        return BlockType.CODE
 
-    if all(line.startswith(">") for line in lines):
-        return BlockType.QUOTE
-
-    if all(line.startswith("- ") for line in lines):
-        return BlockType.UNORDERED_LIST
+def block_to_html_node(block: str, images=None) -> HTMLNode | None:
+    """
+    Converts a single markdown block into an HTMLNode.
 
-    if all(line.lstrip().startswith(f"{i}. ") for i, line in enumerate(lines, start=1)):
-        return BlockType.ORDERED_LIST
+    Args:
+        block (str): A single block of markdown text with leading and trailing whitespace removed.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
 
-    return BlockType.PARAGRAPH
+    Returns:
+        HTMLNode | None: The node for the block
+    """
+    return BLOCK_TYPES.classify(block).to_html_node(block, images)
 
 
-def markdown_to_html_node(markdown: str) -> HTMLNode:
+def markdown_to_html_node(markdown: str, block_cache=None, images=None) -> HTMLNode:
     """
     Converts a markdown string into an HTMLNode tree structure.
 
+    With a block cache, blocks rendered before are taken from the cache as raw
+    HTML leaves, and newly rendered blocks are added to it.
+
     Args:
         markdown (str): The markdown content to be converted.
+        block_cache (BlockCache, optional): Cache of rendered blocks. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
 
     Returns:
         HTMLNode: The root node containing all block-level elements.
     """
     blocks = markdown_to_blocks(markdown)
-    parent_node = ParentNode(tag="div", children=[])
+    return ParentNode(tag="div", children=list(_block_nodes(blocks, block_cache, images)))
+
+
+def markdown_lines_to_html_node(lines, block_cache=None, images=None) -> HTMLNode:
+    """
+    Converts markdown lines into an HTMLNode whose blocks are scanned and
+    rendered only while it is written, so memory stays bounded by the
+    largest block rather than the page.
+
+    The children are a generator: the node can be written once.
+
+    Args:
+        lines (Iterable[str]): Markdown lines, e.g. from block_scanner.read_lines.
+        block_cache (BlockCache, optional): Cache of rendered blocks. Defaults to None.
+        images (ImageCatalog, optional): Catalog of image sizes. Defaults to None.
+
+    Returns:
+        HTMLNode: The root node containing all block-level elements.
+    """
+    blocks = scan_blocks(lines)
+    return ParentNode(tag="div", children=_block_nodes(blocks, block_cache, images))
+
 
+def _block_nodes(blocks, block_cache, images):
+    """Renders blocks into nodes, through the block cache if there is one.
+    Blocks with images are cached per version of the image catalog."""
     for block in blocks:
-        block_type = block_to_block_type(block)
-        block_node = None
-
-        if block_type == BlockType.PARAGRAPH:
-            block_node = ParentNode(tag="p", children=text_to_children(block))
-        elif block_type == BlockType.HEADING:
-            heading_level = min(block.count("#"), 6)
-            block_node = ParentNode(
-                tag=f"h{heading_level}", children=text_to_children(block.lstrip("# "))
-            )
-        elif block_type == BlockType.CODE:
-            code_lines = block.splitlines()[1:-1]
-            code_text = "\n".join(code_lines) + "\n"
-            code_node = LeafNode(tag="code", value=code_text)
-            block_node = ParentNode(tag="pre", children=[code_node])
-        elif block_type == BlockType.QUOTE:
-            quote_text = "\n".join(line.lstrip("> ") for line in block.splitlines())
-            block_node = ParentNode(
-                tag="blockquote", children=text_to_children(quote_text)
-            )
-        elif block_type == BlockType.UNORDERED_LIST:
-            items = [line.lstrip("- ") for line in block.splitlines()]
-            list_items = [
-                ParentNode(tag="li", children=text_to_children(item)) for item in items
-            ]
-            block_node = ParentNode(tag="ul", children=list_items)
-        elif block_type == BlockType.ORDERED_LIST:
-            items = [line.split(". ", 1)[1] for line in block.splitlines()]
-            list_items = [
-                ParentNode(tag="li", children=text_to_children(item)) for item in items
-            ]
-            block_node = ParentNode(tag="ol", children=list_items)
+        if block_cache is not None:
+            salt = images.digest if images is not None and "![" in block else ""
+            if BLOCK_TYPES.signature:
+                salt = f"{salt}\0{BLOCK_TYPES.signature}"
+            html = block_cache.get(block, salt)
+            if html is None:
+                block_node = block_to_html_node(block, images)
+                html = block_node.to_html() if block_node else ""
+                block_cache.put(block, html, salt)
+            yield LeafNode(None, html)
+            continue
 
+        block_node = block_to_html_node(block, images)
         if block_node:
-            parent_node.children.append(block_node)
-
-    return parent_node
+            yield block_node
 
 
-def text_to_children(text: str) -> list[HTMLNode]:
+def text_to_children(text: str, images=None) -> list[HTMLNode]:
     """
     Converts a text string into a list of HTMLNodes representing inline markdown.
 
     Args:
         text (str): The input text string with possible inline markdown.
+        images (ImageCatalog, optional): Adds intrinsic sizes and lazy loading
+            to image tags. Defaults to None.
 
     Returns:
         list[HTMLNode]: A list of HTMLNodes representing parsed inline elements.
     """
     nodes = []
     text_nodes = text_to_textnodes(text)
-    text_nodes = split_nodes_image(text_nodes)
-    text_nodes = split_nodes_link(text_nodes)
 
     for node in text_nodes:
         tag = None
@@ -281,6 +466,8 @@ def text_to_children(text: str) -> list[HTMLNode]:
         elif node.text_type == TextType.IMAGE:
             tag = "img"
             props = {"src": node.url, "alt": node.text}
+            if images is not None:
+                props.update(images.props(node.url))
 
         nodes.append(LeafNode(tag=tag, value=node.text, props=props))
     return nodes
@@ -298,9 +485,54 @@ def extract_title(markdown: str) -> str:
     Returns:
         str: Title string
     """
-    lines = markdown.split("\n")
+    return extract_title_from_lines(io.StringIO(markdown))
+
+
+def extract_title_from_lines(lines) -> str:
+    """Extracts title string from markdown lines, reading only up to the title
+
+    Args:
+        lines (Iterable[str]): The input markdown lines
+
+    Raises:
+        ValueError: Raised when the lines don't contain a H1 header (title)
+
+    Returns:
+        str: Title string
+    """
     for line in lines:
-        words = line.strip().split()
-        if words and words[0] == "#":
-            return " ".join(words[1:])
+        title = _line_title(line)
+        if title is not None:
+            return title
     raise ValueError("No title found")
+
+
+def split_title(lines) -> tuple[str, Iterator[str]]:
+    """Extracts the title from markdown lines and returns them unconsumed,
+    buffering only the lines up to the title
+
+    Args:
+        lines (Iterable[str]): The input markdown lines
+
+    Raises:
+        ValueError: Raised when the lines don't contain a H1 header (title)
+
+    Returns:
+        tuple[str, Iterator[str]]: Title string, and all of the lines
+    """
+    lines = iter(lines)
+    consumed = []
+    for line in lines:
+        consumed.append(line)
+        title = _line_title(line)
+        if title is not None:
+            return title, itertools.chain(consumed, lines)
+    raise ValueError("No title found")
+
+
+def _line_title(line: str) -> str | None:
+    """Returns the title of a H1 header line, None for any other line"""
+    words = line.strip().split()
+    if words and words[0] == "#":
+        return " ".join(words[1:])
+    return None
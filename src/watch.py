@@ -0,0 +1,431 @@
+"""This module contains the watch mode, which rebuilds only what each change affects"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from block_cache import BlockCache
+from compress import Compressor
+from copy_directory import sync_file
+from depgraph import DependencyGraph, image_input
+from generate_page import (
+    dest_path_for,
+    discover_pages,
+    discover_sources,
+    generate_pages_recursive,
+    generate_single_page,
+)
+from images import ImageCatalog, ImageOptimizer
+from listings import ListingGenerator
+from manifest import BuildManifest, hash_file, remove_empty_parents
+from progress import get_reporter
+from search import SearchIndex
+from targets import Target
+from template import TemplateSet, resolve_template
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+
+# Editors often save in several steps; events this close together are one change
+DEBOUNCE_SECONDS = 0.005
+
+
+def _is_within(path: str, directory: str) -> bool:
+    return path.startswith(directory + os.sep)
+
+
+class InotifyWatcher:
+    """Reports changed files under the watched directories using Linux inotify"""
+
+    def __init__(self, directories: list[str]):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories = {}
+        for directory in directories:
+            self._watch_tree(directory)
+
+    def _watch_tree(self, directory: str) -> list[str]:
+        """Watches a directory and its subdirectories, returning the files in them"""
+        files = []
+        for root, _, names in os.walk(directory):
+            descriptor = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(root), WATCH_MASK
+            )
+            if descriptor < 0:
+                raise OSError(ctypes.get_errno(), f"cannot watch {root}")
+            self._directories[descriptor] = root
+            files.extend(os.path.join(root, name) for name in names)
+        return files
+
+    def changes(self, timeout: float | None) -> set[str]:
+        """Waits up to timeout seconds (forever if None) for changed paths"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        data = os.read(self._fd, 1 << 16)
+        offset = 0
+        while offset < len(data):
+            descriptor, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            directory = self._directories.get(descriptor)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and os.path.isdir(path):
+                    changed.update(self._watch_tree(path))
+                continue
+            if mask & IN_CREATE:
+                # The file is reported again once its writer closes it
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self):
+        """Closes the inotify descriptor"""
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Reports changed files by comparing stat snapshots of the watched directories"""
+
+    def __init__(self, directories: list[str], interval: float = 0.05):
+        self.directories = directories
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for directory in self.directories:
+            for root, _, names in os.walk(directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: float | None) -> set[str]:
+        """Polls until something changed or timeout seconds (forever if None) passed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+    def close(self):
+        """Nothing to release for polling"""
+
+
+class Rebuilder:
+    """Maps changed paths to the smallest rebuild: one page for a markdown
+    edit, the pages using a template for a template edit and one file for a
+    static asset"""
+
+    def __init__(
+        self,
+        content_dir: str,
+        static_dir: str,
+        template_path: str,
+        dest_dir: str,
+        basepath: str,
+        manifest: BuildManifest,
+        link_mode: str = "copy",
+        jobs: int = 1,
+        block_cache: BlockCache | None = None,
+        images: ImageCatalog | None = None,
+        listings: ListingGenerator | None = None,
+        search_index: SearchIndex | None = None,
+        compressor: Compressor | None = None,
+        optimizer: ImageOptimizer | None = None,
+    ):
+        self.content_dir = os.path.abspath(content_dir)
+        self.static_dir = os.path.abspath(static_dir)
+        self.template_path = os.path.abspath(template_path)
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.manifest = manifest
+        self.link_mode = link_mode
+        self.jobs = jobs
+        self.block_cache = block_cache
+        self.images = images
+        self.listings = listings
+        self.search_index = search_index
+        self.compressor = compressor
+        self.optimizer = optimizer
+        self.templates = self._load_templates()
+
+    def apply(self, paths) -> list[str]:
+        """Rebuilds what the changed paths affect
+
+        Args:
+            paths (Iterable[str]): Changed, created or deleted paths.
+
+        Returns:
+            list[str]: Description of every action taken
+        """
+        actions = []
+        paths = sorted({os.path.abspath(path) for path in paths})
+
+        template_changed = self._template_changed(paths)
+        template_failed = False
+        if template_changed:
+            try:
+                self.templates = self._load_templates()
+            except (OSError, ValueError) as error:
+                # Pages keep being built with the templates that last compiled
+                template_failed = True
+                actions.append(
+                    f"Failed to compile the templates, keeping the previous ones: {error}"
+                )
+        if template_changed and not template_failed:
+            try:
+                # Incremental, so only the pages whose template changed are generated
+                generate_pages_recursive(
+                    self.content_dir,
+                    self.template_path,
+                    self.dest_dir,
+                    self.basepath,
+                    self.manifest,
+                    incremental=True,
+                    jobs=self.jobs,
+                    block_cache=self.block_cache,
+                    images=self.images,
+                )
+            except (OSError, ValueError) as error:
+                # Keep watching; the pages are regenerated once it is fixed
+                template_failed = True
+                actions.append(f"Failed to regenerate pages for the template change: {error}")
+            else:
+                actions.append("Regenerated all pages for the template change")
+
+        for path in paths:
+            if _is_within(path, self.content_dir) and path.endswith(".md"):
+                if not template_changed:
+                    actions.extend(self._rebuild_page(path))
+            elif _is_within(path, self.static_dir):
+                actions.extend(self._sync_asset(path))
+                if self.images is not None and path.lower().endswith(".png"):
+                    actions.extend(self._resize_image(path, paths))
+        if actions and self.listings is not None and not template_failed:
+            target = Target(self.basepath, self.dest_dir, self.manifest)
+            self.listings.generate([target], incremental=True)
+        if actions and self.search_index is not None:
+            self.search_index.update(
+                discover_pages(self.content_dir, self.dest_dir),
+                self.manifest.source_hashes(),
+            )
+            self.search_index.save()
+        if actions and self.compressor is not None:
+            self.compressor.compress()
+        return actions
+
+    def _load_templates(self) -> TemplateSet:
+        """Compiles the template of every content directory, so a broken
+        template is found before it replaces the ones in use
+
+        Raises:
+            OSError: Raised when a template or a file it includes is missing
+            ValueError: Raised when a template includes or extends itself
+        """
+        templates = TemplateSet(self.content_dir, self.template_path, self.basepath)
+        for from_path in discover_sources(self.content_dir):
+            templates.for_source(from_path)
+        return templates
+
+    def _template_changed(self, paths: list[str]) -> bool:
+        """Whether the site template or a section template is among paths"""
+        return any(
+            path == self.template_path
+            or (_is_within(path, self.content_dir) and path.endswith(".html"))
+            for path in paths
+        )
+
+    def _rebuild_page(self, from_path: str) -> list[str]:
+        dest_path = dest_path_for(from_path, self.content_dir, self.dest_dir)
+        if os.path.exists(from_path):
+            try:
+                generate_single_page(
+                    from_path,
+                    self.templates.for_source(from_path),
+                    dest_path,
+                    self.manifest,
+                    self.block_cache,
+                    self.images,
+                )
+            except (OSError, ValueError) as error:
+                # Keep watching; the page is rebuilt once the source is fixed
+                return [f"Failed to generate {dest_path}: {error}"]
+            return [f"Generated page: {dest_path}"]
+        if self.manifest.remove_page(dest_path):
+            return [f"Removed stale page: {dest_path}"]
+        return []
+
+    def _resize_image(self, src_file: str, paths: list[str]) -> list[str]:
+        """Rebuilds the pages showing an image whose size changed"""
+        url = self.images.update(self.static_dir, src_file)
+        if self._template_changed(paths):
+            return []
+        graph = DependencyGraph(self.manifest)
+        actions = []
+        for source_path in graph.sources(image_input(url)):
+            from_path = os.path.abspath(source_path)
+            if from_path not in paths and self.manifest.page_changes(
+                dest_path_for(from_path, self.content_dir, self.dest_dir),
+                hash_file(from_path),
+                self.templates.for_source(from_path).digest,
+                self.basepath,
+                self.images,
+            ):
+                actions.extend(self._rebuild_page(from_path))
+        return actions
+
+    def _sync_asset(self, src_file: str) -> list[str]:
+        key = os.path.relpath(src_file, self.static_dir).replace(os.sep, "/")
+        dest_file = os.path.join(self.dest_dir, *key.split("/"))
+        if os.path.isfile(src_file):
+            if key not in self.manifest.assets:
+                self.manifest.assets = sorted(self.manifest.assets + [key])
+            source = src_file
+            if self.optimizer is not None and src_file.lower().endswith(".png"):
+                # Published as a full build publishes it
+                source = self.optimizer.optimize([src_file], prune=False)[src_file]
+            if sync_file(source, dest_file, self.link_mode):
+                return [f"Copied '{src_file}' to '{dest_file}'"]
+            return []
+        if key in self.manifest.assets:
+            self.manifest.assets = [asset for asset in self.manifest.assets if asset != key]
+            if os.path.exists(dest_file):
+                os.remove(dest_file)
+                remove_empty_parents(os.path.dirname(dest_file), self.dest_dir)
+            return [f"Removed stale file '{dest_file}'"]
+        return []
+
+
+class TemplateWatcher:
+    """Reports the template as changed when the mtime or size of it or of a
+    file it includes or extends changes"""
+
+    def __init__(self, template_path: str):
+        self.template_path = template_path
+        self._files = self._dependencies()
+        self._stat = self._current()
+
+    def _dependencies(self) -> list[str]:
+        try:
+            return resolve_template(self.template_path)[1]
+        except (OSError, ValueError):
+            return [self.template_path]
+
+    def _current(self):
+        stats = []
+        for path in self._files:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stats.append(None)
+                continue
+            stats.append((stat.st_mtime_ns, stat.st_size))
+        return stats
+
+    def changes(self) -> set[str]:
+        """Returns the template path if it changed since the last call"""
+        if self._current() == self._stat:
+            return set()
+        # Includes may have been added or removed
+        self._files = self._dependencies()
+        self._stat = self._current()
+        return {self.template_path}
+
+
+def create_watcher(directories: list[str], polling: bool = False, interval: float = 0.05):
+    """Returns an inotify watcher, or a polling one where inotify is unavailable
+
+    Args:
+        directories (list[str]): Directories to watch recursively.
+        polling (bool, optional): Always poll. Defaults to False.
+        interval (float, optional): Polling interval in seconds. Defaults to 0.05.
+    """
+    if not polling:
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(directories, interval)
+
+
+def watch(rebuilder: Rebuilder, polling: bool = False, interval: float = 0.05):
+    """
+    Keeps rebuilding what changes in the content, static and template paths
+    until interrupted.
+
+    Args:
+        rebuilder (Rebuilder): Rebuilder for the site.
+        polling (bool, optional): Poll instead of using inotify. Defaults to False.
+        interval (float, optional): Polling interval in seconds. Defaults to 0.05.
+    """
+    directories = [rebuilder.content_dir, rebuilder.static_dir]
+    watcher = create_watcher(directories, polling, interval)
+    template_watcher = TemplateWatcher(rebuilder.template_path)
+    reporter = get_reporter()
+    reporter.report(
+        None, f"Watching {', '.join(directories + [rebuilder.template_path])} for changes"
+    )
+    reporter.flush()
+
+    try:
+        while True:
+            changed = watcher.changes(interval)
+            changed |= template_watcher.changes()
+            if not changed:
+                continue
+            changed |= watcher.changes(DEBOUNCE_SECONDS)
+            start = time.perf_counter()
+            try:
+                actions = rebuilder.apply(changed)
+            except (OSError, ValueError) as error:
+                # A later change may fix it; the watch goes on
+                actions = [f"Failed to rebuild: {error}"]
+            rebuilder.manifest.save()
+            if rebuilder.block_cache is not None:
+                rebuilder.block_cache.save()
+            for action in actions:
+                reporter.report(None, action)
+            elapsed = (time.perf_counter() - start) * 1000
+            reporter.report(None, f"Rebuilt {len(changed)} change(s) in {elapsed:.1f} ms")
+            reporter.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+